@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+bench_readers.py
+==============================
+
+مقایسهٔ موتورهای خواندن xlsx (common.excel_read) روی همان شکل فایل‌های پایپ‌لاین‌ها
+(داده‌های ساختگی gen_data.py): زمان اجرا، بیشینهٔ حافظه و یکسان بودن dtypeها.
+
+روش کار:
+---------
+- هر (فایل، موتور) در یک زیرپردازهٔ تازه خوانده می‌شود (peak RSS مستقل برای هر خواندن)
+  با همان پارامترهای خواندن اسکریپت‌ها (مثلاً dtype=str برای «کد پذیرنده»).
+- فایل پشتیبانی مثل ratings.py فقط دو ستون (کد پذیرنده + AY) خوانده می‌شود:
+  موتورهای «stream» (XML جریانی) و «calamine».
+- زیرپردازه امضای dtype ستون‌ها را چاپ می‌کند؛ ستون same_dtypes نشان می‌دهد همهٔ موتورها
+  برای آن فایل dtype یکسان داده‌اند.
+
+نحوه اجرا:
+----------
+    python bench/bench_readers.py --size 10k
+    python bench/bench_readers.py --rows 50000 --repeat 3 --csv readers.csv
+    python bench/bench_readers.py --engines openpyxl   (فقط یک موتور)
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import gen_data
+from run_bench import run_measured
+from common.excel_read import available_engines
+
+MERCH = {"dtype": {"کد پذیرنده": str}}
+# (نام، مسیر نسبی از Desktop، پارامترهای خواندن یا None برای خواندن دوستونی فایل پشتیبانی)
+SHAPES = [
+    ("support",    "فایل پشتیبانی.xlsx", None),
+    ("in-wait",    "takhsis/in-wait.xlsx", {"dtype": {"کد پذیرنده": str, "سریال پوز تخصیص یافته": str}}),
+    ("search",     "takhsis/search.xlsx", {"dtype": {"کد پذیرنده": str, "سریال پایانه": str}}),
+    ("last-night", "takhsis/last-night.xlsx", MERCH),
+    ("rating",     "takhsis/rating.xlsx", MERCH),
+    ("install",    "noInstall/input/install.xlsx", {}),
+    ("1025",       "noInstall/input/1025.xlsx", {}),
+    ("exit",       "noInstall/input/خروج.xlsx", {}),
+    ("disable",    "noInstall/input/disable.xlsx", {}),
+]
+FIELDS = ["size", "rows", "file", "engine", "run", "wall_s", "peak_rss_mb", "rows_out",
+          "same_dtypes", "status"]
+
+CHILD = """
+import json, sys
+sys.path.insert(0, {root!r})
+engine, path, kwargs = {engine!r}, {path!r}, json.loads({kwargs!r})
+if kwargs is None:
+    from openpyxl.utils.cell import column_index_from_string
+    from common.xlsx_columns import read_xlsx_columns
+    df, _ = read_xlsx_columns(path, "File", names=["کد پذیرنده"],
+                              positions=[column_index_from_string("AY") - 1], engine=engine)
+else:
+    from common.excel_read import read_excel
+    df = read_excel(path, engine=engine, **kwargs)
+hwm = None
+try:
+    with open("/proc/self/status") as f:
+        hwm = next(int(l.split()[1]) for l in f if l.startswith("VmHWM:")) / 1024
+except (OSError, StopIteration):
+    pass
+print(json.dumps({{"rows": len(df), "hwm_mb": hwm,
+                  "dtypes": [[str(c), str(t)] for c, t in df.dtypes.items()]}}))
+"""
+
+
+def engines_for(kwargs, wanted):
+    """موتورهای قابل سنجش برای یک شکل فایل."""
+    engines = available_engines()
+    if kwargs is None:
+        engines = ["stream"] + (["calamine"] if "calamine" in engines else [])
+    return [e for e in engines if not wanted or e in wanted]
+
+
+def run_child(engine, path, kwargs, work):
+    """
+    خواندن یک فایل در زیرپردازه. خروجی: (wall_s، peak_rss_mb، returncode، خروجی JSON زیرپردازه).
+    peak از VmHWM خود زیرپردازه (لینوکس) است: ru_maxrss حافظهٔ این پردازهٔ والد (pandas) را هم
+    در لحظهٔ exec به ارث می‌برد.
+    """
+    kwargs = json.dumps(kwargs, ensure_ascii=False, default=lambda t: t.__name__)  # str → "str"
+    code = CHILD.format(root=ROOT, engine=engine, path=path, kwargs=kwargs)
+    log = os.path.join(work, "child.log")
+    wall, rss, rc = run_measured([sys.executable, "-c", code], dict(os.environ), ROOT, log)
+    out = None
+    if rc == 0:
+        with open(log, encoding="utf-8") as f:
+            out = json.loads(f.read().strip().splitlines()[-1])
+        if out.get("hwm_mb") is not None:
+            rss = round(out["hwm_mb"], 1)
+    return wall, rss, rc, out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="بنچمارک موتورهای خواندن xlsx روی شکل فایل‌های پایپ‌لاین‌ها")
+    ap.add_argument("--size", choices=sorted(gen_data.SIZES), default="10k")
+    ap.add_argument("--rows", type=int, help="تعداد ردیف دلخواه (به‌جای --size)")
+    ap.add_argument("--data", help="پوشهٔ داده‌ها (پیش‌فرض: bench_data/<size>)")
+    ap.add_argument("--engines", default="", help="فهرست موتورها با کاما (پیش‌فرض: همهٔ موتورهای نصب‌شده)")
+    ap.add_argument("--files", default="", help="فهرست شکل فایل‌ها با کاما (پیش‌فرض: همه)")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--csv", help="ذخیرهٔ نتایج در فایل CSV")
+    args = ap.parse_args(argv)
+
+    n = args.rows or gen_data.SIZES[args.size]
+    label = args.size if not args.rows else str(n)
+    data_dir = args.data or os.path.join(ROOT, "bench_data", label)
+    print(f"📦 Data: {data_dir}  ({n:,} rows)   engines: {', '.join(available_engines())}")
+    gen_data.generate(data_dir, n)
+
+    wanted = {e.strip() for e in args.engines.split(",") if e.strip()}
+    files = {f.strip() for f in args.files.split(",") if f.strip()}
+    work = tempfile.mkdtemp(prefix="bench_readers_")
+    results = []
+    for name, rel, kwargs in SHAPES:
+        if files and name not in files:
+            continue
+        path = os.path.join(data_dir, "Desktop", *rel.split("/"))
+        rows, sigs = [], {}
+        for engine in engines_for(kwargs, wanted):
+            for r in range(1, args.repeat + 1):
+                wall, rss, rc, out = run_child(engine, path, kwargs, work)
+                status = "ok" if rc == 0 else f"exit {rc}"
+                if out is not None:
+                    sigs[engine] = out["dtypes"]
+                rows.append({"size": label, "rows": n, "file": name, "engine": engine, "run": r,
+                             "wall_s": round(wall, 3), "peak_rss_mb": rss,
+                             "rows_out": out["rows"] if out else None, "status": status})
+                print(f"   {name:<11} {engine:<9} {wall:8.2f} s   "
+                      f"{rss if rss is not None else '-':>8} MB   {status}")
+        same = len({json.dumps(s, ensure_ascii=False) for s in sigs.values()}) <= 1
+        if not same:
+            print(f"   ⚠️ dtypeها برای {name} بین موتورها یکسان نیست")
+        for row in rows:
+            row["same_dtypes"] = same
+        results.extend(rows)
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.DictWriter(f, fieldnames=FIELDS)
+            w.writeheader()
+            w.writerows(results)
+        print("✅ Results saved:", args.csv)
+    return 0 if all(r["status"] == "ok" and r["same_dtypes"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
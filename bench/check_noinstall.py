@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+check_noinstall.py
+==============================
+
+بررسی برابری و رگرسیون مراحل برداری noInstall.py روی داده‌های کوچک ساختگی (بدون فایل اکسل):
+هر تابع برداری با یک پیاده‌سازی مرجع سطر به سطر (همان قاعدهٔ حلقه‌های قبلی) روی قاب‌های تصادفی
+مقایسه می‌شود و حالت‌های مرزی ثابت هم با مقدار مورد انتظار صریح بررسی می‌شوند.
+
+بررسی‌ها:
+----------
+- disable : disable_hits / split_disabled در برابر حلقهٔ قبلی: جدیدترین disable همان سریال با
+            «روز ≥ تخصیص»؛ کد پذیرندهٔ ردیف باید با disable یکی باشد، مگر خالی باشد (هر پذیرنده).
+- sla     : index_install / sla_columns (تاریخ نصب، تاخیر، پایه، هشدار تقلب) در برابر حلقهٔ قبلی
+            مرحلهٔ 12، با اختلاف روز از jdatetime (مرجع مستقل از common.jalali). حالت‌های ثابت
+            بازه‌هایی را که از 29 فوریه یا 31 دسامبر سال کبیسهٔ میلادی می‌گذرند پوشش می‌دهند؛ تبدیل
+            دستی قدیمی فوریه را همیشه 28 روز می‌گرفت (تاخیر ±1 روز، و برای 31 دسامبر خالی).
+
+نکات:
+------
+- noInstall.py هنگام import پوشه‌های Desktop/noInstall را می‌سازد؛ اینجا HOME/USERPROFILE به یک
+  پوشهٔ موقت اشاره می‌کند تا Desktop واقعی دست نخورد.
+- خروج با کد 1 اگر هر بررسی رد شود.
+
+نحوه اجرا:
+----------
+    python bench/check_noinstall.py
+    python bench/check_noinstall.py --rounds 1000 --seed 7
+    python bench/check_noinstall.py --only sla
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import jdatetime
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+NOINSTALL_DIR = os.path.join(ROOT, "setup", "نصب خیر")
+sys.path[:0] = [ROOT, NOINSTALL_DIR]
+from common import jalali
+from common.text import normalize_text
+
+NO_DAY = jalali.NO_DAY
+SERIAL = "سریال پایانه"
+MERCH = "کد پذیرنده"
+ALLOC = "تاریخ تخصیص تجهیز"
+DIS_DATE = "تاریخ پایان تخصیص"
+INSTALL = "تاریخ نصب"
+SHEET2_COLS = [SERIAL, MERCH, "شهر", ALLOC, "تاریخ تراکنش 1025", "خروج", "از_نزد_پشتیبان"]
+SLA_COLS = ["تاریخ نصب", "تاخیر روز", "پایه_تاخیر", "هشدار_احتمال_تقلب"]
+FA_DIGITS = str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹")
+
+ni = None   # ماژول noInstall (load_noinstall)
+
+
+def load_noinstall(home: str):
+    """import noInstall با HOME موقت (مسیرهای Desktop آن هنگام import ساخته می‌شوند)."""
+    global ni
+    os.makedirs(os.path.join(home, "Desktop"), exist_ok=True)
+    os.environ["HOME"] = os.environ["USERPROFILE"] = home
+    import noInstall
+    ni = noInstall
+
+
+def frame(rows, cols) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=cols, dtype=object)
+
+
+# -------------------- دادهٔ تصادفی --------------------
+def random_date(rng, year=1403, month=5, days=20):
+    """تاریخ جلالی در چند قالب ورودی (اسلش، فشرده، ارقام فارسی، با ساعت) یا خالی/نامعتبر."""
+    d = int(rng.integers(1, days + 1))
+    kind = int(rng.integers(0, 8))
+    text = f"{year}/{month:02d}/{d:02d}"
+    if kind == 0:
+        return None
+    if kind == 1:
+        return "نامعتبر"
+    if kind == 2:
+        return f"{year}{month:02d}{d:02d}"
+    if kind == 3:
+        return text.translate(FA_DIGITS)
+    if kind == 4:
+        return text + " 10:30:00"
+    return text
+
+
+def pick(rng, values):
+    return values[int(rng.integers(0, len(values)))]
+
+
+# -------------------- disable --------------------
+def ref_disable_days(df_disable, df) -> np.ndarray:
+    """
+    مرجع سطر به سطر (حلقهٔ قبلی مراحل 8 و 11): برای هر ردیف، جدیدترین روز disable همان سریال
+    با «روز ≥ تخصیص» و کد پذیرندهٔ یکسان (کد خالی ردیف → هر پذیرنده‌ای)؛ وگرنه NO_DAY.
+    """
+    has_merch = MERCH in df_disable.columns
+    items = {}
+    days = jalali.day_keys(df_disable[DIS_DATE])
+    merchants = df_disable[MERCH] if has_merch else [""] * len(df_disable)
+    for serial, day, merch in zip(df_disable[SERIAL], days, merchants):
+        if pd.isna(serial) or day == NO_DAY:
+            continue
+        items.setdefault(str(serial), []).append((int(day), str(merch) if has_merch else ""))
+    out = []
+    for _, row in df.iterrows():
+        serial = str(row[SERIAL]).strip()
+        merch = str(row.get(MERCH, "")).strip()
+        alloc = int(jalali.day_keys([row.get(ALLOC)])[0])
+        hits = [d for d, m in items.get(serial, [])
+                if alloc != NO_DAY and d >= alloc and (merch == "" or m == merch)]
+        out.append(max(hits, default=NO_DAY))
+    return np.array(out, dtype=np.int64)
+
+
+def disable_days(df_disable, df) -> np.ndarray:
+    return ni.disable_hits(ni.build_disable_index(df_disable, SERIAL), df).astype(np.int64)
+
+
+def random_disable_case(rng):
+    serials = ["S1", "S2", "S3", " S4 ", None]
+    merchants = ["M1", "M2", "", np.nan]
+    dis = frame([(pick(rng, serials), pick(rng, merchants), random_date(rng))
+                 for _ in range(int(rng.integers(0, 12)))], [SERIAL, MERCH, DIS_DATE])
+    df = frame([(pick(rng, serials[:4] + ["S4"]), pick(rng, merchants), random_date(rng))
+                for _ in range(int(rng.integers(1, 15)))], [SERIAL, MERCH, ALLOC])
+    if rng.random() < 0.15:
+        dis = dis.drop(columns=[MERCH])
+    if rng.random() < 0.15:
+        df = df.drop(columns=[MERCH])
+    if rng.random() < 0.3:   # ستون‌های کلید بارگذاری‌شده category هستند (load_inputs)
+        df = df.astype({c: "category" for c in df.columns if c != ALLOC})
+    return dis, df
+
+
+def check_disable(rng, rounds: int) -> str:
+    # قاعدهٔ پذیرنده: (نام، disableها، ردیف‌ها، روز مورد انتظار هر ردیف)
+    dis = frame([("S1", "M2", "1403/06/01"), ("S1", "M1", "1403/05/15"),
+                 ("S2", "M1", "1403/05/01"), ("S2", "M2", "1403/06/01"),
+                 ("S3", "M1", "1403/05/10")], [SERIAL, MERCH, DIS_DATE])
+    cases = [
+        ("matching merchant wins over a newer other-merchant disable",
+         dis, [("S1", "M1", "1403/05/10")], [14030515]),
+        ("other merchant only → not disabled", dis, [("S1", "M3", "1403/05/10")], [NO_DAY]),
+        ("empty merchant → newest disable of any merchant", dis, [("S1", "", "1403/05/10")], [14030601]),
+        ("matching disable before allocation → not disabled (other merchant ignored)",
+         dis, [("S2", "M1", "1403/05/10")], [NO_DAY]),
+        ("disable on the allocation day counts", dis, [("S3", "M1", "1403/05/10")], [14030510]),
+        ("unknown allocation day → not disabled", dis, [("S1", "M1", None)], [NO_DAY]),
+        ("disable file without merchant column matches only empty merchants",
+         dis.drop(columns=[MERCH]), [("S1", "M1", "1403/05/10"), ("S1", "", "1403/05/10")],
+         [NO_DAY, 14030601]),
+    ]
+    for name, d, rows, expected in cases:
+        got = disable_days(d, frame(rows, [SERIAL, MERCH, ALLOC])).tolist()
+        assert got == expected, f"{name}: {got} != {expected}"
+
+    # split_disabled: ردیف‌های خارج از candidates حذف نمی‌شوند؛ تاریخ غیر فعال نمایشی
+    df = frame([("S1", "M1", "1403/05/10"), ("S1", "", "1403/05/10"), ("S3", "M1", "1403/05/10")],
+               [SERIAL, MERCH, ALLOC])
+    kept, log = ni.split_disabled(df, ni.disable_hits(ni.build_disable_index(dis, SERIAL), df),
+                                  candidates=[True, False, True])
+    assert kept.index.tolist() == [1], kept
+    assert log["تاریخ غیر فعال"].tolist() == ["1403/05/15", "1403/05/10"], log
+
+    for i in range(rounds):
+        dis, df = random_disable_case(rng)
+        got, want = disable_days(dis, df), ref_disable_days(dis, df)
+        assert np.array_equal(got, want), f"round {i}: {got.tolist()} != {want.tolist()}\n{dis}\n{df}"
+    return f"{len(cases) + 1} cases, {rounds} random frames"
+
+
+# -------------------- SLA / تاخیر / تقلب --------------------
+def jdays(start: int, end: int) -> int:
+    """اختلاف روز دو کلید جلالی YYYYMMDD با jdatetime (end - start)."""
+    a, b = (jdatetime.date(k // 10000, k // 100 % 100, k % 100).togregorian() for k in (start, end))
+    return (b - a).days
+
+
+def ref_sla(install, sheet2) -> list:
+    """
+    مرجع سطر به سطر (حلقهٔ قبلی مرحلهٔ 12): جدیدترین تاریخ نصب همان (سریال، کد پذیرنده) به شرط
+    «نصب ≥ تخصیص»؛ هشدار = 1025 > خروج؛ پایه = خروج (نزد پشتیبان) یا 1025؛
+    تاخیر = max(0, روز(نصب - پایه) - SLA شهر). خروجی: [(تاریخ نصب، تاخیر، پایه، هشدار)] با None برای خالی.
+    """
+    idx = {}
+    for serial, merch, day in zip(install[SERIAL], install[MERCH], jalali.day_keys(install[INSTALL])):
+        if day != NO_DAY:
+            key = (str(serial).strip(), str(merch).strip())
+            idx[key] = max(idx.get(key, NO_DAY), int(day))
+
+    def key(v):
+        k = int(jalali.day_keys([v])[0])
+        return None if k == NO_DAY else k
+
+    out = []
+    for _, row in sheet2.iterrows():
+        alloc, test, exit_ = key(row.get(ALLOC)), key(row.get("تاریخ تراکنش 1025")), key(row.get("خروج"))
+        nazd = str(row.get("از_نزد_پشتیبان", "")).strip().lower() in ("true", "1", "بله", "yes")
+        inst = idx.get((str(row.get(SERIAL, "")).strip(), str(row.get(MERCH, "")).strip()))
+        if inst is not None and alloc is not None and inst < alloc:
+            inst = None
+        if inst is None:
+            out.append((None, None, None, False))
+            continue
+        fraud = test is not None and exit_ is not None and test > exit_
+        base = exit_ if nazd else test
+        sla = 2 if normalize_text(row.get("شهر")) == "مشهد" else 5
+        delay = None if fraud or base is None else max(0, jdays(base, inst) - sla)
+        pretty = f"{inst // 10000:04d}/{inst // 100 % 100:02d}/{inst % 100:02d}"
+        out.append((pretty, delay, "خروج" if nazd else "1025", fraud))
+    return out
+
+
+def plain(v):
+    """مقدار قابل مقایسه با مرجع: بولی → bool، خالی → None، عدد → int."""
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    if pd.isna(v):
+        return None
+    return int(v) if isinstance(v, (int, float, np.integer, np.floating)) else v
+
+
+def sla_rows(install, sheet2) -> list:
+    cols = ni.sla_columns(sheet2, ni.index_install(install))[SLA_COLS]
+    return [tuple(plain(v) for v in row) for row in cols.itertuples(index=False, name=None)]
+
+
+def random_sla_case(rng):
+    # پنجره‌هایی که از 29 فوریه (1398/12، 1402/12) و 31 دسامبر 2024 (1403/10) می‌گذرند
+    months = [(1398, 12), (1399, 1), (1402, 12), (1403, 1), (1403, 10)]
+    serials, merchants = ["S1", "S2", "S3", "S4"], ["M1", "M2", ""]
+    flags = [True, False, "True", "1", 1, 1.0, "بله", " yes ", "no", None, np.nan]
+    cities = ["مشهد", " مشهد ", "تهران", None]
+
+    def date():
+        return random_date(rng, *pick(rng, months), days=29)
+
+    install = frame([(pick(rng, serials), pick(rng, merchants), date())
+                     for _ in range(int(rng.integers(0, 12)))], [SERIAL, MERCH, INSTALL])
+    sheet2 = frame([(pick(rng, serials), pick(rng, merchants), pick(rng, cities), date(), date(), date(),
+                     pick(rng, flags)) for _ in range(int(rng.integers(1, 12)))], SHEET2_COLS)
+    if rng.random() < 0.3:   # ستون‌های کلید/کم‌تنوع بارگذاری‌شده category هستند (load_inputs)
+        sheet2 = sheet2.astype({SERIAL: "category", MERCH: "category", "شهر": "category"})
+        install = install.astype({SERIAL: "category", MERCH: "category"})
+    return install, sheet2
+
+
+def check_sla(rng, rounds: int) -> str:
+    install = frame([("L1", "M1", "1402/12/15"), ("L2", "M1", "1403/10/11"), ("L3", "M1", "1402/12/11"),
+                     ("L4", "M1", "1398/12/20"), ("R1", "M1", "1403/05/20"), ("R1", "M1", "1403/05/01")],
+                    [SERIAL, MERCH, INSTALL])
+    # (نام، ردیف شیت 2، خروجی مورد انتظار)؛ ردیف: سریال، پذیرنده، شهر، تخصیص، 1025، خروج، نزد پشتیبان
+    cases = [
+        ("across Feb 29 2024: 10 days - SLA 5",
+         ("L1", "M1", "تهران", "1402/12/01", "1402/12/05", None, False), ("1402/12/15", 5, "1025", False)),
+        ("ends on Dec 31 2024: 6 days - SLA 5",
+         ("L2", "M1", "تهران", "1403/10/01", "1403/10/05", None, False), ("1403/10/11", 1, "1025", False)),
+        ("across Feb 29 2024, Mashhad: 2 days - SLA 2",
+         ("L3", "M1", "مشهد", "1402/12/01", "1402/12/09", None, False), ("1402/12/11", 0, "1025", False)),
+        ("across Feb 29 2020: 19 days - SLA 5",
+         ("L4", "M1", "تهران", "1398/12/01", "1398/12/01", None, False), ("1398/12/20", 14, "1025", False)),
+        ("nazd → base is exit",
+         ("R1", "M1", "تهران", "1403/05/01", "1403/05/02", "1403/05/10", "بله"), ("1403/05/20", 5, "خروج", False)),
+        ("1025 after exit → fraud, no delay",
+         ("R1", "M1", "تهران", "1403/05/01", "1403/05/12", "1403/05/10", True), ("1403/05/20", None, "خروج", True)),
+        ("install before allocation → not installed",
+         ("R1", "M1", "تهران", "1403/05/25", "1403/05/26", None, False), (None, None, None, False)),
+        ("unknown allocation → newest install", ("R1", "M1", "تهران", None, "1403/05/02", None, False),
+         ("1403/05/20", 13, "1025", False)),
+        ("other merchant → not installed", ("R1", "M2", "تهران", "1403/05/01", None, None, False),
+         (None, None, None, False)),
+    ]
+    got = sla_rows(install, frame([row for _, row, _ in cases], SHEET2_COLS))
+    for (name, _, expected), row in zip(cases, got):
+        assert row == expected, f"{name}: {row} != {expected}"
+
+    for i in range(rounds):
+        install, sheet2 = random_sla_case(rng)
+        got, want = sla_rows(install, sheet2), ref_sla(install, sheet2)
+        assert got == want, f"round {i}:\n{got}\n!=\n{want}\n{install}\n{sheet2}"
+    return f"{len(cases)} cases, {rounds} random frames"
+
+
+CHECKS = {"disable": check_disable, "sla": check_sla}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="بررسی برابری مراحل برداری noInstall با مرجع سطر به سطر")
+    parser.add_argument("--rounds", type=int, default=300, help="تعداد قاب‌های تصادفی هر بررسی")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", choices=sorted(CHECKS), help="فقط یک بررسی")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    with tempfile.TemporaryDirectory(prefix="check_noinstall_") as home:
+        load_noinstall(home)
+        for name, check in CHECKS.items():
+            if args.only and name != args.only:
+                continue
+            try:
+                print(f"✅ {name}: {check(np.random.default_rng(args.seed), args.rounds)}")
+            except AssertionError as e:
+                failed += 1
+                print(f"❌ {name}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
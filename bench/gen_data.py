@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+gen_data.py
+==============================
+
+تولید داده‌های ساختگی (غیرمحرمانه) برای بنچمارک سه پایپ‌لاین ratings.py، takhsis.py و noInstall.py.
+
+خروجی یک «خانهٔ» ساختگی است با همان چینش دسکتاپ اپراتورها:
+    <out>/Desktop/فایل پشتیبانی.xlsx                 (شیت File، ستون AY = پله درآمد)
+    <out>/Desktop/takhsis/in-wait.xlsx, search.xlsx, last-night.xlsx,
+                          takhsisReport.xlsx, takhsisReport-m.xlsx, rating.xlsx
+    <out>/Desktop/noInstall/input/install.xlsx, 1025.xlsx, خروج.xlsx, disable.xlsx
+    <out>/Desktop/noInstall/input-day2/install.xlsx     (همان دستگاه‌ها در روز بعد)
+
+ویژگی‌های داده:
+---------------
+- نام ستون‌ها فارسی و مطابق خروجی پرتال؛ تاریخ‌ها جلالی («YYYY/MM/DD HH:MM»، گاهی با ارقام فارسی).
+- پذیرنده‌های تکراری (در search، last-night و فایل پشتیبانی)، سریال‌های تکراری در install.
+- متن نامرتب: ی/ك عربی، نیم‌فاصله، فاصله‌های اضافه، املاهای مختلف «خیر» و «پله درآمد».
+
+نحوه اجرا:
+----------
+    python bench/gen_data.py --size 10k  --out bench_data/10k
+    python bench/gen_data.py --size 100k --out bench_data/100k
+    python bench/gen_data.py --size 1m   --out bench_data/1m
+    (--rows N برای تعداد دلخواه؛ --seed برای تکرارپذیری)
+
+ساخت همه با numpy به صورت ستونی انجام می‌شود و نوشتن با حالت جریانی common.excel_out.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.excel_out import write_xlsx
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DAY2_DIR = "input-day2"   # install.xlsx روز بعد (برای اجرای دوم noInstall)
+
+CITIES    = ["مشهد", "نيشابور", "سبزوار", "تربت‌حیدریه", "قوچان", " مشهد ", "چناران", "كاشمر"]
+PROJECTS  = ["پروژه بانکی", "پرشین سوئیچ", "پرشين", "پروژه فروش", "پروژه بانكي", "بانک ملت"]
+MODELS    = ["GPRS", "LAN", "DIALUP", "PCPOSLAN", " gprs", "Dialup", None]
+FIRST     = ["علی", "رضا", "محمد", "زهرا", "فاطمه", "مهدي", None]
+LAST      = ["احمدی", "كريمي", "رضایی", "محمدی", "حسینی", "نوری", None]
+NOTES     = ["--", None, "تعویض - قدیمی", "جمع آوری - درخواست پذیرنده", "نصب اولیه", "پیگیری  شد", "ساده"]
+TIERS     = ["پله اول", "پله دوم", "پله سوم", "پله چهارم", "پله پنجم", "پله ششم", "پله 2", "پله ۳",
+             "3", 4, "پنجم", " پله   دوم ", "نامشخص", None]
+STATUS    = ["بله", "خير", "خیر", " خیر ", "خیر‌"]
+EXIT_NOTE = ["نزد پشتيبان", "ارسال پست", None, "تحویل نزد  پشتیبان", "تحویل به پشتیبان"]
+
+_FA_DIGITS = str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹")
+
+
+class Gen:
+    def __init__(self, n: int, seed: int):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        # فضای کدها: تعداد پذیرنده‌ها کمتر از ردیف‌هاست تا تکرار داشته باشیم
+        self.n_merch = max(10, int(n * 0.6))
+        self.n_serial = max(10, int(n * 0.9))
+
+    def choice(self, items, size=None):
+        idx = self.rng.integers(0, len(items), size or self.n)
+        return np.array(items, dtype=object)[idx]
+
+    def merchants(self, size=None):
+        return (2_000_000 + self.rng.integers(0, self.n_merch, size or self.n)).astype(str)
+
+    def serials(self, size=None):
+        return np.char.add("SN", np.char.zfill((self.rng.integers(0, self.n_serial, size or self.n)).astype(str), 8))
+
+    def jdates(self, size=None, m_lo=1, m_hi=12, with_time=0.7, fa_digits=0.05, missing=0.0):
+        size = size or self.n
+        y = self.rng.choice([1402, 1403], size)
+        m = self.rng.integers(m_lo, m_hi + 1, size)
+        d = self.rng.integers(1, 31, size)
+        d = np.where(m <= 6, d + self.rng.integers(0, 2, size), d)  # ۳۱ روزه‌ها
+        s = (pd.Series(y.astype(str)) + "/" + pd.Series(m.astype(str)).str.zfill(2) + "/" +
+             pd.Series(d.astype(str)).str.zfill(2))
+        hh = pd.Series(self.rng.integers(0, 24, size).astype(str)).str.zfill(2)
+        mm = pd.Series(self.rng.integers(0, 60, size).astype(str)).str.zfill(2)
+        s = s.where(self.rng.random(size) >= with_time, s + " " + hh + ":" + mm)
+        fa = self.rng.random(size) < fa_digits
+        s[fa] = s[fa].str.translate(_FA_DIGITS)
+        s[self.rng.random(size) < missing] = None
+        return s.to_numpy(dtype=object)
+
+    def extra_cols(self, df: pd.DataFrame, k: int, prefix="ستون"):
+        for j in range(k):
+            if j % 3 == 0:
+                df[f"{prefix} {j}"] = self.rng.integers(0, 10**6, self.n)
+            elif j % 3 == 1:
+                df[f"{prefix} {j}"] = np.char.add("متن ", self.rng.integers(0, 500, self.n).astype(str))
+            else:
+                df[f"{prefix} {j}"] = self.rng.random(self.n).round(3)
+        return df
+
+    # -------------------- takhsis --------------------
+    def in_wait(self):
+        n = self.n
+        return self.extra_cols(pd.DataFrame({
+            "کد پذیرنده": self.merchants(),
+            "کد درخواست": (900_000 + np.arange(n)).astype(str),
+            "کد پیگیری": self.rng.integers(10**8, 10**9, n).astype(str),
+            "مدل پوز": self.choice(MODELS),
+            "گروه پروژه": self.choice(PROJECTS),
+            "تاریخ ایجاد": self.jdates(),
+            "آخرین تاریخ ویرایش": self.jdates(),
+            "شماره حساب": self.rng.integers(10**9, 10**10, n).astype(str),
+            "سریال پوز تخصیص یافته": None,
+        }), 6)
+
+    def search(self):
+        return self.extra_cols(pd.DataFrame({
+            "کد پذیرنده": self.merchants(),
+            "نام فروشگاه": np.char.add("فروشگاه ", self.rng.integers(0, self.n_merch, self.n).astype(str)),
+            "شهر": self.choice(CITIES),
+            "آدرس": np.char.add("خیابان امام رضا، پلاک ", self.rng.integers(1, 999, self.n).astype(str)),
+            "سریال پایانه": self.serials(),
+            "وضعیت پذیرنده": "فعال",
+        }), 10)
+
+    def last_night(self):
+        return self.extra_cols(pd.DataFrame({
+            "کد پذیرنده": self.merchants(),
+            "سریال پایانه": self.serials(),
+            "نام پشتیبان": self.choice(FIRST),
+            "نام خانوادگی پشتیبان": self.choice(LAST),
+            "توضیح": self.choice(NOTES),
+            "شهر": self.choice(CITIES),
+            "پروژه": self.choice(PROJECTS),
+            "تاریخ تخصیص تجهیز": self.jdates(missing=0.02),
+            "تاریخ نصب": self.jdates(missing=0.3),
+        }), 8)
+
+    def report(self, n):
+        return pd.DataFrame({"پروژه": self.choice(PROJECTS + [None], n),
+                             "سریال پایانه": self.serials(n),
+                             "تاریخ تخصیص تجهیز": self.jdates(n)})
+
+    def rating(self):
+        m = np.unique(self.merchants())
+        return pd.DataFrame({"کد پذیرنده": m,
+                             "پله درآمد": self.rng.integers(1, 7, len(m))})
+
+    # -------------------- ratings --------------------
+    def support(self):
+        df = pd.DataFrame({"ردیف": np.arange(self.n)})
+        df = self.extra_cols(df, 2, "اطلاعات")
+        df["کد پذیرنده"] = self.merchants()
+        df = self.extra_cols(df, 46, "ستون")
+        df["پله درآمد تیر"] = self.choice(TIERS)   # ستون AY (ایندکس 50)
+        df = self.extra_cols(df, 4, "پایانی")
+        assert list(df.columns).index("پله درآمد تیر") == 50
+        return df
+
+    # -------------------- noInstall --------------------
+    def install(self):
+        """
+        دو نسخهٔ install.xlsx: روز اول و روز دوم (همان دستگاه‌ها، با نصب‌های تازه) تا اجرای دوم
+        noInstall شیت Installed_Candidates و Archive را هم درگیر کند.
+        """
+        n = self.n
+        inst_dates = self.jdates(m_lo=7, m_hi=12)
+        day1 = pd.DataFrame({
+            "کد پذیرنده": self.merchants(),
+            "نام فروشگاه": np.char.add("فروشگاه ", self.rng.integers(0, self.n_merch, n).astype(str)),
+            "شهر": self.choice(CITIES),
+            "آدرس": np.char.add("خیابان ", self.rng.integers(1, 999, n).astype(str)),
+            "مدل پایانه": self.choice(MODELS),
+            "کد پایانه": (5_000_000 + np.arange(n)).astype(str),
+            "سریال پایانه": self.serials(),
+            "نام خانوادگی پشتیبان": self.choice(LAST),
+            "پروژه": self.choice(PROJECTS),
+            "تاریخ تخصیص تجهیز": self.jdates(m_lo=1, m_hi=6, missing=0.02),
+            "وضعیت نصب": self.choice(STATUS[1:]),
+            "تاریخ نصب": None,
+            "توضیح": self.choice([None, "", "پیگیری شد", "--"]),
+            "مهلت": None,
+        })
+        day1 = self.extra_cols(day1, 12)
+        installed = self.rng.random(n) < 0.5
+        day1.loc[installed, "وضعیت نصب"] = "بله"
+        day1.loc[installed, "تاریخ نصب"] = inst_dates[installed]
+        day2 = day1.copy()
+        newly = ~installed & (self.rng.random(n) < 0.3)
+        day2.loc[newly, "وضعیت نصب"] = "بله"
+        day2.loc[newly, "تاریخ نصب"] = inst_dates[newly]
+        return day1, day2
+
+    def t1025(self):
+        n = self.n * 2
+        return pd.DataFrame({"سریال پایانه": self.serials(n),
+                             "تاریخ تراکنش": self.jdates(n),
+                             "مبلغ": self.rng.integers(1000, 10**6, n)})
+
+    def exits(self):
+        n = self.n * 2
+        return pd.DataFrame({"سریال": self.serials(n),
+                             "تاریخ خروج": self.jdates(n),
+                             "توضیحات": self.choice(EXIT_NOTE, n)})
+
+    def disable(self, install: pd.DataFrame):
+        """نمونه از ردیف‌های install (بیشترشان با همان کد پذیرنده) تا حذف خودکار هم اجرا شود."""
+        n = max(10, self.n // 10)
+        src = install.iloc[self.rng.integers(0, len(install), n)]
+        merch = np.where(self.rng.random(n) < 0.8, src["کد پذیرنده"].to_numpy(), self.merchants(n))
+        return pd.DataFrame({"سریال پایانه": src["سریال پایانه"].to_numpy(),
+                             "کد پذیرنده": merch,
+                             "تاریخ پایان تخصیص": self.jdates(n)})
+
+def generate(out_dir: str, n: int, seed: int = 1403, force: bool = False):
+    """
+    ساخت همهٔ فایل‌های ورودی در out_dir. فایل‌های موجود دوباره ساخته نمی‌شوند مگر force=True.
+    هر فایل مولد تصادفی خودش را دارد (seed + شمارهٔ فایل)، پس ساخت دوبارهٔ یک فایل همان داده را می‌دهد.
+    """
+    desktop = os.path.join(out_dir, "Desktop")
+    takhsis = os.path.join(desktop, "takhsis")
+    noinst  = os.path.join(desktop, "noInstall", "input")
+    noinst2 = os.path.join(desktop, "noInstall", DAY2_DIR)
+    for d in (takhsis, noinst, noinst2):
+        os.makedirs(d, exist_ok=True)
+
+    def install_days():
+        return Gen(n, seed).install()
+
+    jobs = [
+        (os.path.join(desktop, "فایل پشتیبانی.xlsx"), "File", lambda g: g.support()),
+        (os.path.join(takhsis, "in-wait.xlsx"), "Sheet1", lambda g: g.in_wait()),
+        (os.path.join(takhsis, "search.xlsx"), "Sheet1", lambda g: g.search()),
+        (os.path.join(takhsis, "last-night.xlsx"), "Sheet1", lambda g: g.last_night()),
+        (os.path.join(takhsis, "takhsisReport.xlsx"), "Sheet1", lambda g: g.report(max(10, n // 100))),
+        (os.path.join(takhsis, "takhsisReport-m.xlsx"), "Sheet1", lambda g: g.report(max(10, n // 10))),
+        (os.path.join(takhsis, "rating.xlsx"), "Sheet1", lambda g: g.rating()),
+        (os.path.join(noinst, "install.xlsx"), "Sheet1", lambda g: install_days()[0]),
+        (os.path.join(noinst2, "install.xlsx"), "Sheet1", lambda g: install_days()[1]),
+        (os.path.join(noinst, "1025.xlsx"), "Sheet1", lambda g: g.t1025()),
+        (os.path.join(noinst, "خروج.xlsx"), "Sheet1", lambda g: g.exits()),
+        (os.path.join(noinst, "disable.xlsx"), "Sheet1", lambda g: g.disable(install_days()[0])),
+    ]
+    for i, (path, sheet, make) in enumerate(jobs, start=1):
+        if os.path.exists(path) and not force:
+            print("   ↩️ موجود:", path)
+            continue
+        df = make(Gen(n, seed + i))
+        write_xlsx(path, {sheet: df}, stream=True)
+        print(f"   ✅ {os.path.relpath(path, out_dir)}  ({len(df):,} ردیف)")
+    return out_dir
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="تولید داده‌های ساختگی برای بنچمارک")
+    ap.add_argument("--size", choices=sorted(SIZES), default="10k")
+    ap.add_argument("--rows", type=int, help="تعداد ردیف دلخواه (به‌جای --size)")
+    ap.add_argument("--out", help="پوشهٔ خروجی (پیش‌فرض: bench_data/<size>)")
+    ap.add_argument("--seed", type=int, default=1403)
+    ap.add_argument("--force", action="store_true", help="ساخت دوبارهٔ فایل‌های موجود")
+    args = ap.parse_args(argv)
+    n = args.rows or SIZES[args.size]
+    out = args.out or os.path.join("bench_data", args.size if not args.rows else str(n))
+    print(f"📦 Generating {n:,} rows in: {out}")
+    generate(out, n, args.seed, args.force)
+
+
+if __name__ == "__main__":
+    main()
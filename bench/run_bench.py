@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+run_bench.py
+==============================
+
+اجرای بنچمارک سه پایپ‌لاین روی داده‌های ساختگی gen_data.py و گزارش زمان اجرا (wall time)
+و بیشینهٔ حافظهٔ مقیم (peak RSS) هر پایپ‌لاین.
+
+روش کار:
+---------
+1) اگر داده‌های اندازهٔ خواسته‌شده ساخته نشده باشند، با gen_data ساخته می‌شوند (bench_data/<size>).
+2) برای هر اجرا یک کپی تازه از «خانهٔ» ساختگی در پوشهٔ موقت ساخته می‌شود و HOME/USERPROFILE
+   به آن اشاره می‌کند؛ پس Desktop واقعی کاربر دست نمی‌خورد و هر اجرا از وضعیت یکسان شروع می‌شود.
+3) پایپ‌لاین‌ها به ترتیب ratings → takhsis → noinstall در زیرپردازه اجرا می‌شوند.
+   noinstall دو بار اجرا می‌شود: «noinstall» (بدون خروجی قبلی) و «noinstall-rerun» (با وضعیت اجرای اول
+   و install.xlsx روز بعد از input-day2، تا Installed_Candidates و Archive هم سنجیده شوند).
+4) takhsis به‌طور پیش‌فرض با --no-cache اجرا می‌شود (اجرای سرد)؛ با --warm کش Parquet هم سنجیده می‌شود.
+5) هر اسکریپت با --profile اجرا می‌شود و ردیف‌های مراحل (stage) از گزارش JSON آن خوانده می‌شوند؛
+   ردیف «total» اندازه‌گیری بیرونی کل زیرپردازه است. (--no-profile: فقط total)
+
+اندازه‌گیری حافظه:
+------------------
+- لینوکس/مک: os.wait4 → ru_maxrss همان زیرپردازه.
+- ویندوز: اگر psutil نصب باشد، نمونه‌برداری از peak_wset؛ وگرنه خالی.
+
+نحوه اجرا:
+----------
+    python bench/run_bench.py --size 10k
+    python bench/run_bench.py --size 100k --pipelines takhsis,noinstall --repeat 3 --csv bench_results.csv
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import gen_data
+
+PIPELINES = {
+    "ratings":  [os.path.join(ROOT, "ratings.py")],
+    "takhsis":  [os.path.join(ROOT, "setup", "تخصیص", "takhsis.py")],
+    "noinstall": [os.path.join(ROOT, "setup", "نصب خیر", "noInstall.py")],
+}
+FIELDS = ["size", "rows", "pipeline", "run", "stage", "wall_s", "peak_rss_mb",
+          "rows_in", "rows_out", "status"]
+
+
+def _rss_mb_from_rusage(ru) -> float:
+    # ru_maxrss روی مک بر حسب بایت و روی لینوکس بر حسب کیلوبایت است
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(ru.ru_maxrss * scale / 2**20, 1)
+
+
+def run_measured(cmd, env, cwd, log_path):
+    """
+    اجرای یک فرمان در زیرپردازه. خروجی: (wall_s, peak_rss_mb یا None, returncode).
+    خروجی متنی اسکریپت در log_path ذخیره می‌شود.
+    """
+    with open(log_path, "w", encoding="utf-8") as log:
+        t0 = time.perf_counter()
+        p = subprocess.Popen(cmd, env=env, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            _, status, ru = os.wait4(p.pid, 0)
+            wall = time.perf_counter() - t0
+            p.returncode = os.waitstatus_to_exitcode(status)
+            return wall, _rss_mb_from_rusage(ru), p.returncode
+        peak = None
+        try:
+            import psutil
+            proc = psutil.Process(p.pid)
+            while p.poll() is None:
+                try:
+                    mi = proc.memory_info()
+                    peak = max(peak or 0, getattr(mi, "peak_wset", mi.rss))
+                except psutil.Error:
+                    pass
+                time.sleep(0.05)
+        except ImportError:
+            p.wait()
+        wall = time.perf_counter() - t0
+        return wall, (round(peak / 2**20, 1) if peak else None), p.wait()
+
+
+def bench_env(home: str) -> dict:
+    env = dict(os.environ)
+    env["HOME"] = home
+    env["USERPROFILE"] = home
+    env["PYTHONIOENCODING"] = "utf-8"
+    return env
+
+
+def stage_rows(profile_dir, label, run_no):
+    """ردیف‌های مراحل از گزارش --profile اسکریپت (اگر نوشته شده باشد)."""
+    rows = []
+    for path in sorted(glob.glob(os.path.join(profile_dir, "profile-*.json"))):
+        with open(path, encoding="utf-8") as f:
+            rep = json.load(f)
+        for st in rep["stages"]:
+            rows.append({"pipeline": label, "run": run_no, "stage": st["stage"],
+                         "wall_s": st["seconds"], "peak_rss_mb": st["peak_rss_mb"],
+                         "rows_in": st["rows_in"], "rows_out": st["rows_out"], "status": "ok"})
+    return rows
+
+
+def run_once(data_dir, pipelines, run_no, warm, keep_dir=None, profile=True):
+    """
+    یک دور کامل روی کپی تازه از داده‌ها. خروجی: لیست ردیف‌های نتیجه.
+    """
+    work = keep_dir or tempfile.mkdtemp(prefix="bench_home_")
+    home = os.path.join(work, "home")
+    shutil.copytree(data_dir, home, dirs_exist_ok=True)
+    env = bench_env(home)
+    rows = []
+    plan = []
+    for name in pipelines:
+        args = list(PIPELINES[name])
+        if name == "takhsis" and not warm:
+            args.append("--no-cache")
+        if name == "takhsis" and warm:
+            plan.append(("takhsis-prime", args))   # ساخت کش؛ اجرای بعدی گرم است
+        plan.append((name, args))
+        if name == "noinstall":
+            plan.append(("noinstall-rerun", args))
+    try:
+        for label, args in plan:
+            if label == "noinstall-rerun":
+                day2 = os.path.join(home, "Desktop", "noInstall", gen_data.DAY2_DIR)
+                shutil.copytree(day2, os.path.join(home, "Desktop", "noInstall", "input"), dirs_exist_ok=True)
+            log = os.path.join(work, f"{label}.log")
+            prof_dir = os.path.join(work, "profile", label)
+            cmd = [sys.executable] + args + (["--profile", prof_dir] if profile else [])
+            wall, rss, rc = run_measured(cmd, env, ROOT, log)
+            status = "ok" if rc == 0 else f"exit {rc} (log: {log})"
+            rows.append({"pipeline": label, "run": run_no, "stage": "total",
+                         "wall_s": round(wall, 3), "peak_rss_mb": rss, "status": status})
+            print(f"   {label:<16} {wall:8.2f} s   {rss if rss is not None else '-':>8} MB   {status}")
+            if profile and rc == 0:
+                for st in stage_rows(prof_dir, label, run_no):
+                    rows.append(st)
+                    print(f"      {st['stage']:<36} {st['wall_s']:8.3f} s   "
+                          f"{st['peak_rss_mb'] if st['peak_rss_mb'] is not None else '-':>8} MB")
+    finally:
+        if keep_dir is None and all(r["status"] == "ok" for r in rows):
+            shutil.rmtree(work, ignore_errors=True)
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="بنچمارک پایپ‌لاین‌ها روی داده‌های ساختگی")
+    ap.add_argument("--size", choices=sorted(gen_data.SIZES), default="10k")
+    ap.add_argument("--rows", type=int, help="تعداد ردیف دلخواه (به‌جای --size)")
+    ap.add_argument("--data", help="پوشهٔ داده‌ها (پیش‌فرض: bench_data/<size>)")
+    ap.add_argument("--pipelines", default="ratings,takhsis,noinstall")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--warm", action="store_true", help="takhsis با کش Parquet (اجرای گرم)")
+    ap.add_argument("--csv", help="ذخیرهٔ نتایج در فایل CSV")
+    ap.add_argument("--keep", help="نگه داشتن پوشهٔ کاری (خروجی‌ها و لاگ‌ها) در این مسیر")
+    ap.add_argument("--no-profile", action="store_true", help="بدون ردیف‌های مراحل (فقط total)")
+    args = ap.parse_args(argv)
+
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    unknown = [p for p in pipelines if p not in PIPELINES]
+    if unknown:
+        ap.error(f"پایپ‌لاین نامعتبر: {', '.join(unknown)}")
+
+    n = args.rows or gen_data.SIZES[args.size]
+    label = args.size if not args.rows else str(n)
+    data_dir = args.data or os.path.join(ROOT, "bench_data", label)
+    print(f"📦 Data: {data_dir}  ({n:,} rows)")
+    gen_data.generate(data_dir, n)
+
+    results = []
+    for r in range(1, args.repeat + 1):
+        print(f"⏱️ Run {r}/{args.repeat}")
+        keep = os.path.join(args.keep, f"run{r}") if args.keep else None
+        for row in run_once(data_dir, pipelines, r, args.warm, keep, profile=not args.no_profile):
+            row.update(size=label, rows=n)
+            results.append(row)
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.DictWriter(f, fieldnames=FIELDS)
+            w.writeheader()
+            w.writerows(results)
+        print("✅ Results saved:", args.csv)
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+cli.py
+==============================
+
+نقطهٔ ورود یکجا برای ratings، takhsis و noinstall (به‌جای سه اجرای جدای پایتون هر صبح).
+
+نحوه اجرا:
+----------
+    python cli.py ratings   [--xlsx] [--rebuild] [--sinks ...] [--profile [DIR]]
+    python cli.py takhsis   [--batch ...] [--watch] [--no-cache] [--workers N] [--sinks ...] [--profile [DIR]]
+    python cli.py noinstall [--sqlite] [--watch] [--archive-months N] [--export-archive FROM:TO] [--sinks ...]
+    python cli.py all       [--sinks ...] [--profile [DIR]]
+    python cli.py <زیرفرمان> --help
+
+نکات:
+------
+- آرگومان‌ها از common.options ساخته می‌شوند (همان تعریف‌های اجرای مستقیم اسکریپت‌ها) که فقط
+  کتابخانهٔ استاندارد را import می‌کند؛ --help و خطای آرگومان بدون بارگذاری pandas/openpyxl و
+  بدون import خود اسکریپت‌ها فوراً برمی‌گردند.
+- هر زیرفرمان فقط ماژول همان اسکریپت (و کتابخانه‌های آن) را import می‌کند.
+- all: ratings → takhsis → noinstall در یک پردازه؛ کتابخانه‌ها یک بار بارگذاری می‌شوند و جدول
+  پله‌هایی که ratings همین حالا ساخته مستقیم به takhsis داده می‌شود (بدون خواندن دوباره از مخزن).
+  اگر مرحله‌ای خطا بدهد مراحل بعدی اجرا نمی‌شوند.
+- اجرای مستقیم اسکریپت‌ها (python ratings.py، python takhsis.py، python noInstall.py) مثل قبل است.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+from common.options import PIPELINES, add_all_args, build_parser
+
+# محل ماژول هر زیرفرمان: (پوشه، نام ماژول)
+MODULES = {
+    "ratings":   (ROOT, "ratings"),
+    "takhsis":   (os.path.join(ROOT, "setup", "تخصیص"), "takhsis"),
+    "noinstall": (os.path.join(ROOT, "setup", "نصب خیر"), "noInstall"),
+}
+
+
+def load(name: str):
+    """import تنبل ماژول یک زیرفرمان (پوشه‌اش به sys.path اضافه می‌شود تا importهای کناری هم کار کنند)."""
+    folder, module = MODULES[name]
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    return importlib.import_module(module)
+
+
+def run_all(args) -> int:
+    """
+    ratings → takhsis → noinstall در یک پردازه. هر اسکریپت آرگومان‌های پیش‌فرض خودش را می‌گیرد،
+    به‌علاوهٔ --sinks و --profile همین فرمان. خروجی: کد خروج.
+    """
+    def pipeline_args(name):
+        ns = build_parser(name).parse_args([])
+        ns.sinks, ns.profile = args.sinks, args.profile
+        return ns
+
+    print("▶️ ratings")
+    rating = load("ratings").run(pipeline_args("ratings"))
+    print("\n▶️ takhsis")
+    load("takhsis").run(pipeline_args("takhsis"), rating=rating)
+    print("\n▶️ noinstall")
+    return load("noinstall").run(pipeline_args("noinstall"))
+
+
+def build_cli():
+    parser = argparse.ArgumentParser(description="اجرای یکجای ratings، takhsis و noinstall")
+    sub = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+    for name, description in PIPELINES.items():
+        build_parser(name, sub.add_parser(name, help=description, description=description))
+    description = "ratings → takhsis → noinstall در یک پردازه"
+    add_all_args(sub.add_parser("all", help=description, description=description))
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_cli().parse_args(argv)
+    if args.command == "all":
+        return run_all(args)
+    if args.command == "noinstall":
+        return load("noinstall").run(args)
+    load(args.command).run(args)
+    return 0
+
+
+# نقطهٔ ورود (لازم برای process pool در ویندوز: پردازه‌های کارگر این فایل را دوباره import می‌کنند)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+common
+==============================
+
+ماژول‌های مشترک بین اسکریپت‌های ratings.py، تخصیص (takhsis.py) و نصب‌خیر (noInstall.py).
+اسکریپت‌ها مستقیم اجرا می‌شوند؛ برای import، ریشهٔ مخزن را به sys.path اضافه می‌کنند.
+نقطهٔ ورود یکجا: cli.py در ریشهٔ مخزن (آرگومان‌ها در common.options، بدون کتابخانه‌های سنگین).
+"""
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+excel_cache.py
+==============================
+
+کش دیسکی برای ورودی‌های اکسل:
+خواندن xlsx کند است و اکثر فایل‌های ورودی (search، last-night، rating، ...) بین دو اجرا
+تغییری نمی‌کنند. این ماژول دیتافریمِ خوانده‌شده (با dtypeهای اعمال‌شده) را به صورت Parquet
+کنار فایل اصلی ذخیره می‌کند و در اجرای بعدی به‌جای پارس دوبارهٔ xlsx همان را برمی‌گرداند.
+
+کلید کش:
+---------
+- مسیر مطلق فایل + پارامترهای خواندن (dtype، sheet_name، ...) + موتور خواندن (default_engine)
+  → نام فایل کش؛ با عوض شدن EXCEL_ENGINE یا نصب calamine، دیتافریم پارس‌شده با موتور دیگر
+  (که ممکن است dtype متفاوت داشته باشد) برگردانده نمی‌شود.
+- mtime، اندازه و sha256 محتوا در فایل manifest (json) کنار Parquet ثبت می‌شوند.
+
+قاعدهٔ ابطال:
+--------------
+1) اگر mtime و اندازه با manifest یکی باشد → کش معتبر است (بدون هش‌کردن دوباره).
+2) اگر mtime/اندازه عوض شده باشد → sha256 محتوا حساب می‌شود؛ اگر با manifest یکی بود
+   (مثلاً فایل فقط دوباره کپی شده) کش معتبر است و manifest به‌روز می‌شود.
+3) در غیر اینصورت xlsx دوباره خوانده و کش بازنویسی می‌شود (برای هر فایل و موتور فقط یک نسخه).
+- تغییر CACHE_VERSION همهٔ کش‌های قبلی را باطل می‌کند.
+
+نکات:
+------
+- نیازمند pyarrow است؛ اگر نصب نباشد، کش غیرفعال است و مستقیم از xlsx خوانده می‌شود.
+- اگر دیتافریم قابل ذخیره در Parquet نباشد (مثلاً ستون با نوع مخلوط عدد/متن)،
+  همان فایل کش نمی‌شود و خروجی دست‌نخورده برمی‌گردد.
+- برای دور زدن کش: use_cache=False (در اسکریپت‌ها: --no-cache).
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.excel_read import default_engine, read_excel
+
+CACHE_VERSION = 1
+CACHE_DIRNAME = ".xlsx_cache"
+
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+_warned_no_pyarrow = False
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    هش sha256 محتوای فایل (تکه‌تکه، بدون بارگذاری کامل در حافظه).
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_paths(path: str, read_kwargs: dict, engine: str):
+    """
+    مسیر فایل Parquet و manifest برای یک (مسیر، پارامترهای خواندن، موتور).
+    """
+    sig = json.dumps(
+        {"path": os.path.abspath(path), "kwargs": read_kwargs, "engine": engine, "v": CACHE_VERSION},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    key = hashlib.sha1(sig.encode("utf-8")).hexdigest()[:16]
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    base = os.path.join(cache_dir, f"{stem}-{key}")
+    return cache_dir, base + ".parquet", base + ".json"
+
+
+def _read_manifest(manifest_path: str):
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _write_manifest(manifest_path: str, manifest: dict):
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, manifest_path)
+
+
+def _restore_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parquet مقادیر خالی ستون‌های متنی را None برمی‌گرداند؛ read_excel آن‌ها را NaN می‌دهد.
+    برای یکسان ماندن رفتار (مثلاً str(x) یا fillna) دوباره NaN می‌کنیم.
+    """
+    for c in df.columns:
+        if df[c].dtype == object:
+            col = df[c]
+            df[c] = col.where(col.notna(), np.nan)
+    return df
+
+
+def is_cache_valid(path: str, manifest) -> bool:
+    """
+    بررسی اعتبار کش طبق قاعدهٔ ابطال (mtime/اندازه، و در صورت تغییر، sha256).
+    """
+    if not manifest or manifest.get("v") != CACHE_VERSION:
+        return False
+    st = os.stat(path)
+    if manifest.get("mtime_ns") == st.st_mtime_ns and manifest.get("size") == st.st_size:
+        return True
+    if manifest.get("size") != st.st_size:
+        return False
+    return manifest.get("sha256") == file_sha256(path)
+
+
+def cache_is_fresh(path: str, **read_kwargs) -> bool:
+    """
+    آیا برای (path، پارامترهای خواندن) کش Parquet معتبر وجود دارد؟ (بدون خواندن داده‌ها)
+    """
+    if not _HAS_PYARROW:
+        return False
+    _, parquet_path, manifest_path = _cache_paths(path, read_kwargs, default_engine())
+    return os.path.exists(parquet_path) and is_cache_valid(path, _read_manifest(manifest_path))
+
+
+def read_excel_cached(path: str, use_cache: bool = True, **read_kwargs) -> pd.DataFrame:
+    """
+    جایگزین pd.read_excel با کش Parquet (خواندن xlsx با موتور انتخابی common.excel_read).
+    پارامترهای read_kwargs مستقیماً به read_excel داده می‌شوند و بخشی از کلید کش‌اند.
+    اگر فایل وجود نداشته باشد، همان خطای pd.read_excel بالا می‌رود.
+    """
+    global _warned_no_pyarrow
+    if not use_cache or not os.path.exists(path):
+        return read_excel(path, **read_kwargs)
+    if not _HAS_PYARROW:
+        if not _warned_no_pyarrow:
+            print("ℹ️ pyarrow نصب نیست؛ کش اکسل غیرفعال است. (pip install pyarrow)")
+            _warned_no_pyarrow = True
+        return read_excel(path, **read_kwargs)
+
+    engine = default_engine()
+    cache_dir, parquet_path, manifest_path = _cache_paths(path, read_kwargs, engine)
+    manifest = _read_manifest(manifest_path)
+    if os.path.exists(parquet_path) and is_cache_valid(path, manifest):
+        try:
+            df = _restore_missing(pd.read_parquet(parquet_path))
+            st = os.stat(path)
+            if manifest.get("mtime_ns") != st.st_mtime_ns:
+                manifest["mtime_ns"] = st.st_mtime_ns
+                _write_manifest(manifest_path, manifest)
+            print("   ⚡ از کش:", os.path.basename(path))
+            return df
+        except Exception:
+            pass  # کش خراب → خواندن دوباره از xlsx
+
+    st = os.stat(path)
+    digest = file_sha256(path)
+    df = read_excel(path, engine=engine, **read_kwargs)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = parquet_path + ".tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, parquet_path)
+        _write_manifest(manifest_path, {
+            "v": CACHE_VERSION, "source": os.path.abspath(path), "engine": engine,
+            "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest,
+        })
+    except Exception as e:
+        print(f"   ℹ️ کش برای {os.path.basename(path)} ساخته نشد: {e}")
+        for p in (parquet_path + ".tmp", parquet_path, manifest_path):
+            if os.path.exists(p):
+                os.remove(p)
+    return df
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+excel_out.py
+==============================
+
+نویسندهٔ مشترک خروجی‌های اکسل راست‌به‌چپ (takhsis.py، ratings.py، noInstall.py).
+
+قبلاً هر خروجی یک بار با to_excel نوشته می‌شد، دوباره با openpyxl باز می‌شد تا فقط
+rightToLeft تنظیم شود و دوباره ذخیره می‌شد (سه برابر I/O). اینجا جهت صفحه، عرض ستون‌ها و
+قالب‌های اضافه همان لحظهٔ اولین نوشتن اعمال می‌شوند.
+
+حالت‌ها:
+---------
+- عادی  : pd.ExcelWriter با موتور xlsxwriter (اگر نصب نبود openpyxl)؛ یک بار نوشتن.
+- جریانی: برای شیت‌های بزرگ (بیشتر از STREAM_ROWS ردیف یا stream=True) با xlsxwriter در حالت
+  constant_memory ردیف به ردیف نوشته می‌شود؛ حافظه مستقل از تعداد ردیف‌هاست.
+  هدر با همان قالب پیش‌فرض pandas (bold، کادر نازک، وسط‌چین) نوشته می‌شود.
+
+قالب‌های اضافه:
+---------------
+on_sheet(name, ws, book, df) بعد از نوشتن هر شیت صدا زده می‌شود (مثلاً conditional_format)؛
+فقط با موتور xlsxwriter (ws و book اشیای xlsxwriter هستند).
+"""
+
+import importlib.util
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+STREAM_ROWS = 200_000
+AUTO_WIDTH_SAMPLE = 1000
+AUTO_WIDTH_MAX = 60
+
+_HAS_XLSXWRITER = importlib.util.find_spec("xlsxwriter") is not None
+
+
+def _auto_widths(df: pd.DataFrame) -> dict:
+    """
+    تخمین عرض ستون‌ها از طول هدر و نمونهٔ ابتدای داده‌ها.
+    """
+    sample = df.head(AUTO_WIDTH_SAMPLE)
+    out = {}
+    for c in df.columns:
+        lens = sample[c].dropna().astype(str).str.len()
+        longest = max([len(str(c))] + ([int(lens.max())] if len(lens) else []))
+        out[c] = min(longest + 2, AUTO_WIDTH_MAX)
+    return out
+
+
+def _resolve_widths(df: pd.DataFrame, col_widths) -> dict:
+    """col_widths: None، "auto" یا dict{نام ستون → عرض}. خروجی: dict{ایندکس ستون → عرض}."""
+    if col_widths is None:
+        return {}
+    if col_widths == "auto":
+        col_widths = _auto_widths(df)
+    pos = {c: i for i, c in enumerate(df.columns)}
+    return {pos[c]: w for c, w in col_widths.items() if c in pos}
+
+
+def _cell(v):
+    """تبدیل مقدار پانداس/نامپای به مقدار قابل نوشتن؛ خالی → None (سلول نوشته نمی‌شود)."""
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and v != v:
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.to_pydatetime()
+    return v
+
+
+def _write_streaming(path, sheets: dict, widths: dict, on_sheet):
+    import xlsxwriter
+    book = xlsxwriter.Workbook(str(path), {"constant_memory": True})
+    header_fmt = book.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    datetime_fmt = book.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    date_fmt = book.add_format({"num_format": "yyyy-mm-dd"})
+    try:
+        for name, df in sheets.items():
+            ws = book.add_worksheet(name)
+            ws.right_to_left()
+            for i, w in widths[name].items():
+                ws.set_column(i, i, w)
+            ws.write_row(0, 0, [str(c) for c in df.columns], header_fmt)
+            for r, row in enumerate(df.itertuples(index=False, name=None), start=1):
+                for c, v in enumerate(row):
+                    v = _cell(v)
+                    if v is None:
+                        continue
+                    if isinstance(v, datetime):
+                        ws.write_datetime(r, c, v, datetime_fmt)
+                    elif isinstance(v, date):
+                        ws.write_datetime(r, c, v, date_fmt)
+                    else:
+                        ws.write(r, c, v)
+            if on_sheet:
+                on_sheet(name, ws, book, df)
+    finally:
+        book.close()
+
+
+def write_xlsx(path, sheets: dict, col_widths=None, stream=None, on_sheet=None):
+    """
+    نوشتن یک یا چند دیتافریم در یک فایل اکسل راست‌به‌چپ، در یک گذر.
+      - sheets     : dict{نام شیت → DataFrame} (به همین ترتیب)
+      - col_widths : None | "auto" | dict{نام ستون → عرض}؛ یا dict{نام شیت → یکی از این‌ها}
+      - stream     : True/False؛ None یعنی خودکار (اگر شیتی بیش از STREAM_ROWS ردیف داشت)
+      - on_sheet   : قلاب قالب‌بندی اضافه (name, ws, book, df) — فقط با xlsxwriter
+    """
+    per_sheet = (isinstance(col_widths, dict) and col_widths and
+                 all(isinstance(v, (dict, str, type(None))) for v in col_widths.values()) and
+                 set(col_widths) <= set(sheets))
+    widths = {name: _resolve_widths(df, col_widths.get(name) if per_sheet else col_widths)
+              for name, df in sheets.items()}
+
+    if stream is None:
+        stream = any(len(df) > STREAM_ROWS for df in sheets.values())
+    if stream and _HAS_XLSXWRITER:
+        _write_streaming(path, sheets, widths, on_sheet)
+        return path
+
+    engine = "xlsxwriter" if _HAS_XLSXWRITER else "openpyxl"
+    with pd.ExcelWriter(path, engine=engine) as w:
+        for name, df in sheets.items():
+            df.to_excel(w, index=False, sheet_name=name)
+            ws = w.sheets[name]
+            if engine == "xlsxwriter":
+                ws.right_to_left()
+                for i, width in widths[name].items():
+                    ws.set_column(i, i, width)
+                if on_sheet:
+                    on_sheet(name, ws, w.book, df)
+            else:
+                from openpyxl.utils import get_column_letter
+                ws.sheet_view.rightToLeft = True
+                for i, width in widths[name].items():
+                    ws.column_dimensions[get_column_letter(i + 1)].width = width
+    return path
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+excel_read.py
+==============================
+
+لایهٔ واحد خواندن xlsx برای همهٔ بارگذارها (takhsis، noInstall، ratings، کش اکسل)
+با انتخاب خودکار سریع‌ترین موتور نصب‌شده.
+
+موتورها (به ترتیب ترجیح):
+--------------------------
+- calamine : پارسر Rust (pip install python-calamine؛ pandas ≥ 2.2)؛ چند برابر سریع‌تر از openpyxl.
+- openpyxl : موتور پیش‌فرض pandas؛ همیشه در دسترس.
+
+انتخاب موتور: متغیر محیطی EXCEL_ENGINE (calamine یا openpyxl) اگر آن موتور نصب باشد،
+وگرنه اولین موتور موجود از ENGINES.
+
+سازگاری:
+---------
+- برای ستون‌های یک‌دست، خروجی هر دو موتور dtype یکسان دارد (عدد صحیح → int، اعشاری → float،
+  تاریخ → datetime64، dtype=str همان متن)؛ پارامترهای read_excel (dtype، sheet_name، ...) بدون
+  تغییر داده می‌شوند.
+- تفاوت شناخته‌شده: calamine سلول متنیِ فقط-فاصله را خالی (NaN) می‌خواند و openpyxl همان متن را.
+  این فقط تفاوت مقدار نیست: ستونی با «  » و عدد با openpyxl object و با calamine float64 می‌شود.
+  بارگذارهای این مخزن چنین سلول‌هایی را در هر حال خالی حساب می‌کنند (normalize_text / strip)،
+  ولی کد تازه نباید به dtype چنین ستون‌هایی تکیه کند. کش Parquet (excel_cache) برای هر موتور جداست.
+- در ستون‌های مخلوط (object) تاریخ‌ها با calamine به صورت pd.Timestamp (زیرکلاس datetime) می‌آیند.
+- calamine کل شیت را در حافظه بارگذاری می‌کند؛ برای خواندن چند ستون از فایل‌های خیلی بزرگ
+  xlsx_columns بالاتر از STREAM_ABOVE_MB همان خواندن جریانی را انتخاب می‌کند.
+"""
+
+import importlib.util
+import os
+
+import pandas as pd
+
+ENGINES = ("calamine", "openpyxl")
+ENV_VAR = "EXCEL_ENGINE"
+STREAM_ABOVE_MB = 64   # بالاتر از این اندازه، خواندن چندستونی جریانی (حافظهٔ ثابت) انجام می‌شود
+
+_MODULES = {"calamine": "python_calamine", "openpyxl": "openpyxl"}
+_PANDAS_CALAMINE = tuple(int(p) for p in pd.__version__.split(".")[:2]) >= (2, 2)
+
+
+def _installed(engine: str) -> bool:
+    if engine == "calamine" and not _PANDAS_CALAMINE:
+        return False
+    return importlib.util.find_spec(_MODULES[engine]) is not None
+
+
+def available_engines() -> list:
+    """موتورهای نصب‌شده به ترتیب ترجیح."""
+    return [e for e in ENGINES if _installed(e)]
+
+
+def default_engine() -> str:
+    """موتور انتخابی: EXCEL_ENGINE (اگر نصب باشد) یا سریع‌ترین موتور موجود."""
+    wanted = os.environ.get(ENV_VAR, "").strip().lower()
+    engines = available_engines()
+    if wanted in engines:
+        return wanted
+    return engines[0] if engines else "openpyxl"
+
+
+def read_excel(path, engine: str = None, **read_kwargs) -> pd.DataFrame:
+    """
+    جایگزین pd.read_excel با موتور انتخابی (engine=None → default_engine).
+    """
+    return pd.read_excel(path, engine=engine or default_engine(), **read_kwargs)
+
+
+def excel_file(path, engine: str = None) -> pd.ExcelFile:
+    """
+    جایگزین pd.ExcelFile (خواندن چند شیت از یک فایل) با موتور انتخابی.
+    """
+    return pd.ExcelFile(path, engine=engine or default_engine())
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+jalali.py
+==============================
+
+موتور برداری تاریخ جلالی (سطح روز) برای کل ستون‌ها:
+- day_keys     : ستون تاریخ/تاریخ-زمان → کلید عددی YYYYMMDD (int32)، در یک گذر.
+- ordinals     : کلید جلالی → ordinal میلادی (date.toordinal) با حساب NumPy.
+- days_between : اختلاف روز دو ستون کلید (end - start).
+- format_keys  : کلید → رشتهٔ نمایشی «YYYY/MM/DD» (فقط هنگام خروجی).
+
+قرارداد مقدار خالی:
+--------------------
+مقدار خالی یا نامعتبر (کمتر از ۸ رقم) با NO_DAY = 0 نشان داده می‌شود؛ ordinal آن هم NO_DAY است.
+
+نکات:
+------
+- استخراج کلید همانند منطق قبلی است: همهٔ ارقام (فارسی/عربی/لاتین) پشت‌سرهم و ۸ رقم اول.
+  پارس فقط یک بار برای هر مقدار یکتا انجام می‌شود و با factorize به کل ستون پخش می‌شود.
+- تبدیل به ordinal با فرمول چرخهٔ ۳۳ساله و جدول آفست ماه‌ها انجام می‌شود (بدون تبدیل
+  میلادی سطر به سطر)؛ برای سال‌های ۱۳۰۰ تا ۱۵۰۰ با jdatetime روز به روز یکسان است.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.text import DIGITS
+
+NO_DAY = 0
+
+
+# آفست روزهای ابتدای هر ماه جلالی (ایندکس = شمارهٔ ماه؛ ماه‌های خارج از ۱..۱۲ هم با همان فرمول)
+_MONTH_OFFSET = np.array([(m - 1) * 31 if m < 7 else (m - 7) * 30 + 186 for m in range(100)],
+                         dtype=np.int64)
+# فاصلهٔ شمارش روز فرمول جلالی تا date.toordinal
+_ORDINAL_SHIFT = -355668 - 365
+
+
+def day_keys(values) -> np.ndarray:
+    """
+    استخراج برداری کلید روز جلالی YYYYMMDD از یک ستون (Series/آرایه/لیست).
+    خروجی: آرایهٔ int32 هم‌طول ورودی؛ خالی/نامعتبر → NO_DAY.
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(s)
+    table = np.full(len(uniques) + 1, NO_DAY, dtype=np.int32)  # خانهٔ آخر برای کد -1 (خالی)
+    if len(uniques):
+        digits = (pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+                    .str.translate(DIGITS).str.replace(r"[^0-9]", "", regex=True))
+        ok = (digits.str.len() >= 8).to_numpy(dtype=bool)
+        table[:-1][ok] = digits[ok].str[:8].astype(np.int64).to_numpy()
+    return table[codes]
+
+
+def ordinals(keys) -> np.ndarray:
+    """
+    تبدیل برداری کلید جلالی YYYYMMDD به ordinal میلادی (int32). NO_DAY → NO_DAY.
+    """
+    k = np.asarray(keys, dtype=np.int64)
+    jy = k // 10000 + 1595
+    jm = (k // 100) % 100
+    jd = k % 100
+    out = (365 * jy + (jy // 33) * 8 + ((jy % 33) + 3) // 4 + jd
+           + _MONTH_OFFSET[jm] + _ORDINAL_SHIFT)
+    return np.where(k == NO_DAY, NO_DAY, out).astype(np.int32)
+
+
+def key_to_ordinal(key):
+    """
+    نسخهٔ تک‌مقداری ordinals برای کد سطر به سطر. None → None.
+    """
+    if key is None or key == NO_DAY:
+        return None
+    return int(ordinals([key])[0])
+
+
+def days_between(start_keys, end_keys) -> pd.arrays.IntegerArray:
+    """
+    اختلاف روز (end - start) برای دو ستون کلید. اگر هر کدام خالی باشد → NA.
+    """
+    s = np.asarray(start_keys, dtype=np.int64)
+    e = np.asarray(end_keys, dtype=np.int64)
+    missing = (s == NO_DAY) | (e == NO_DAY)
+    diff = ordinals(e).astype(np.int64) - ordinals(s)
+    return pd.arrays.IntegerArray(np.where(missing, 0, diff), missing)
+
+
+def format_keys(keys) -> np.ndarray:
+    """
+    کلید YYYYMMDD → «YYYY/MM/DD» (آرایهٔ object). NO_DAY → None.
+    هر روز یکتا فقط یک بار قالب‌بندی می‌شود.
+    """
+    k = np.asarray(keys, dtype=np.int64)
+    uniq, inv = np.unique(k, return_inverse=True)
+    labels = np.array([None if u == NO_DAY else f"{u // 10000:04d}/{(u // 100) % 100:02d}/{u % 100:02d}"
+                       for u in uniq.tolist()], dtype=object)
+    return labels[inv.reshape(-1)] if len(k) else np.array([], dtype=object)
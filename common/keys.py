@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+keys.py
+==============================
+
+یکسان‌سازی و فشرده‌سازی کلیدها و ستون‌های کم‌تنوع، یک بار هنگام بارگذاری.
+
+قبلاً «کد پذیرنده» و «سریال پایانه» به صورت رشتهٔ object نگه داشته می‌شدند و در هر مقایسه
+دوباره با astype(str).str.strip() به رشته تبدیل می‌شدند؛ ستون‌هایی مثل «شهر» و «پروژه» هم با
+چند ده مقدار یکتا در صدها هزار ردیف object بودند.
+
+توابع:
+-------
+- canonical_key     : کلید یکسان (ارقام لاتین، بدون فاصله/نیم‌فاصلهٔ ابتدا و انتها، خالی → NaN)
+                      به صورت category متنی با دسته‌های مرتب (کدهای int32/int8 به‌جای رشته در هر ردیف).
+- share_categories  : هم‌سان کردن دستهٔ category چند ستون کلید تا merge روی کدها انجام شود.
+- compact_columns   : تبدیل ستون‌های متنی کم‌تنوع به category.
+- canonicalize      : هر دو کار بالا برای یک دیتافریم (گذر واحد هنگام بارگذاری).
+- argmax_by_key     : ردیف با بیشترین امتیاز در هر کلید، بدون مرتب‌سازی (یک np.maximum.at روی کدها).
+- dedupe_by_key     : یک ردیف برای هر کلید طبق قاعدهٔ اعلام‌شده (ترتیب یا امتیاز + اولین/آخرین)
+                      و شمارش تکراری‌ها.
+- keyed_join        : پیوستن چند جدول جستجو به یک جدول در یک گذر؛ هر جدول اول با dedupe_by_key
+                      یکتا می‌شود (بدون ضرب شدن ردیف‌ها) و تطبیق هر ردیف جدا برمی‌گردد.
+- map_values        : اعمال یک تابع پایتونی فقط یک بار برای هر مقدار یکتا (شامل خالی)؛
+                      جایگزین Series.apply که روی category مقدار خالی را به تابع نمی‌دهد.
+
+نکات:
+------
+- مقدار نوشته‌شده در اکسل خروجی تغییری نمی‌کند (category همان رشته‌ها را می‌نویسد)؛ فقط
+  فاصله‌های اضافهٔ کلیدها حذف و ارقام فارسی لاتین می‌شوند.
+- کلیدها همیشه متنی‌اند، حتی اگر ستون در یک فایل عددی خوانده شود؛ کدهای عددی (و اعشاری مثل
+  «2000418.0» در ستون عددی با خانهٔ خالی) متن «2000418» می‌شوند و با همان کد در فایل‌های دیگر
+  تطبیق می‌خورند.
+- دسته‌ها مرتب‌اند؛ مرتب‌سازی روی ستون category همان ترتیب رشته‌ای قبلی را می‌دهد.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, is_extension_array_dtype
+
+from common.text import DIGITS
+
+CATEGORY_MAX_RATIO = 0.5   # ستون متنی با نسبت مقادیر یکتا کمتر از این، category می‌شود
+
+_EDGE_CHARS = " \t\r\n\u00a0\u200c\u200d\u200e\u200f\ufeff"
+
+
+def _canonical_text(v):
+    if v is None or (isinstance(v, float) and v != v) or v is pd.NA:
+        return np.nan
+    if isinstance(v, (float, np.floating)) and float(v).is_integer():
+        return str(int(v))
+    s = str(v).translate(DIGITS).strip(_EDGE_CHARS)
+    return s if s else np.nan
+
+
+def canonical_key(values: pd.Series) -> pd.Series:
+    """
+    کلید یکسان یک ستون کد (پذیرنده/سریال). هر مقدار یکتا فقط یک بار پردازش می‌شود.
+    """
+    s = values
+    codes, uniques = pd.factorize(s)
+    canon = pd.Series([_canonical_text(u) for u in uniques], dtype=object)
+    cats = pd.Index(sorted(canon.dropna().unique()), dtype=object)
+    table = np.append(cats.get_indexer(canon), -1)  # خانهٔ آخر برای کد -1 (خالی)
+    return pd.Series(pd.Categorical.from_codes(table[codes], categories=cats),
+                     index=s.index, name=s.name)
+
+
+def share_categories(*columns: pd.Series) -> list:
+    """
+    ستون‌های category را روی اجتماع دسته‌ها هم‌سان می‌کند (merge/isin روی کدهای یکسان).
+    ستون‌های غیر category دست‌نخورده برمی‌گردند.
+    """
+    cats = [c for c in columns if isinstance(c.dtype, CategoricalDtype)]
+    if not cats:
+        return list(columns)
+    union = pd.Index(np.concatenate([np.asarray(c.cat.categories, dtype=object) for c in cats])).unique()
+    dtype = CategoricalDtype(union)
+    return [c.astype(dtype) if isinstance(c.dtype, CategoricalDtype) else c for c in columns]
+
+
+def _positions(df: pd.DataFrame, col) -> np.ndarray:
+    """موقعیت ستون(های) هم‌نام در df (ورودی‌های اکسل گاهی هدر تکراری دارند)."""
+    return np.flatnonzero(df.columns == col)
+
+
+def compact_columns(df: pd.DataFrame, cols, max_ratio: float = CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """
+    تبدیل ستون‌های متنی کم‌تنوع به category (فقط ستون‌های موجود و object).
+    """
+    n = len(df)
+    for c in cols:
+        for i in _positions(df, c):
+            col = df.iloc[:, i]
+            if col.dtype == object and n and col.nunique(dropna=True) <= max_ratio * n:
+                df.isetitem(i, col.astype("category"))
+    return df
+
+
+def canonicalize(df: pd.DataFrame, key_cols=(), cat_cols=()) -> pd.DataFrame:
+    """
+    گذر واحد هنگام بارگذاری: کلیدها با canonical_key، ستون‌های کم‌تنوع با compact_columns.
+    """
+    for c in key_cols:
+        for i in _positions(df, c):
+            df.isetitem(i, canonical_key(df.iloc[:, i]))
+    return compact_columns(df, cat_cols)
+
+
+def _key_codes(keys: pd.Series):
+    """(کدهای int هر ردیف با -1 برای خالی، مقادیر یکتای کلید به ترتیب کد)"""
+    if isinstance(keys.dtype, CategoricalDtype):
+        return keys.cat.codes.to_numpy(dtype=np.int64), keys.cat.categories
+    codes, uniques = pd.factorize(keys)
+    return codes.astype(np.int64), uniques
+
+
+def argmax_by_key(keys: pd.Series, score, keep="first") -> np.ndarray:
+    """
+    موقعیت ردیف با بیشترین score (اعداد صحیح نامنفی) برای هر کلید غیرخالی، به ترتیب ردیف‌ها.
+    بدون مرتب‌سازی: امتیاز و موقعیت ردیف در یک عدد int64 ترکیب می‌شوند و بیشینهٔ هر کلید با
+    یک np.maximum.at روی کدهای کلید پیدا می‌شود. تساوی امتیاز: keep="first" اولین ردیف، "last" آخرین.
+    """
+    codes, uniques = _key_codes(keys)
+    n = len(codes)
+    pos = np.arange(n, dtype=np.int64)
+    tie = pos if keep == "last" else n - 1 - pos
+    combined = np.asarray(score, dtype=np.int64) * max(n, 1) + tie
+    valid = codes >= 0
+    best = np.full(len(uniques), -1, dtype=np.int64)
+    np.maximum.at(best, codes[valid], combined[valid])
+    best = best[best >= 0] % max(n, 1)
+    winners = np.zeros(n, dtype=bool)
+    winners[best if keep == "last" else n - 1 - best] = True
+    return np.flatnonzero(winners)
+
+
+def dedupe_by_key(df: pd.DataFrame, key, order_by=None, keep="first", ascending=True):
+    """
+    یک ردیف برای هر کلید: اگر order_by ستون(ها) باشد ردیف‌ها پایدار بر اساس آن مرتب می‌شوند
+    (خالی‌ها اول) و سپس اولین/آخرین ردیف هر کلید (keep) نگه داشته می‌شود؛ اگر آرایهٔ امتیاز
+    (هم‌طول df) باشد، ردیف با بیشترین امتیاز با argmax_by_key و بدون مرتب‌سازی انتخاب می‌شود.
+    ردیف‌های با کلید خالی کنار می‌روند.
+    خروجی: (دیتافریم یکتا، کلیدهای تکراری به صورت Series{کلید → تعداد ردیف})
+    """
+    if isinstance(order_by, np.ndarray):
+        codes, uniques = _key_codes(df[key])
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        many = counts > 1
+        dupes = pd.Series(counts[many], index=pd.Index(np.asarray(uniques)[many]), dtype=np.int64)
+        if len(dupes):
+            return df.iloc[argmax_by_key(df[key], order_by, keep)], dupes
+        return df[codes >= 0], dupes
+    df = df[df[key].notna()]
+    if order_by is not None:
+        df = df.sort_values(order_by, ascending=ascending, kind="stable", na_position="first")
+    counts = df[key].value_counts(sort=False)
+    dupes = counts[counts > 1]
+    if len(dupes):
+        df = df.drop_duplicates(subset=key, keep=keep)
+    return df, dupes
+
+
+def keyed_join(left: pd.DataFrame, key, lookups: dict):
+    """
+    پیوستن (left join) چند جدول جستجو به left روی key در یک گذر، بدون ضرب شدن ردیف‌ها.
+    lookups: dict{نام → (دیتافریم، ستون‌ها یا None برای همهٔ ستون‌های غیر کلید، order_by، keep)}
+      order_by: ستون(ها)ی ترتیب، یا تابع امتیاز (دیتافریم کامل → آرایهٔ صحیح نامنفی؛ بیشترین برنده)
+    هر جدول با dedupe_by_key یکتا می‌شود، موقعیت کلیدهای left یک بار با get_indexer پیدا می‌شود
+    و ستون‌ها با take برداشته می‌شوند (نبود تطبیق → خالی، مثل merge). کلید خالی با هیچ ردیفی
+    تطبیق نمی‌خورد.
+    خروجی: (دیتافریم هم‌طول و هم‌ترتیب left، dict{نام → ماسک بولی تطبیق}،
+            dict{نام → {"keys": کلیدهای تکراری، "rows": ردیف‌های کنارگذاشته، "hit": ردیف‌های left با آن کلیدها}})
+    """
+    out = left.copy()
+    keys = left[key]
+    matched, collisions = {}, {}
+    for name, (df, cols, order_by, keep) in lookups.items():
+        cols = [c for c in df.columns if c != key] if cols is None else [c for c in cols if c in df.columns]
+        if callable(order_by):
+            order_by = order_by(df)
+        table, dupes = dedupe_by_key(df[[key] + cols], key, order_by, keep)
+        if isinstance(keys.dtype, CategoricalDtype) and isinstance(table[key].dtype, CategoricalDtype):
+            keys, lookup_keys = share_categories(keys, table[key])
+        else:
+            lookup_keys = table[key]
+        pos = pd.Index(lookup_keys).get_indexer(keys)
+        pos[keys.isna().to_numpy()] = -1
+        for c in cols:
+            col = table[c]
+            values = col.array if is_extension_array_dtype(col.dtype) else col.to_numpy()
+            out[c] = pd.api.extensions.take(values, pos, allow_fill=True)
+        matched[name] = pos >= 0
+        if len(dupes):
+            collisions[name] = {"keys": len(dupes), "rows": int(dupes.sum() - len(dupes)),
+                                "hit": int(keys.isin(dupes.index).sum())}
+    return out, matched, collisions
+
+
+def map_values(values, func) -> np.ndarray:
+    """
+    func(v) برای هر مقدار یکتا فقط یک بار (مقدار خالی هم با NaN به func داده می‌شود).
+    خروجی: آرایهٔ numpy هم‌طول ورودی (object؛ اگر همهٔ نتیجه‌ها بولی باشند، bool).
+    """
+    codes, uniques = pd.factorize(pd.Series(values) if not isinstance(values, pd.Series) else values)
+    results = [func(u) for u in uniques] + [func(np.nan)]
+    if all(isinstance(r, (bool, np.bool_)) for r in results):
+        table = np.array(results, dtype=bool)
+    else:
+        table = np.empty(len(results), dtype=object)
+        table[:] = results
+    return table[codes]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+options.py
+==============================
+
+تعریف آرگومان‌های خط فرمان هر سه اسکریپت (ratings، takhsis، noinstall) در یک جا، فقط با
+کتابخانهٔ استاندارد؛ هم خود اسکریپت‌ها و هم cli.py (نقطهٔ ورود یکجا) پارسرشان را از اینجا می‌سازند.
+
+چون این ماژول pandas/openpyxl/jdatetime را import نمی‌کند، cli.py می‌تواند --help و خطاهای
+آرگومان را بدون بارگذاری کتابخانه‌های سنگین (و بدون import خود اسکریپت‌ها) فوراً برگرداند.
+
+اجزا:
+------
+- PIPELINES       : نام زیرفرمان → توضیح
+- add_*_args      : افزودن آرگومان‌های هر اسکریپت به یک parser (یا زیرپارسر)؛ add_all_args برای «cli.py all»
+- build_parser    : parser مستقل یک اسکریپت (برای اجرای مستقیم python takhsis.py ...)
+- parse_sinks     : پارس «--sinks parquet,csv,sqlite» (نوشتن در common.sinks)
+"""
+
+import argparse
+
+FORMATS = ("parquet", "csv", "sqlite")
+
+# شیت Archive اکسل noInstall فقط این تعداد ماه اخیر (بر اساس «تاریخ نصب») را نشان می‌دهد؛ 0 = کل آرشیو.
+# نسخهٔ کامل در پوشهٔ install_kheir_archive (یا جدول archive در حالت --sqlite) است؛ دوره‌های قدیمی: --export-archive
+ARCHIVE_MONTHS = 3
+
+PIPELINES = {
+    "ratings":   "به‌روزرسانی مخزن پله‌های درآمد (و rating.xlsx) از فایل پشتیبانی",
+    "takhsis":   "ساخت فایل تخصیص، نصب اولیه‌ها و گزارش تخصیص",
+    "noinstall": "پیگیری نصب‌خیر (install_kheir_output.xlsx)",
+}
+
+
+def parse_sinks(text) -> list:
+    """«parquet,csv» → ["parquet", "csv"]؛ خالی/None → []. قالب ناشناخته → ArgumentTypeError (پیغامش را argparse نشان می‌دهد)."""
+    if not text:
+        return []
+    out = []
+    for name in str(text).split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in FORMATS:
+            raise argparse.ArgumentTypeError(f"قالب خروجی ناشناخته: {name} (مجاز: {', '.join(FORMATS)})")
+        if name not in out:
+            out.append(name)
+    return out
+
+
+def _add_sinks(parser, where: str):
+    parser.add_argument("--sinks", type=parse_sinks, default=[], metavar="FORMATS",
+                        help=f"{where} در قالب‌های ماشینی ({','.join(FORMATS)}؛ با کاما)")
+
+
+def _add_profile(parser, folder: str):
+    parser.add_argument("--profile", nargs="?", const="", metavar="DIR",
+                        help=f"ثبت زمان و حافظهٔ هر مرحله و ذخیرهٔ گزارش JSON/CSV (پیش‌فرض: پوشهٔ {folder})")
+
+
+def add_ratings_args(parser):
+    parser.add_argument("--xlsx", action="store_true",
+                        help="ساخت rating.xlsx از کل مخزن (برای مشاهده؛ takhsis به آن نیازی ندارد)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="ساخت مخزن از صفر، حتی اگر فایل پشتیبانی تغییری نکرده باشد")
+    _add_sinks(parser, "همان جدول rating کنار rating.xlsx")
+    _add_profile(parser, "takhsis")
+    return parser
+
+
+def add_takhsis_args(parser):
+    parser.add_argument("--no-cache", action="store_true",
+                        help="خواندن مستقیم از xlsx بدون استفاده از کش Parquet")
+    _add_profile(parser, "takhsis")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="تعداد پردازه‌های هم‌زمان (خواندن ورودی‌ها / روزهای --batch؛ 1 = ترتیبی؛ پیش‌فرض: تعداد هسته‌ها)")
+    parser.add_argument("--batch", nargs="*", metavar="IN_WAIT",
+                        help="حالت چندروزه: چند فایل in-wait تاریخ‌دار (پیش‌فرض: takhsis/in-wait-*.xlsx)؛ "
+                             "search/last-night/rating یک بار خوانده می‌شوند و برای هر روز سه خروجی ساخته می‌شود")
+    _add_sinks(parser, "خروجی‌های تخصیص و نصب اولیه")
+    parser.add_argument("--watch", action="store_true",
+                        help="پایش پوشهٔ takhsis: ورودی‌ها در حافظه می‌مانند و با هر فایل تازه فقط همان فایل "
+                             "و مراحل وابسته به آن دوباره اجرا می‌شوند (Ctrl+C برای خروج)")
+    return parser
+
+
+def add_noinstall_args(parser):
+    parser.add_argument("--sqlite", action="store_true",
+                        help="نگهداری وضعیت بین اجراها در SQLite (install_kheir_state.sqlite) و نوشتن اکسل فقط به عنوان نما")
+    _add_profile(parser, "noInstall")
+    parser.add_argument("--watch", action="store_true",
+                        help="پایش noInstall/input و ساخت دوبارهٔ خروجی پس از هر دانلود تازه (ورودی‌ها در حافظه می‌مانند؛ Ctrl+C برای خروج)")
+    parser.add_argument("--archive-months", type=int, default=ARCHIVE_MONTHS, metavar="N",
+                        help=f"تعداد ماه‌های اخیر شیت Archive (0 = کل آرشیو؛ پیش‌فرض: {ARCHIVE_MONTHS})")
+    _add_sinks(parser, "همان شیت‌های خروجی کنار اکسل")
+    parser.add_argument("--export-archive", nargs="?", const="", metavar="FROM:TO",
+                        help="فقط خروجی گرفتن از آرشیو یک دوره در archive_<دوره>.xlsx، مثلاً 140401:140406 یا 140403 (بدون مقدار: کل آرشیو)")
+    return parser
+
+
+def add_all_args(parser):
+    """آرگومان‌های «cli.py all» که به هر سه اسکریپت داده می‌شوند (بقیه با مقدار پیش‌فرض)."""
+    _add_sinks(parser, "خروجی‌های هر سه اسکریپت")
+    _add_profile(parser, "هر اسکریپت")
+    return parser
+
+
+ADD_ARGS = {"ratings": add_ratings_args, "takhsis": add_takhsis_args, "noinstall": add_noinstall_args}
+
+
+def build_parser(name: str, parser=None):
+    """parser آرگومان‌های اسکریپت name (اگر parser داده نشود، یک ArgumentParser مستقل)."""
+    if parser is None:
+        parser = argparse.ArgumentParser(description=PIPELINES[name])
+    return ADD_ARGS[name](parser)
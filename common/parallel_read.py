@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+parallel_read.py
+==============================
+
+خواندن هم‌زمان چند فایل اکسل مستقل روی process pool.
+
+پارس xlsx (openpyxl) کاملاً CPU-bound است و به خاطر GIL با نخ (thread) موازی نمی‌شود؛
+اینجا هر فایل در یک پردازهٔ جدا با read_excel_cached خوانده می‌شود و دیتافریم‌ها با هم
+برگردانده می‌شوند. زمان کل تقریباً برابر زمان بزرگ‌ترین فایل می‌شود.
+
+مشخصات ورودی:
+--------------
+specs = {نام: (مسیر، پارامترهای read_excel، اختیاری؟)}
+- پارامترها (مثل dtype) همان‌هایی هستند که به read_excel_cached داده می‌شوند.
+- اختیاری=True: اگر خواندن خطا داد (مثلاً فایل گزارش وجود نداشت) دیتافریم خالی برمی‌گردد؛
+  برای فایل‌های غیراختیاری همان خطا بالا می‌رود.
+
+نکات:
+------
+- فایل‌هایی که کش Parquet معتبر دارند در همین پردازه خوانده می‌شوند (سریع‌تر از راه‌اندازی پردازه).
+- اگر کمتر از دو فایل نیاز به پارس داشته باشند، max_workers=1 باشد، یا pool قابل ساخت نباشد،
+  خواندن ترتیبی انجام می‌شود.
+- در ویندوز پردازه‌ها با spawn ساخته می‌شوند؛ اسکریپت صداکننده باید نقطهٔ ورود
+  if __name__ == "__main__" داشته باشد.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from common.excel_cache import cache_is_fresh, read_excel_cached
+
+
+def _read_one(path, use_cache, read_kwargs):
+    """کار هر پردازه: خواندن یک فایل. خروجی: (دیتافریم، ثانیه)."""
+    t0 = time.perf_counter()
+    df = read_excel_cached(path, use_cache, **read_kwargs)
+    return df, time.perf_counter() - t0
+
+
+def _read_guarded(path, use_cache, read_kwargs, optional):
+    """خواندن ترتیبی با قاعدهٔ فایل اختیاری (خطا → دیتافریم خالی)."""
+    try:
+        return _read_one(path, use_cache, read_kwargs)
+    except Exception:
+        if not optional:
+            raise
+        return pd.DataFrame(), 0.0
+
+
+def read_excels(specs: dict, use_cache: bool = True, max_workers=None, prof=None) -> dict:
+    """
+    خواندن همهٔ فایل‌های specs (هم‌زمان در صورت امکان). خروجی: dict{نام → DataFrame} به ترتیب specs.
+    prof (اختیاری): زمان پارس هر فایل با نام «read <نام>» در Profiler ثبت می‌شود.
+    """
+    for name, (path, _, _) in specs.items():
+        print(f"📂 Reading file {name} in:", path)
+
+    results = {}
+    todo = []
+    for name, (path, kwargs, optional) in specs.items():
+        if use_cache and os.path.exists(path) and cache_is_fresh(path, **kwargs):
+            results[name] = _read_guarded(path, use_cache, kwargs, optional)
+        else:
+            todo.append(name)
+
+    workers = min(len(todo), max_workers or os.cpu_count() or 1)
+    if workers >= 2:
+        # بزرگ‌ترین فایل‌ها اول ارسال می‌شوند تا طولانی‌ترین کار زودتر شروع شود
+        def size(name):
+            path = specs[name][0]
+            return os.path.getsize(path) if os.path.exists(path) else 0
+        todo.sort(key=size, reverse=True)
+        errors = {}
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {name: pool.submit(_read_one, specs[name][0], use_cache, specs[name][1])
+                           for name in todo}
+                for name, fut in futures.items():
+                    try:
+                        results[name] = fut.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        errors[name] = e
+        except (BrokenProcessPool, OSError) as e:
+            # ساخت/اجرای pool ممکن نشد (نه خطای خود فایل‌ها)
+            print(f"   ℹ️ خواندن موازی ممکن نشد ({e})؛ خواندن ترتیبی.")
+        for name, e in errors.items():
+            if not specs[name][2]:
+                raise e
+            results[name] = (pd.DataFrame(), 0.0)
+        todo = [n for n in todo if n not in results]
+
+    for name in todo:
+        path, kwargs, optional = specs[name]
+        results[name] = _read_guarded(path, use_cache, kwargs, optional)
+
+    frames = {}
+    for name in specs:
+        df, seconds = results[name]
+        if prof is not None:
+            prof.record(f"read {name}", seconds, rows_out=len(df))
+        frames[name] = df
+    return frames
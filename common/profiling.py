@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+profiling.py
+==============================
+
+ابزار سبک زمان‌سنجی و حافظه‌سنجی مرحله‌به‌مرحله برای پایپ‌لاین‌ها (ratings، takhsis، noInstall).
+
+نحوه استفاده:
+-------------
+    prof = Profiler("takhsis", enabled=args.profile is not None)
+    with prof.stage("read in-wait") as st:
+        in_wait = read_excel_cached(...)
+        st.rows_out = len(in_wait)
+    ...
+    prof.write_report(out_dir)   # فقط اگر enabled باشد: JSON + CSV
+
+برای هر مرحله ثبت می‌شود:
+-------------------------
+- seconds            : زمان واقعی (wall) مرحله
+- rows_in / rows_out : تعداد ردیف ورودی/خروجی (اختیاری؛ در خود مرحله مقدار می‌گیرد)
+- rss_start_mb / rss_end_mb / peak_rss_mb : حافظهٔ مقیم پردازه در شروع، پایان و بیشینهٔ
+  نمونه‌برداری‌شده در طول مرحله (یک نخ پس‌زمینه هر INTERVAL ثانیه RSS را می‌خواند).
+
+نکات:
+------
+- اگر enabled=False باشد stage هیچ کاری نمی‌کند (بدون نخ، بدون زمان‌سنجی).
+- RSS با psutil (اگر نصب باشد) یا /proc/self/statm خوانده می‌شود؛ در غیر این صورت فقط
+  بیشینهٔ کل پردازه (ru_maxrss) گزارش می‌شود.
+- مراحل تو در تو مجازند؛ بیشینهٔ حافظه برای همهٔ مراحل باز به‌روز می‌شود.
+"""
+
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+INTERVAL = 0.005
+REPORT_FIELDS = ["stage", "seconds", "rows_in", "rows_out",
+                 "rss_start_mb", "rss_end_mb", "peak_rss_mb"]
+
+_MB = 2**20
+
+
+def _make_rss_reader():
+    """انتخاب سریع‌ترین روش خواندن RSS فعلی (بایت)؛ اگر هیچ‌کدام نبود None."""
+    try:
+        import psutil
+        proc = psutil.Process()
+        return lambda: proc.memory_info().rss
+    except ImportError:
+        pass
+    if os.path.exists("/proc/self/statm"):
+        page = os.sysconf("SC_PAGE_SIZE")
+
+        def read_statm():
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * page
+        return read_statm
+    return None
+
+
+def process_peak_rss_mb():
+    """بیشینهٔ RSS کل پردازه تا این لحظه (MB) یا None."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak * (1 if sys.platform == "darwin" else 1024) / _MB, 1)
+
+
+class StageRecord:
+    __slots__ = ("stage", "seconds", "rows_in", "rows_out",
+                 "rss_start_mb", "rss_end_mb", "peak_rss_mb", "_peak")
+
+    def __init__(self, stage, rows_in=None):
+        self.stage = stage
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.seconds = None
+        self.rss_start_mb = self.rss_end_mb = self.peak_rss_mb = None
+        self._peak = 0
+
+    def as_dict(self) -> dict:
+        return {f: getattr(self, f) for f in REPORT_FIELDS}
+
+
+class _NullStage:
+    """مرحلهٔ بی‌اثر برای حالت خاموش؛ مقداردهی rows_in/rows_out را می‌پذیرد و نادیده می‌گیرد."""
+    __slots__ = ("rows_in", "rows_out")
+
+    def __init__(self):
+        self.rows_in = self.rows_out = None
+
+
+class Profiler:
+    def __init__(self, pipeline: str, enabled: bool = False):
+        self.pipeline = pipeline
+        self.enabled = enabled
+        self.records = []
+        self._open = []
+        self._started = datetime.now()
+        self._t0 = time.perf_counter()
+        self._rss = _make_rss_reader() if enabled else None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------- نمونه‌برداری حافظه --------------------
+    def _sample_loop(self):
+        while not self._stop.wait(INTERVAL):
+            rss = self._rss()
+            for rec in list(self._open):
+                if rss > rec._peak:
+                    rec._peak = rss
+
+    def _ensure_sampler(self):
+        if self._thread is None and self._rss is not None:
+            self._thread = threading.Thread(target=self._sample_loop, name="profiler-rss", daemon=True)
+            self._thread.start()
+
+    # -------------------- مراحل --------------------
+    @contextmanager
+    def stage(self, name: str, rows_in=None):
+        """
+        زمان‌سنجی و حافظه‌سنجی یک مرحله. شیء برگشتی ویژگی‌های rows_in/rows_out را می‌پذیرد.
+        """
+        if not self.enabled:
+            yield _NullStage()
+            return
+        self._ensure_sampler()
+        rec = StageRecord(name, rows_in)
+        rss0 = self._rss() if self._rss else None
+        rec._peak = rss0 or 0
+        self._open.append(rec)
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec.seconds = round(time.perf_counter() - t0, 4)
+            self._open.remove(rec)
+            if rss0 is not None:
+                rss1 = self._rss()
+                rec.rss_start_mb = round(rss0 / _MB, 1)
+                rec.rss_end_mb = round(rss1 / _MB, 1)
+                rec.peak_rss_mb = round(max(rec._peak, rss1) / _MB, 1)
+            self.records.append(rec)
+
+    def record(self, name: str, seconds: float, rows_in=None, rows_out=None):
+        """
+        ثبت مرحله‌ای که جای دیگری زمان‌سنجی شده (مثلاً در یک پردازهٔ کارگر)؛ بدون ستون‌های حافظه.
+        """
+        if not self.enabled:
+            return
+        rec = StageRecord(name, rows_in)
+        rec.seconds = round(seconds, 4)
+        rec.rows_out = rows_out
+        self.records.append(rec)
+
+    def wrap(self, name: str = None):
+        """
+        دکوراتور معادل stage؛ اگر خروجی تابع طول داشته باشد (مثل DataFrame) در rows_out ثبت می‌شود.
+        """
+        def deco(fn):
+            label = name or fn.__name__
+
+            def inner(*args, **kwargs):
+                with self.stage(label) as st:
+                    out = fn(*args, **kwargs)
+                    if hasattr(out, "__len__"):
+                        st.rows_out = len(out)
+                    return out
+            inner.__name__ = fn.__name__
+            inner.__doc__ = fn.__doc__
+            return inner
+        return deco
+
+    # -------------------- گزارش --------------------
+    def report(self) -> dict:
+        return {
+            "pipeline": self.pipeline,
+            "started": self._started.isoformat(timespec="seconds"),
+            "argv": sys.argv,
+            "total_seconds": round(time.perf_counter() - self._t0, 4),
+            "process_peak_rss_mb": process_peak_rss_mb(),
+            "stages": [r.as_dict() for r in self.records],
+        }
+
+    def write_report(self, out_dir):
+        """
+        نوشتن گزارش اجرا در out_dir با نام profile-<pipeline>-<زمان>.json/.csv.
+        اگر پروفایل خاموش باشد کاری نمی‌کند. خروجی: (مسیر json، مسیر csv) یا None.
+        """
+        if not self.enabled:
+            return None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        os.makedirs(out_dir, exist_ok=True)
+        rep = self.report()
+        stem = os.path.join(str(out_dir), f"profile-{self.pipeline}-{self._started:%Y%m%d-%H%M%S}")
+        with open(stem + ".json", "w", encoding="utf-8") as f:
+            json.dump(rep, f, ensure_ascii=False, indent=2)
+        with open(stem + ".csv", "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            w.writeheader()
+            w.writerows(rep["stages"])
+        print(f"⏱️ Profile ({rep['total_seconds']:.2f} s): {stem}.json")
+        return stem + ".json", stem + ".csv"
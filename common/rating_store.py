@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+rating_store.py
+==============================
+
+مخزن محلی SQLite برای «پله درآمد» پذیرنده‌ها (خروجی ratings.py، ورودی takhsis.py).
+
+قبلاً ratings.py هر بار rating.xlsx را از صفر از کل فایل پشتیبانی می‌ساخت و takhsis.py همان
+xlsx را فقط برای join یک ستون دوباره پارس می‌کرد. اینجا پله‌ها در یک جدول کلیددار نگهداری
+می‌شوند و هر اجرای ratings فقط پذیرنده‌هایی را که پله‌شان عوض شده upsert می‌کند.
+
+هزینه: فایل پشتیبانیِ بدون تغییر اصلاً خوانده نمی‌شود، ولی هر نسخهٔ تغییرکرده هنوز کامل پارس
+و با کل جدول مقایسه می‌شود (متناسب با اندازهٔ فایل)؛ آنچه متناسب با تغییر روزانه است فقط
+نوشتن‌ها در مخزن است.
+
+جدول‌ها:
+---------
+- ratings : merchant (کد پذیرنده، متن یکسان‌شده با common.keys؛ PRIMARY KEY)، tier (پله یا NULL)،
+            period (نام ستون پله در آخرین فایل منبع، مثلاً «پله درآمد تیر»؛ با عوض شدن دوره برای
+            همهٔ ردیف‌ها به‌روز می‌شود)، updated (زمان آخرین تغییر پله).
+- meta    : نسخهٔ شِما، دورهٔ جاری، امضای فایل منبع (اندازه، mtime، sha256) و زمان آخرین sync.
+
+نکات:
+------
+- اگر امضای فایل پشتیبانی با meta یکی باشد، ratings.py اصلاً فایل را پارس نمی‌کند (is_current).
+  قاعدهٔ امضا مثل excel_cache است: mtime/اندازهٔ یکسان → بدون هش؛ وگرنه مقایسهٔ sha256.
+- پذیرنده‌هایی که در فایل جدید نیستند حذف می‌شوند (معادل ساخت از صفر).
+- takhsis.py با lookup فقط پله‌های پذیرنده‌های in-wait را می‌خواند (جدول موقت + join روی کلید).
+- کل اعمال یک sync در یک تراکنش انجام می‌شود.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from common.excel_cache import file_sha256
+from common.keys import canonical_key
+
+SCHEMA_VERSION = 1
+STORE_NAME = "rating_store.sqlite"
+KEY_COL  = "کد پذیرنده"
+TIER_COL = "پله درآمد"
+
+
+def store_path(folder) -> str:
+    """مسیر مخزن پله‌ها در پوشهٔ takhsis."""
+    return os.path.join(str(folder), STORE_NAME)
+
+
+class RatingStore:
+    """
+    مخزن پله‌ها:
+      path : مسیر فایل SQLite (اگر نبود ساخته می‌شود)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.is_new = self._ensure_schema()
+
+    # -------------------- شِما --------------------
+    def _ensure_schema(self) -> bool:
+        cur = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='meta'")
+        if cur.fetchone() is not None:
+            return False
+        with self.conn:
+            self.conn.execute("CREATE TABLE meta (k TEXT PRIMARY KEY, v TEXT)")
+            self.conn.execute("CREATE TABLE ratings (merchant TEXT PRIMARY KEY, tier INTEGER, "
+                              "period TEXT, updated TEXT) WITHOUT ROWID")
+            self.conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        return True
+
+    def meta(self, key: str):
+        row = self.conn.execute("SELECT v FROM meta WHERE k = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # -------------------- امضای فایل منبع --------------------
+    def is_current(self, source_path) -> bool:
+        """
+        آیا مخزن از همین نسخهٔ فایل منبع ساخته شده است؟ (mtime/اندازه، وگرنه sha256)
+        """
+        if not os.path.exists(source_path) or self.meta("source_sha256") is None:
+            return False
+        st = os.stat(source_path)
+        if (self.meta("source_mtime_ns") == str(st.st_mtime_ns) and
+                self.meta("source_size") == str(st.st_size)):
+            return True
+        return file_sha256(source_path) == self.meta("source_sha256")
+
+    def _set_source(self, source_path):
+        st = os.stat(source_path)
+        items = {"source_path": os.path.abspath(source_path), "source_size": str(st.st_size),
+                 "source_mtime_ns": str(st.st_mtime_ns), "source_sha256": file_sha256(source_path)}
+        self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", items.items())
+
+    # -------------------- خواندن --------------------
+    def load(self) -> pd.DataFrame:
+        """کل پله‌ها مرتب بر اساس کد پذیرنده (ستون‌ها مثل rating.xlsx)."""
+        rows = self.conn.execute("SELECT merchant, tier FROM ratings ORDER BY merchant").fetchall()
+        return self._frame(rows)
+
+    def lookup(self, merchants) -> pd.DataFrame:
+        """
+        پله‌های مجموعه‌ای از کدهای پذیرنده (هر مقدار خام؛ همین‌جا یکسان می‌شود).
+        خروجی: DataFrame[کد پذیرنده، پله درآمد] فقط برای کدهایی که در مخزن هستند.
+        """
+        keys = canonical_key(pd.Series(merchants, dtype=object)).cat.categories
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS q (merchant TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM q")
+            self.conn.executemany("INSERT INTO q VALUES (?)", ((k,) for k in keys))
+        rows = self.conn.execute(
+            "SELECT r.merchant, r.tier FROM q JOIN ratings r ON r.merchant = q.merchant "
+            "ORDER BY r.merchant").fetchall()
+        return self._frame(rows)
+
+    @staticmethod
+    def _frame(rows) -> pd.DataFrame:
+        df = pd.DataFrame.from_records(rows, columns=[KEY_COL, TIER_COL])
+        df[TIER_COL] = df[TIER_COL].astype("Int64")
+        return df
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM ratings").fetchone()[0]
+
+    # -------------------- نوشتن --------------------
+    def sync(self, rating: pd.DataFrame, period: str, source_path, rebuild: bool = False) -> dict:
+        """
+        اعمال پله‌های جدید (یک ردیف به‌ازای هر پذیرنده؛ ستون‌های کد پذیرنده/پله درآمد):
+        فقط ردیف‌های جدید یا با پلهٔ تغییرکرده upsert و پذیرنده‌های حذف‌شده DELETE می‌شوند.
+        rebuild=True: جدول اول خالی می‌شود. خروجی: آمار تغییرات.
+        """
+        new = pd.DataFrame({"merchant": rating[KEY_COL].astype(object),
+                            "tier": rating[TIER_COL].astype("Int64")})
+        new = new[new["merchant"].notna()].drop_duplicates(subset=["merchant"], keep="first")
+        new["merchant"] = new["merchant"].astype(str)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            if rebuild:
+                self.conn.execute("DELETE FROM ratings")
+            old = pd.DataFrame.from_records(
+                self.conn.execute("SELECT merchant, tier FROM ratings").fetchall(), columns=["merchant", "tier"])
+            old["tier"] = old["tier"].astype("Int64")
+            m = new.merge(old, on="merchant", how="left", suffixes=("", "_old"), indicator=True)
+            is_new = (m["_merge"] == "left_only").to_numpy()
+            same = (m["tier"] == m["tier_old"]).fillna(False).to_numpy(dtype=bool) | \
+                   (m["tier"].isna() & m["tier_old"].isna()).to_numpy()
+            changed = m[is_new | ~same]
+            gone = np.setdiff1d(old["merchant"].to_numpy(dtype=object), new["merchant"].to_numpy(dtype=object))
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ratings (merchant, tier, period, updated) VALUES (?, ?, ?, ?)",
+                ((k, None if pd.isna(t) else int(t), period, now)
+                 for k, t in zip(changed["merchant"], changed["tier"])))
+            self.conn.executemany("DELETE FROM ratings WHERE merchant = ?", ((k,) for k in gone))
+            # دورهٔ جدید (مثلاً تیر → مرداد): ردیف‌های بدون تغییر پله هم به همین دوره تعلق دارند
+            self.conn.execute("UPDATE ratings SET period = ? WHERE period IS NOT ?", (period, period))
+            self._set_source(source_path)
+            self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                  [("period", period), ("last_sync", now)])
+        n_new = int(is_new.sum())
+        return {"inserted": n_new, "updated": len(changed) - n_new, "deleted": len(gone),
+                "unchanged": len(new) - len(changed)}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+sinks.py
+==============================
+
+خروجی‌های ماشینی (Parquet، CSV، SQLite) در کنار گزارش‌های اکسل، برای takhsis.py، ratings.py و noInstall.py.
+
+اکسل نمای انسانی می‌ماند؛ ابزارهای دیگر که خروجی‌ها را دوباره بارگذاری می‌کنند به‌جای پارس
+دوبارهٔ xlsx همان دیتافریم‌های همان اجرا را از یک قالب سریع می‌خوانند. قالب‌ها برای هر
+اجرا انتخاب می‌شوند (در اسکریپت‌ها: --sinks parquet,csv,sqlite؛ پارس در common.options).
+
+نام‌گذاری (برای خروجی <پوشه>/<نام>.xlsx با شیت‌های sheets):
+-------------------------------------------------------------
+- parquet : <پوشه>/<نام>.parquet؛ اگر چند شیت باشد <نام>-<شیت>.parquet
+- csv     : همان نام‌ها با پسوند .csv (UTF-8 با BOM تا اکسل هم درست باز کند)
+- sqlite  : یک فایل مشترک <پوشه>/outputs.sqlite؛ جدول <نام> یا <نام>-<شیت> هر بار جایگزین
+            می‌شود و جدول _outputs (جدول، فایل اکسل، شیت، تعداد ردیف، زمان) فهرست خروجی‌هاست.
+
+نکات:
+------
+- فایل‌ها ابتدا موقت نوشته و با os.replace جایگزین می‌شوند (خواننده هیچ‌وقت فایل نیمه‌کاره نمی‌بیند).
+- ستون‌های object با نوع مخلوط (مثلاً عدد و متن، مثل ستون‌های خوانده‌شده از اکسل) برای Parquet
+  به یک نوع واحد درمی‌آیند (parquet_frame)؛ بقیهٔ ستون‌ها (category، عدد، تاریخ) دست‌نخورده‌اند.
+- parquet نیازمند pyarrow است؛ اگر نصب نباشد همان قالب با پیغام رد می‌شود.
+"""
+
+import importlib.util
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from common.options import FORMATS, parse_sinks   # پارس --sinks (بدون pandas) در common.options
+
+SQLITE_NAME = "outputs.sqlite"
+
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def parquet_column(s: pd.Series) -> pd.Series:
+    """
+    نوع قابل ذخیرهٔ یک ستون object در Parquet: بولی، عدد (Int64 اگر همه صحیح)، یا متن.
+    ستون‌های غیر object همان‌طور برمی‌گردند.
+    """
+    if s.dtype != object:
+        return s
+    present = s[s.notna()]
+    if present.empty:
+        return pd.Series(pd.NA, index=s.index, dtype="string")
+    if all(isinstance(v, (bool, np.bool_)) for v in present):
+        return s.astype("boolean")
+    if all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, (bool, np.bool_))
+           for v in present):
+        num = pd.to_numeric(s)
+        whole = num.dropna()
+        return num.astype("Int64") if (whole == np.floor(whole)).all() else num
+    return s.where(s.isna(), s.astype(str)).astype("string")
+
+
+def parquet_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """کپی df با ستون‌های object یکدست‌شده (parquet_column)؛ نام ستون‌ها متن می‌شوند."""
+    return pd.DataFrame({str(c): parquet_column(df.iloc[:, i]) for i, c in enumerate(df.columns)},
+                        index=df.index)
+
+
+def _names(xlsx_path, sheets: dict) -> dict:
+    """{شیت → نام پایه (بدون پسوند)} برای یک خروجی اکسل."""
+    stem = os.path.splitext(os.path.basename(str(xlsx_path)))[0]
+    if len(sheets) == 1:
+        return {name: stem for name in sheets}
+    return {name: f"{stem}-{name}" for name in sheets}
+
+
+def _replace(path, write):
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def write_sinks(xlsx_path, sheets: dict, formats) -> list:
+    """
+    نوشتن همان دیتافریم‌های یک خروجی اکسل در قالب‌های formats (کنار همان فایل اکسل).
+    خروجی: فهرست مقصدها (مسیر فایل، یا «مسیر sqlite#جدول»).
+    """
+    if not formats:
+        return []
+    folder = os.path.dirname(os.path.abspath(str(xlsx_path)))
+    names = _names(xlsx_path, sheets)
+    written = []
+    for fmt in formats:
+        if fmt == "parquet":
+            if not _HAS_PYARROW:
+                print("ℹ️ pyarrow نصب نیست؛ خروجی parquet ساخته نشد. (pip install pyarrow)")
+                continue
+            for sheet, df in sheets.items():
+                path = os.path.join(folder, names[sheet] + ".parquet")
+                _replace(path, lambda p, df=df: parquet_frame(df).to_parquet(p, index=False))
+                written.append(path)
+        elif fmt == "csv":
+            for sheet, df in sheets.items():
+                path = os.path.join(folder, names[sheet] + ".csv")
+                _replace(path, lambda p, df=df: df.to_csv(p, index=False, encoding="utf-8-sig"))
+                written.append(path)
+        elif fmt == "sqlite":
+            db = os.path.join(folder, SQLITE_NAME)
+            now = datetime.now().isoformat(timespec="seconds")
+            conn = sqlite3.connect(db)
+            try:
+                with conn:
+                    conn.execute("CREATE TABLE IF NOT EXISTS _outputs (tbl TEXT PRIMARY KEY, source TEXT, "
+                                 "sheet TEXT, rows INTEGER, written TEXT)")
+                    for sheet, df in sheets.items():
+                        table = names[sheet]
+                        df.to_sql(table, conn, if_exists="replace", index=False)
+                        conn.execute("INSERT OR REPLACE INTO _outputs VALUES (?, ?, ?, ?, ?)",
+                                     (table, os.path.basename(str(xlsx_path)), sheet, len(df), now))
+                        written.append(f"{db}#{table}")
+            finally:
+                conn.close()
+        else:
+            raise ValueError(f"قالب خروجی ناشناخته: {fmt}")
+    return written
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+text.py
+==============================
+
+یکسان‌سازی متن فارسی برای مقایسه‌ها، مشترک بین همهٔ اسکریپت‌ها (ratings، takhsis، noInstall).
+
+قبلاً noInstall هر سلول را جداگانه با normalize_text (چند replace و یک re.sub) از طریق apply
+یکسان می‌کرد و takhsis اصلاً ی/ک و نیم‌فاصله را پیش از مقایسه یکسان نمی‌کرد؛ جدول تبدیل ارقام
+هم در چند ماژول تکرار شده بود.
+
+قاعدهٔ یکسان‌سازی (normalize_text):
+------------------------------------
+- یک translate: حروف عربی → فارسی (ي/ى → ی، ك → ک)، ارقام فارسی/عربی → لاتین، حذف نیم‌فاصله (ZWNJ).
+- یک regex: هر دنبالهٔ فاصله (شامل tab/خط جدید/فاصلهٔ نشکن) → یک فاصله، سپس strip.
+- خالی (NaN/None/NA) → "".
+
+نسخه‌های برداری:
+-----------------
+- normalize_values : متن یکسان‌شدهٔ هر خانهٔ یک ستون؛ کار فقط روی مقادیر یکتا (factorize) انجام
+                     می‌شود و نتیجه با کدها به کل ستون پخش می‌شود (ستون‌های category بدون تبدیل).
+- text_equals      : ماسک بولی «متن یکسان‌شده == target».
+- text_contains    : ماسک بولی «target در متن یکسان‌شده».
+
+نکات:
+------
+- این توابع فقط برای مقایسه‌اند؛ مقدار نوشته‌شده در خروجی‌ها دست‌نخورده می‌ماند.
+- کلیدها (کد پذیرنده/سریال) با common.keys.canonical_key یکسان می‌شوند که همین DIGITS را به کار می‌برد.
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# ارقام فارسی/عربی → لاتین
+DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
+# حروف عربی → فارسی
+LETTERS = str.maketrans({"ي": "ی", "ى": "ی", "ك": "ک"})
+
+_TEXT_TRANS = {**DIGITS, **LETTERS, ord("\u200c"): None}
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1 << 16)
+def _normalize_str(s: str) -> str:
+    return _SPACE_RE.sub(" ", s.translate(_TEXT_TRANS)).strip()
+
+
+def normalize_text(v) -> str:
+    """
+    نرمال‌سازی متن یک سلول: یکسان‌سازی ی/ک و ارقام، حذف نیم‌فاصله، فشرده‌سازی فاصله.
+    (نتیجهٔ هر رشته کش می‌شود؛ برای کل ستون از normalize_values استفاده شود.)
+    """
+    if v is None or v is pd.NA or (isinstance(v, float) and v != v):
+        return ""
+    return _normalize_str(str(v))
+
+
+def _normalize_uniques(values):
+    """(کدها، متن یکسان‌شدهٔ مقادیر یکتا + "" در خانهٔ آخر برای کد -1)"""
+    s = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(s)
+    table = np.empty(len(uniques) + 1, dtype=object)
+    if len(uniques):
+        table[:-1] = (pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+                        .str.translate(_TEXT_TRANS).str.replace(_SPACE_RE, " ", regex=True)
+                        .str.strip().to_numpy(dtype=object))
+    table[-1] = ""
+    return codes, table
+
+
+def normalize_values(values) -> np.ndarray:
+    """متن یکسان‌شدهٔ هر خانهٔ ستون (آرایهٔ object هم‌طول ورودی؛ خالی → "")."""
+    codes, table = _normalize_uniques(values)
+    return table[codes]
+
+
+def text_equals(values, target: str) -> np.ndarray:
+    """ماسک بولی: متن یکسان‌شدهٔ هر خانه برابر target یکسان‌شده است."""
+    codes, table = _normalize_uniques(values)
+    return (table == normalize_text(target))[codes]
+
+
+def text_contains(values, target: str) -> np.ndarray:
+    """ماسک بولی: target یکسان‌شده در متن یکسان‌شدهٔ هر خانه آمده است."""
+    codes, table = _normalize_uniques(values)
+    t = normalize_text(target)
+    return np.fromiter((t in s for s in table), dtype=bool, count=len(table))[codes]
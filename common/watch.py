@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+watch.py
+==============================
+
+حالت «پایش پوشه» (--watch) برای takhsis و noInstall: اسکریپت باز می‌ماند، ورودی‌های پارس‌شده و
+ایندکس‌ها در حافظه گرم می‌مانند و با هر فایل تازه فقط همان فایل دوباره خوانده می‌شود و فقط
+مراحلی که به آن وابسته‌اند دوباره اجرا می‌شوند.
+
+اجزا:
+------
+- FolderWatcher : پایش چند مسیر مشخص با polling (فقط کتابخانهٔ استاندارد؛ بدون watchdog).
+                  امضای هر فایل (mtime، اندازه یا «نبود») هر POLL_SECONDS خوانده می‌شود؛ تغییرات
+                  فقط وقتی گزارش می‌شوند که هیچ فایل پایش‌شده‌ای SETTLE_SECONDS تغییر نکرده باشد
+                  (دانلود چند فایل پشت‌سرهم → یک اجرا، نه خواندن فایل نیمه‌کاره).
+- StageGraph    : گراف مراحل با وابستگی‌ها؛ خروجی هر مرحله نگه داشته می‌شود و invalidate فقط
+                  مرحله‌های پایین‌دست ورودی‌های تغییرکرده را باطل می‌کند.
+- watch_loop    : حلقهٔ اصلی (اجرای اول + اجرای دوباره پس از هر تغییر؛ Ctrl+C برای خروج).
+
+نکات:
+------
+- فقط نام‌های مشخص پایش می‌شوند؛ فایل‌های موقت دانلود (.crdownload، .part) و قفل اکسل (~$) دیده
+  نمی‌شوند و فایل وقتی دیده می‌شود که با نام نهایی ذخیره شده باشد.
+- اگر یک اجرا خطا بدهد (مثلاً فایل هنوز کامل کپی نشده یا ستونی کم است) خطا چاپ می‌شود، مراحل
+  ناموفق باطل می‌مانند و با تغییر بعدی فایل‌ها دوباره اجرا می‌شوند.
+"""
+
+import os
+import time
+
+POLL_SECONDS = 2.0
+SETTLE_SECONDS = 5.0
+
+
+def file_signature(path):
+    """امضای فایل برای تشخیص تغییر: (mtime_ns، اندازه) یا None اگر فایل نباشد."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FolderWatcher:
+    """
+    پایش مسیرها:
+      paths  : dict{نام → مسیر}
+      settle : ثانیه‌های بدون تغییر لازم پیش از گزارش تغییرات
+    """
+
+    def __init__(self, paths: dict, settle: float = SETTLE_SECONDS):
+        self.paths = dict(paths)
+        self.settle = settle
+        self._seen = self._snapshot()
+        self._changed = set()
+        self._last_change = None
+
+    def _snapshot(self) -> dict:
+        return {name: file_signature(path) for name, path in self.paths.items()}
+
+    def poll(self) -> set:
+        """
+        یک بار بررسی امضاها. خروجی: نام فایل‌های تغییرکرده (پس از آرام شدن پوشه) یا مجموعهٔ خالی.
+        """
+        now = self._snapshot()
+        moved = {name for name, sig in now.items() if sig != self._seen.get(name)}
+        self._seen = now
+        if moved:
+            self._changed |= moved
+            self._last_change = time.monotonic()
+            return set()
+        if self._changed and time.monotonic() - self._last_change >= self.settle:
+            changed, self._changed = self._changed, set()
+            return changed
+        return set()
+
+
+class StageGraph:
+    """
+    مراحل با وابستگی: add(نام، تابع، وابستگی‌ها)؛ تابع خروجی وابستگی‌ها را به همان ترتیب می‌گیرد.
+    prof (اختیاری): زمان هر اجرای مرحله با نام «watch <مرحله>» ثبت می‌شود.
+    """
+
+    def __init__(self, prof=None):
+        self.prof = prof
+        self._nodes = {}
+        self._values = {}
+
+    def add(self, name: str, func, deps=()):
+        self._nodes[name] = (func, tuple(deps))
+        return self
+
+    def downstream(self, names) -> set:
+        """نام‌ها و همهٔ مرحله‌هایی که (مستقیم یا غیرمستقیم) به آن‌ها وابسته‌اند."""
+        out = set(names)
+        grew = True
+        while grew:
+            grew = False
+            for name, (_, deps) in self._nodes.items():
+                if name not in out and out.intersection(deps):
+                    out.add(name)
+                    grew = True
+        return out
+
+    def invalidate(self, names) -> set:
+        """باطل کردن نام‌ها و پایین‌دست‌هایشان. خروجی: مجموعهٔ مراحل باطل‌شده."""
+        stale = self.downstream(names)
+        for name in stale:
+            self._values.pop(name, None)
+        return stale
+
+    def get(self, name: str):
+        """خروجی مرحله (از حافظه، یا با اجرای خودش و وابستگی‌های باطل‌شده)."""
+        if name in self._values:
+            return self._values[name]
+        func, deps = self._nodes[name]
+        args = [self.get(d) for d in deps]
+        t0 = time.perf_counter()
+        value = func(*args)
+        seconds = time.perf_counter() - t0
+        print(f"   🔄 {name} ({seconds:.1f} s)")
+        if self.prof is not None:
+            self.prof.record(f"watch {name}", seconds,
+                             rows_out=len(value) if hasattr(value, "__len__") else None)
+        self._values[name] = value
+        return value
+
+
+def watch_loop(paths: dict, graph: StageGraph, targets, on_done=None,
+               poll: float = POLL_SECONDS, settle: float = SETTLE_SECONDS):
+    """
+    اجرای targets یک بار، سپس پس از هر تغییر فایل‌های paths (نام فایل = نام مرحلهٔ ورودی در graph)
+    فقط مراحل پایین‌دست را دوباره اجرا می‌کند. on_done(ثانیه) پس از هر اجرای موفق صدا زده می‌شود.
+    تا Ctrl+C ادامه دارد.
+    """
+    watcher = FolderWatcher(paths, settle)
+    names = ", ".join(paths)
+    print(f"👀 Watching ({names}); Ctrl+C برای خروج")
+
+    def run():
+        t0 = time.perf_counter()
+        try:
+            for target in targets:
+                graph.get(target)
+        except Exception as e:
+            print("❌ Error:", e)
+            print("   ⏳ منتظر تغییر بعدی فایل‌ها ...")
+            return
+        if on_done is not None:
+            on_done(time.perf_counter() - t0)
+
+    try:
+        run()
+        while True:
+            time.sleep(poll)
+            changed = watcher.poll()
+            if not changed:
+                continue
+            print("\n📥 Changed: " + ", ".join(sorted(changed)))
+            graph.invalidate(changed)
+            run()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
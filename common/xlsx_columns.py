@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+xlsx_columns.py
+==============================
+
+خواندن جریانی (streaming) فقط چند ستون از یک شیت xlsx سنگین.
+
+pd.read_excel کل شیت را (همهٔ ستون‌ها) به اشیای پایتون تبدیل می‌کند، حتی اگر بعداً فقط
+دو ستون لازم باشد. این ماژول XML شیت را مستقیماً از داخل فایل zip با iterparse می‌خواند:
+- ردیف اول (هدر) کامل خوانده می‌شود تا ستون‌ها با نام پیدا شوند.
+- از ردیف‌های بعدی فقط سلول‌های ستون‌های خواسته‌شده مقدار می‌گیرند؛ بقیهٔ سلول‌ها
+  بدون تبدیل مقدار رد می‌شوند و عناصر XML بلافاصله آزاد می‌شوند (حافظهٔ ثابت).
+
+سازگاری با pd.read_excel:
+-------------------------
+- اعداد صحیح به int و بقیه به float تبدیل می‌شوند؛ سلول خطا → NaN؛ رشتهٔ خالی → None.
+- ردیف‌های خالی میانی (حتی اگر در XML نیامده باشند) به صورت ردیف تهی حفظ می‌شوند؛
+  ردیف‌های خالی انتهای شیت حذف می‌شوند.
+- تبدیل تاریخ‌های عددی (استایل تاریخ) انجام نمی‌شود؛ برای ستون‌های کد/متن در نظر گرفته شده.
+
+موتور:
+------
+اگر موتور انتخابی common.excel_read «calamine» باشد و فایل از STREAM_ABOVE_MB کوچک‌تر باشد،
+ردیف‌ها با python-calamine (Rust) پیمایش می‌شوند که چند برابر سریع‌تر است ولی کل شیت را در
+حافظه نگه می‌دارد؛ برای فایل‌های بزرگ‌تر یا بدون calamine، همان خواندن جریانی XML.
+مقدارها در هر دو مسیر یکسان‌اند (عدد صحیح int، رشتهٔ خالی None).
+"""
+
+import os
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+from common.excel_read import STREAM_ABOVE_MB, default_engine
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL  = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG  = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_COL_RE = re.compile(r"[A-Z]+")
+
+
+def col_index(letters: str) -> int:
+    """
+    تبدیل حروف ستون اکسل (A, B, ..., AY) به ایندکس صفر-مبنا.
+    """
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n - 1
+
+
+def _sheet_xml_path(zf: zipfile.ZipFile, sheet_name: str) -> str:
+    """
+    یافتن مسیر XML شیت بر اساس نام آن (workbook.xml + rels).
+    """
+    wb = ET.fromstring(zf.read("xl/workbook.xml"))
+    rid = None
+    for sh in wb.iter(f"{NS_MAIN}sheet"):
+        if sh.get("name") == sheet_name:
+            rid = sh.get(f"{NS_REL}id")
+            break
+    if rid is None:
+        raise ValueError(f"شیت «{sheet_name}» در فایل پیدا نشد.")
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(f"{NS_PKG}Relationship"):
+        if rel.get("Id") == rid:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise ValueError(f"مسیر شیت «{sheet_name}» در workbook.xml.rels پیدا نشد.")
+
+
+def _shared_strings(zf: zipfile.ZipFile) -> list:
+    """
+    جدول رشته‌های مشترک (sharedStrings.xml). متن‌های آوایی (rPh) نادیده گرفته می‌شوند.
+    """
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    out = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == f"{NS_MAIN}si":
+                t = el.find(f"{NS_MAIN}t")
+                if t is not None:
+                    out.append(t.text or "")
+                else:
+                    out.append("".join(x.text or "" for x in el.findall(f"{NS_MAIN}r/{NS_MAIN}t")))
+                el.clear()
+    return out
+
+
+def _cell_value(c, sst):
+    """
+    مقدار یک سلول <c> به سبک openpyxl/pandas.
+    """
+    t = c.get("t", "n")
+    if t == "inlineStr":
+        is_ = c.find(f"{NS_MAIN}is")
+        return None if is_ is None else ("".join(x.text or "" for x in is_.iter(f"{NS_MAIN}t")) or None)
+    v = c.find(f"{NS_MAIN}v")
+    if v is None or v.text is None:
+        return None
+    txt = v.text
+    if t == "s":
+        return sst[int(txt)] or None
+    if t in ("str", "d"):
+        return txt or None
+    if t == "b":
+        return bool(int(txt))
+    if t == "e":
+        return float("nan")
+    num = float(txt)
+    return int(num) if num.is_integer() else num
+
+
+def _find_wanted(header: dict, sheet_name: str, names, positions) -> list:
+    """ایندکس ستون‌های خواسته‌شده از روی هدر؛ اگر نام/موقعیتی نبود ValueError/IndexError."""
+    wanted = []
+    for n in names:
+        idx = next((i for i in sorted(header) if header[i] == n), None)
+        if idx is None:
+            raise ValueError(f"ستون لازم پیدا نشد: {n}")
+        wanted.append(idx)
+    for p in positions:
+        if p not in header and (not header or p > max(header)):
+            raise IndexError(f"ستون شماره {p} در هدر شیت «{sheet_name}» وجود ندارد.")
+        wanted.append(p)
+    return wanted
+
+
+def _calamine_value(v):
+    """مقدار سلول calamine به همان شکل _cell_value (float صحیح → int، رشتهٔ خالی → None)."""
+    if isinstance(v, float):
+        return int(v) if v.is_integer() else v
+    if isinstance(v, str):
+        return v or None
+    return v
+
+
+def _read_calamine(path, sheet_name: str, names, positions):
+    """معادل مسیر جریانی با python-calamine. خروجی: (header، wanted، columns)."""
+    from python_calamine import CalamineWorkbook
+
+    wb = CalamineWorkbook.from_path(str(path))
+    if sheet_name not in wb.sheet_names:
+        raise ValueError(f"شیت «{sheet_name}» در فایل پیدا نشد.")
+    sheet = wb.get_sheet_by_name(sheet_name)
+    offset = sheet.start[1] if sheet.start else 0   # ستون‌های خالی ابتدای شیت در ردیف‌ها نمی‌آیند
+
+    header, wanted, columns = None, [], None
+    blanks = 0
+    for row in sheet.iter_rows():
+        if header is None:
+            if all(v == "" for v in row):
+                continue
+            header = {offset + i: _calamine_value(v) for i, v in enumerate(row) if v != ""}
+            wanted = _find_wanted(header, sheet_name, names, positions)
+            columns = {i: [] for i in wanted}
+            continue
+        if all(v == "" for v in row):
+            blanks += 1
+            continue
+        for i in columns:
+            j = i - offset
+            columns[i].extend([None] * blanks)
+            columns[i].append(_calamine_value(row[j]) if 0 <= j < len(row) else None)
+        blanks = 0
+    return header, wanted, columns
+
+
+def read_xlsx_columns(path, sheet_name: str, names=(), positions=(), engine: str = None):
+    """
+    خواندن جریانی ستون‌های مشخص از یک شیت.
+      - names     : نام ستون‌ها در ردیف هدر (اولین تطابق).
+      - positions : ایندکس صفر-مبنای ستون‌ها (مثل AY).
+      - engine    : "calamine" یا "stream"؛ None → calamine اگر موتور انتخابی باشد و فایل کوچک‌تر از
+                    STREAM_ABOVE_MB، وگرنه stream.
+    خروجی: (DataFrame با یک ستون به‌ازای هر نام/موقعیت به ترتیب ورودی، dict{نام یا موقعیت → نام هدر})
+    اگر نام/موقعیتی در هدر نباشد: ValueError/IndexError.
+    """
+    if engine is None:
+        small = os.path.getsize(path) <= STREAM_ABOVE_MB * 2**20
+        engine = "calamine" if default_engine() == "calamine" and small else "stream"
+    if engine == "calamine":
+        header, wanted, columns = _read_calamine(path, sheet_name, names, positions)
+    else:
+        header, wanted, columns = _read_stream(path, sheet_name, names, positions)
+
+    if header is None:
+        raise ValueError(f"شیت «{sheet_name}» خالی است.")
+    keys = list(names) + list(positions)
+    labels = {k: (header.get(i) if header.get(i) is not None else f"Unnamed: {i}")
+              for k, i in zip(keys, wanted)}
+    df = pd.DataFrame({labels[k]: columns[i] for k, i in zip(keys, wanted)})
+    return df, labels
+
+
+def _read_stream(path, sheet_name: str, names, positions):
+    """خواندن جریانی XML شیت (حافظهٔ ثابت). خروجی: (header، wanted، columns)."""
+    with zipfile.ZipFile(path) as zf:
+        sheet_path = _sheet_xml_path(zf, sheet_name)
+        sst = _shared_strings(zf)
+
+        header = None
+        last_r = 0         # شمارهٔ آخرین ردیف دیده‌شده
+        blanks = 0         # ردیف‌های خالی در انتظار (فقط اگر ردیف مقدارداری بعدشان بیاید ثبت می‌شوند)
+        wanted = []        # ایندکس ستون‌ها به ترتیب خروجی
+        columns = None     # dict[col_idx] = list
+        sheet_data = None
+        with zf.open(sheet_path) as f:
+            for ev, el in ET.iterparse(f, events=("start", "end")):
+                if ev == "start":
+                    if el.tag == f"{NS_MAIN}sheetData":
+                        sheet_data = el
+                    continue
+                if el.tag != f"{NS_MAIN}row":
+                    continue
+                r = el.get("r")
+                r = int(r) if r else last_r + 1
+                if header is None:
+                    last_r = r
+                    header = {}
+                    pos = -1
+                    for c in el.iter(f"{NS_MAIN}c"):
+                        ref = c.get("r")
+                        pos = col_index(_COL_RE.match(ref).group()) if ref else pos + 1
+                        header[pos] = _cell_value(c, sst)
+                    wanted = _find_wanted(header, sheet_name, names, positions)
+                    columns = {i: [] for i in wanted}
+                    sheet_data.clear()
+                    continue
+
+                vals = {}
+                has_value = False
+                pos = -1
+                for c in el.iter(f"{NS_MAIN}c"):
+                    ref = c.get("r")
+                    pos = col_index(_COL_RE.match(ref).group()) if ref else pos + 1
+                    if pos in columns:
+                        vals[pos] = _cell_value(c, sst)
+                        has_value = has_value or vals[pos] is not None
+                    elif not has_value:
+                        has_value = (c.find(f"{NS_MAIN}v") is not None or
+                                     c.find(f"{NS_MAIN}is") is not None)
+                blanks += r - last_r - 1
+                last_r = r
+                if has_value:
+                    for i in columns:
+                        columns[i].extend([None] * blanks)
+                        columns[i].append(vals.get(i))
+                    blanks = 0
+                else:
+                    blanks += 1
+                sheet_data.clear()  # ردیف پردازش‌شده از درخت حذف می‌شود (حافظهٔ ثابت)
+    return header, wanted, columns
@@ -3,22 +3,28 @@
 import os
 import re
 import pandas as pd
-from openpyxl import load_workbook
 from openpyxl.utils.cell import column_index_from_string
 
+from common.excel_out import write_xlsx
+from common.keys import canonical_key
+from common.options import build_parser
+from common.profiling import Profiler
+from common.rating_store import RatingStore, store_path
+from common.sinks import write_sinks
+from common.text import normalize_text
+from common.xlsx_columns import read_xlsx_columns
+
 # مسیرها
 home = os.path.expanduser("~")
 desktop = os.path.join(home, "Desktop")
 takhsis_dir = os.path.join(desktop, "takhsis")
 support_path = os.path.join(desktop, "فایل پشتیبانی.xlsx")  # فایل سنگین روی دسکتاپ
-rating_out = os.path.join(takhsis_dir, "rating.xlsx")       # خروجی داخل پوشه takhsis
+rating_out = os.path.join(takhsis_dir, "rating.xlsx")       # خروجی اختیاری (--xlsx) داخل پوشه takhsis
+rating_db = store_path(takhsis_dir)                         # مخزن پله‌ها که takhsis.py مستقیم می‌خواند
 
 SHEET_NAME = "File"
 AY_INDEX_0 = column_index_from_string("AY") - 1  # ایندکس صفر-پایه ستون AY
 
-# تبدیل ارقام فارسی/عربی به لاتین
-TRANS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
-
 WORDS_MAP = {
     "پله اول": 1, "پله یکم": 1, "پله یک": 1, "اول": 1, "یکم": 1, "یک": 1, "۱": 1, "1": 1,
     "پله دوم": 2, "دوم": 2, "دو": 2, "۲": 2, "2": 2,
@@ -28,56 +34,108 @@ WORDS_MAP = {
     "پله ششم": 6, "ششم": 6, "شش": 6, "۶": 6, "6": 6,
 }
 
+# همهٔ املاهای WORDS_MAP در یک الگوی واحد؛ طولانی‌ترها اول تا مثلاً «پله دوم» پیش از «دو» تطبیق شود
+WORDS_RE = re.compile("|".join(re.escape(k) for k in sorted(WORDS_MAP, key=len, reverse=True)))
+DIGIT_RE = re.compile(r"\b([1-6])\b")
+
 def parse_rank(val):
     if pd.isna(val):
         return pd.NA
-    s = str(val).strip()
-    s = s.translate(TRANS)
-    s = re.sub(r"\\s+", " ", s)
-    m = re.search(r"\\b([1-6])\\b", s)
+    s = normalize_text(val)   # ارقام لاتین، ی/ک فارسی، فاصله‌های یکسان
+    m = DIGIT_RE.search(s)
     if m:
         return int(m.group(1))
-    for k, v in WORDS_MAP.items():
-        if k in s:
-            return v
+    m = WORDS_RE.search(s)
+    if m:
+        return WORDS_MAP[m.group(0)]
     return pd.NA
 
-print("📂 Reading support file:", support_path)
-df = pd.read_excel(support_path, sheet_name=SHEET_NAME, dtype={"کد پذیرنده": str})
-
-# چک طول ستون‌ها
-if AY_INDEX_0 >= len(df.columns):
-    raise IndexError("ستون AY در شیت File پیدا نشد یا تعداد ستون‌ها کمتر از AY است.")
-
-income_col_name = df.columns[AY_INDEX_0]  # نام واقعی ستون «پله درآمد» دوره جاری (مثلاً پله درآمد تیر)
-
-needed = ["کد پذیرنده", income_col_name]
-for c in needed:
-    if c not in df.columns:
-        raise ValueError(f"ستون لازم پیدا نشد: {c}")
-
-rating = df[needed].copy().rename(columns={income_col_name: "پله درآمد"})
-rating["پله درآمد"] = rating["پله درآمد"].apply(parse_rank).astype("Int64")
-
-# بهترین پله برای هر پذیرنده (بالاترین)
-rating_clean = (
-    rating.sort_values(["کد پذیرنده", "پله درآمد"], ascending=[True, False])
-          .drop_duplicates(subset=["کد پذیرنده"], keep="first")
-          .reset_index(drop=True)
-)
-
-# ذخیره خروجی
-os.makedirs(takhsis_dir, exist_ok=True)
-rating_clean.to_excel(rating_out, index=False)
-
-# راست‌به‌چپ کردن
-wb = load_workbook(rating_out)
-ws = wb.active
-try:
-    ws.sheet_view.rightToLeft = True
-except Exception:
-    pass
-wb.save(rating_out)
-
-print("✅ rating.xlsx ساخته شد:", rating_out)
-print("   ردیف‌ها (کل/یکتا):", len(rating), "/", len(rating_clean))
+def parse_rank_column(col: pd.Series) -> pd.Series:
+    """
+    parse_rank برداری: هر مقدار یکتا فقط یک بار پارس می‌شود و نتیجه با factorize به کل ستون پخش می‌شود.
+    (ستون واقعی چند ده املای متفاوت در صدها هزار ردیف دارد.)
+    """
+    codes, uniques = pd.factorize(col)
+    # آخرین خانه NA است تا کد -1 (مقادیر خالی) مستقیماً به آن اشاره کند
+    table = pd.array([parse_rank(u) for u in uniques] + [pd.NA], dtype="Int64")
+    return pd.Series(table[codes], index=col.index, name=col.name)
+
+def run(args):
+    """
+    به‌روزرسانی مخزن پله‌ها (و خروجی‌های اختیاری) با آرگومان‌های پارس‌شدهٔ common.options.
+    خروجی: جدول پله‌های تازه‌پارس‌شده (برای cli.py all که آن را مستقیم به takhsis می‌دهد)،
+    یا None اگر فایل پشتیبانی تغییری نکرده بود و پارس نشد.
+    """
+    prof = Profiler("ratings", enabled=args.profile is not None)
+    os.makedirs(takhsis_dir, exist_ok=True)
+    store = RatingStore(rating_db)
+
+    # فایل پشتیبانی همان نسخهٔ قبلی است → بدون پارس، مخزن به‌روز است
+    if not args.rebuild and store.is_current(support_path):
+        print("✅ فایل پشتیبانی تغییری نکرده؛ مخزن پله‌ها به‌روز است:", rating_db)
+        if args.xlsx or args.sinks:
+            rating_all = store.load()
+        if args.xlsx:
+            with prof.stage("write rating", rows_in=len(rating_all)):
+                write_xlsx(rating_out, {"Sheet1": rating_all})
+            print("✅ rating.xlsx ساخته شد:", rating_out)
+        if args.sinks:
+            with prof.stage("write sinks", rows_in=len(rating_all)):
+                write_sinks(rating_out, {"Sheet1": rating_all}, args.sinks)
+            print("🧩 خروجی‌های ماشینی rating:", ", ".join(args.sinks))
+        store.close()
+        prof.write_report(args.profile or takhsis_dir)
+        return None
+
+    print("📂 Reading support file:", support_path)
+    # خواندن جریانی فقط دو ستون لازم (کد پذیرنده + ستون AY)؛ بقیهٔ ستون‌های شیت File پارس نمی‌شوند.
+    # اگر ستون AY یا «کد پذیرنده» در هدر نباشد، IndexError/ValueError می‌دهد.
+    with prof.stage("read support") as st:
+        df, labels = read_xlsx_columns(support_path, SHEET_NAME,
+                                       names=["کد پذیرنده"], positions=[AY_INDEX_0])
+        st.rows_out = len(df)
+
+    income_col_name = labels[AY_INDEX_0]  # نام واقعی ستون «پله درآمد» دوره جاری (مثلاً پله درآمد تیر)
+
+    # کلید متنی یکسان (مثل dtype=str، بدون فاصلهٔ اضافه و با ارقام لاتین؛ خالی‌ها NaN) به صورت category
+    df["کد پذیرنده"] = canonical_key(df["کد پذیرنده"])
+
+    rating = df.rename(columns={income_col_name: "پله درآمد"})
+    with prof.stage("parse tiers", rows_in=len(rating)):
+        rating["پله درآمد"] = parse_rank_column(rating["پله درآمد"])
+
+    # بهترین پله برای هر پذیرنده (بالاترین)
+    with prof.stage("best tier per merchant", rows_in=len(rating)) as st:
+        rating_clean = (
+            rating.sort_values(["کد پذیرنده", "پله درآمد"], ascending=[True, False])
+                  .drop_duplicates(subset=["کد پذیرنده"], keep="first")
+                  .reset_index(drop=True)
+        )
+        st.rows_out = len(rating_clean)
+
+    # فقط پذیرنده‌های جدید/تغییرکرده در مخزن upsert می‌شوند
+    with prof.stage("sync store", rows_in=len(rating_clean)) as st:
+        stats = store.sync(rating_clean, income_col_name, support_path, rebuild=args.rebuild)
+        st.rows_out = stats["inserted"] + stats["updated"]
+    print("🗄️ مخزن پله‌ها:", rating_db, stats)
+
+    # ذخیره خروجی اکسل (اختیاری؛ راست‌به‌چپ در همان نوشتن اول)
+    if args.xlsx:
+        with prof.stage("write rating", rows_in=len(rating_clean)):
+            write_xlsx(rating_out, {"Sheet1": rating_clean})
+        print("✅ rating.xlsx ساخته شد:", rating_out)
+    if args.sinks:
+        with prof.stage("write sinks", rows_in=len(rating_clean)):
+            write_sinks(rating_out, {"Sheet1": rating_clean}, args.sinks)
+        print("🧩 خروجی‌های ماشینی rating:", ", ".join(args.sinks))
+    store.close()
+
+    print("   ردیف‌ها (کل/یکتا):", len(rating), "/", len(rating_clean))
+    prof.write_report(args.profile or takhsis_dir)
+    return rating_clean
+
+def main(argv=None):
+    return run(build_parser("ratings").parse_args(argv))
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,117 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
+import numpy as np
 import os
-from openpyxl import load_workbook, Workbook
+import re
+import sys
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from openpyxl import Workbook
 from openpyxl.worksheet.views import SheetView
 from datetime import datetime
 import jdatetime
 
-# TODO: use better method for last-night duplicate deletion
-# TODO: speed up search.xlsx loading time
-
-# تاریخ شمسی برای افزودن به نام فایل‌ها
-today_jalali = jdatetime.date.today().strftime("%y%m%d")
+# ماژول‌های مشترک در ریشهٔ مخزن
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common import jalali
+from common.excel_cache import read_excel_cached
+from common.excel_out import write_xlsx
+from common.keys import canonicalize, keyed_join, map_values, share_categories
+from common.options import build_parser
+from common.parallel_read import read_excels
+from common.profiling import Profiler
+from common.rating_store import RatingStore, store_path
+from common.sinks import write_sinks
+from common.text import DIGITS, normalize_values, text_equals
+from common.watch import StageGraph, watch_loop
 
 # مسیر پوشه takhsis روی دسکتاپ هر کاربر
 user_desktop = os.path.join(os.path.expanduser("~"), "Desktop", "takhsis")
 
-in_wait_path = os.path.join(user_desktop, "in-wait.xlsx")
-last_night_path = os.path.join(user_desktop, "last-night.xlsx")
-search_path = os.path.join(user_desktop, "search.xlsx")
-report_day_path = os.path.join(user_desktop, "takhsisReport.xlsx")
-report_month_path = os.path.join(user_desktop, "takhsisReport-m.xlsx")
-rating_path = os.path.join(user_desktop, "rating.xlsx")
-
-# --- بارگذاری فایل‌ها ---
-print("📂 Reading file in-wait in:", in_wait_path)
-in_wait = pd.read_excel(in_wait_path,  dtype={"کد پذیرنده": str, "سریال پوز تخصیص یافته": str})
-
-print("📂 Reading file last-night in:", last_night_path)
-last_night = pd.read_excel(last_night_path, dtype={"کد پذیرنده": str})
-
-print("📂 Reading file search in:", search_path)
-search = pd.read_excel(search_path, dtype={"کد پذیرنده": str, "سریال پایانه": str})
-
-# گزارش‌های تخصیص (ممکن است نباشند)
-try:
-    print("📂 Reading file takhsisReport in:", report_day_path)
-    report_day = pd.read_excel(report_day_path)
-except Exception:
-    report_day = pd.DataFrame()
-
-try:
-    print("📂 Reading file takhsisReport-m in:", report_month_path)
-    report_month = pd.read_excel(report_month_path)
-except Exception:
-    report_month = pd.DataFrame()
-
-print("📂 Reading file rating in:", rating_path)
-rating = pd.read_excel(rating_path, dtype={"کد پذیرنده": str})
-
-# حذف ستون‌های اضافی از in-wait
-columns_to_keep = [
-    "کد پذیرنده", "کد درخواست", "کد پیگیری", "مدل پوز", "گروه پروژه",
-    "تاریخ ایجاد", "آخرین تاریخ ویرایش", "شماره حساب"
-]
-in_wait = in_wait[[col for col in columns_to_keep if col in in_wait.columns]]
+
+def parse_args(argv=None):
+    return build_parser("takhsis").parse_args(argv)
+
+
+def input_specs(folder: str, with_rating: bool = True) -> dict:
+    """
+    شش ورودی takhsis: {نام: (مسیر، پارامترهای خواندن، اختیاری؟)}.
+    گزارش‌های تخصیص ممکن است نباشند (اختیاری → دیتافریم خالی).
+    with_rating=False: پله‌ها از مخزن خوانده می‌شوند و rating.xlsx لازم نیست.
+    """
+    specs = {
+        "in-wait":         (os.path.join(folder, "in-wait.xlsx"),
+                            {"dtype": {"کد پذیرنده": str, "سریال پوز تخصیص یافته": str}}, False),
+        "last-night":      (os.path.join(folder, "last-night.xlsx"), {"dtype": {"کد پذیرنده": str}}, False),
+        "search":          (os.path.join(folder, "search.xlsx"),
+                            {"dtype": {"کد پذیرنده": str, "سریال پایانه": str}}, False),
+        "takhsisReport":   (os.path.join(folder, "takhsisReport.xlsx"), {}, True),
+        "takhsisReport-m": (os.path.join(folder, "takhsisReport-m.xlsx"), {}, True),
+        "rating":          (os.path.join(folder, "rating.xlsx"), {"dtype": {"کد پذیرنده": str}}, False),
+    }
+    if not with_rating:
+        del specs["rating"]
+    return specs
+
+
+def lookup_ratings(path: str, merchants) -> pd.DataFrame:
+    """
+    پله‌های درآمد فقط برای پذیرنده‌های in-wait، مستقیم از مخزن ratings.py (بدون پارس rating.xlsx).
+    """
+    store = RatingStore(path)
+    try:
+        return store.lookup(merchants)
+    finally:
+        store.close()
+
+
+# ستون‌های تاریخ last-night که جدیدترین رکورد هر پذیرنده با آن‌ها تعیین می‌شود (هر کدام که باشد)
+LAST_NIGHT_DATES = ["تاریخ تخصیص تجهیز", "تاریخ نصب"]
+
+
+def last_night_rank(last_night: pd.DataFrame) -> np.ndarray:
+    """
+    امتیاز هر ردیف last-night برای انتخاب یک ردیف به‌ازای هر پذیرنده: اول جدیدترین روز
+    تخصیص/نصب (LAST_NIGHT_DATES)، سپس داشتن توضیح (غیرخالی و غیر «--»). تساوی → اولین ردیف فایل.
+    """
+    day = np.zeros(len(last_night), dtype=np.int64)
+    for col in LAST_NIGHT_DATES:
+        if col in last_night.columns:
+            day = np.maximum(day, jalali.day_keys(last_night[col]))
+    note = ~np.isin(normalize_values(last_night["توضیح"]), ["", "--"])
+    return day * 2 + note
+
+
+# جدول‌های جستجوی پذیرنده و قاعدهٔ یکتاسازی هر کدام روی «کد پذیرنده» (common.keys.keyed_join):
+# (ستون‌های برداشته‌شده یا None برای همه، ستون ترتیب یا تابع امتیاز، ردیف نگه‌داشته‌شده در تساوی)
+MERCHANT_LOOKUPS = {
+    "search":     (["نام فروشگاه", "شهر", "آدرس"], None, "first"),                        # اولین ردیف فایل
+    "last-night": (["نام پشتیبان", "نام خانوادگی پشتیبان", "توضیح"], last_night_rank, "first"),  # جدیدترین رکورد
+    "rating":     (None, "پله درآمد", "last"),                                            # بالاترین پله
+}
+
+# ورودی‌هایی که روی «کد پذیرنده» به هم join می‌شوند، و ستون‌های کم‌تنوع هر کدام (category)
+KEY_INPUTS = ["in-wait", "search", "last-night", "rating"]
+CATEGORY_COLS = {"in-wait": ["مدل پوز", "گروه پروژه"], "search": ["شهر"]}
+
+
+def canonicalize_inputs(frames: dict, names=KEY_INPUTS) -> dict:
+    """
+    گذر واحد پس از بارگذاری: «کد پذیرنده» ورودی‌های names یکسان (canonical_key) می‌شود و همهٔ
+    ورودی‌های KEY_INPUTS موجود در frames دسته‌های مشترک می‌گیرند تا merge‌ها روی کدهای category
+    انجام شوند؛ ستون‌های CATEGORY_COLS هم category می‌شوند.
+    (حالت --batch: مرجع‌ها یک بار، و هر روز فقط in-wait همان روز.)
+    """
+    for name in names:
+        canonicalize(frames[name], ["کد پذیرنده"], CATEGORY_COLS.get(name, ()))
+    present = [name for name in KEY_INPUTS if name in frames]
+    keys = share_categories(*(frames[name]["کد پذیرنده"] for name in present))
+    for name, key in zip(present, keys):
+        frames[name]["کد پذیرنده"] = key
+    return frames
+
 
 # Helper: POS type based on model
 def get_pos_type(model):
@@ -64,124 +122,426 @@ def get_pos_type(model):
         return "ثابت"
     return "نامشخص"
 
-# Merge step 1: in-wait with search (on کد پذیرنده)
-merged = pd.merge(
-    in_wait,
-    search[["کد پذیرنده", "نام فروشگاه", "شهر", "آدرس"]],
-    on="کد پذیرنده",
-    how="left"
-)
-
-# Merge step 2: with last-night for پشتیبان و توضیح (تنها یک ردیف به‌ازای هر کد پذیرنده)
-last_night_info = last_night[["کد پذیرنده", "نام پشتیبان", "نام خانوادگی پشتیبان", "توضیح"]].copy()
-last_night_info["نام و نام خانوادگی پشتیبان"] = last_night_info["نام پشتیبان"].fillna("") + " " + last_night_info["نام خانوادگی پشتیبان"].fillna("")
-last_night_info = last_night_info.drop(columns=["نام پشتیبان", "نام خانوادگی پشتیبان"])
-last_night_info = last_night_info.rename(columns={"توضیح": "توضیحات"})
-last_night_info = last_night_info.drop_duplicates(subset="کد پذیرنده")
-
-merged = pd.merge(
-    merged,
-    last_night_info,
-    on="کد پذیرنده",
-    how="left"
-)
-
-# Merge step 3: with rating for پله درآمد
-merged = pd.merge(
-    merged,
-    rating,
-    on="کد پذیرنده",
-    how="left"
-)
-
-# توضیحات نهایی با در نظر گرفتن شرایط خاص
-mask_missing = ~merged["کد پذیرنده"].isin(last_night_info["کد پذیرنده"])
-merged.loc[mask_missing, "توضیحات"] = "نصب اولیه"
-merged.loc[merged["توضیحات"] == "--", "توضیحات"] = ""
-merged["توضیحات"] = merged["توضیحات"].fillna("")
-merged["توضیحات"] = merged["توضیحات"].apply(lambda x: x.split(" - ")[0].strip() if isinstance(x, str) and " - " in x else x)
-
-# گروه پایانه بر اساس مدل پوز
-merged["گروه پایانه"] = merged["مدل پوز"].apply(get_pos_type)
-
-# انتخاب و ساخت جدول نهایی
-result_cols = [
-    "کد پذیرنده", "نام فروشگاه", "پله درآمد", "توضیحات", "شهر", "آدرس", "نام و نام خانوادگی پشتیبان",
-    "گروه پایانه", "کد درخواست", "کد پیگیری", "مدل پوز", "گروه پروژه",
-    "تاریخ ایجاد", "آخرین تاریخ ویرایش", "شماره حساب"
-]
-
-final_result = merged[[col for col in result_cols if col in merged.columns]].copy()
-
-# ساخت فایل نصب اولیه و فیلتر پروژه فروش
-initial_installs = final_result[final_result["توضیحات"] == "نصب اولیه"].copy()
-filtered_result = final_result[final_result["گروه پروژه"] != "پروژه فروش"].copy()
-
-# ذخیره فایل تخصیص با تنظیم راست‌به‌چپ
-output_path = os.path.join(user_desktop, f"takhsis{today_jalali}.xlsx")
-filtered_result.to_excel(output_path, index=False, sheet_name="نتیجه")
-wb = load_workbook(output_path)
-ws = wb["نتیجه"]
-ws.sheet_view.rightToLeft = True
-wb.save(output_path)
-
-# ذخیره فایل نصب اولیه با تنظیم راست‌به‌چپ
-initial_path = os.path.join(user_desktop, f"نصب اولیه{today_jalali}.xlsx")
-initial_installs.to_excel(initial_path, index=False, sheet_name="نصب اولیه")
-wb2 = load_workbook(initial_path)
-ws2 = wb2["نصب اولیه"]
-ws2.sheet_view.rightToLeft = True
-wb2.save(initial_path)
-
-# ---- ساخت «گزارش تخصیص» با فرمت نمونه ----
-# شمارش «در انتظار تخصیص»
-waiting_total = len(filtered_result)
-waiting_fixed = (filtered_result["گروه پایانه"] == "ثابت").sum()
-waiting_wireless = (filtered_result["گروه پایانه"] == "بیسیم").sum()
+
+def build_allocation(in_wait, last_night, search, rating, prof):
+    """
+    ساخت جدول نهایی تخصیص از in-wait + search + last-night + rating.
+    خروجی: (filtered_result بدون پروژه فروش، initial_installs)
+    """
+    # حذف ستون‌های اضافی از in-wait
+    columns_to_keep = [
+        "کد پذیرنده", "کد درخواست", "کد پیگیری", "مدل پوز", "گروه پروژه",
+        "تاریخ ایجاد", "آخرین تاریخ ویرایش", "شماره حساب"
+    ]
+    in_wait = in_wait[[col for col in columns_to_keep if col in in_wait.columns]]
+
+    # پیوستن search، last-night و rating در یک گذر؛ هر جدول طبق قاعدهٔ MERCHANT_LOOKUPS یکتا می‌شود
+    frames = {"search": search, "last-night": last_night, "rating": rating}
+    with prof.stage("merchant join", rows_in=len(in_wait)) as st:
+        merged, matched, collisions = keyed_join(
+            in_wait, "کد پذیرنده",
+            {name: (frames[name], *rule) for name, rule in MERCHANT_LOOKUPS.items()})
+        st.rows_out = len(merged)
+    for name, c in collisions.items():
+        print(f"⚠️ {name}: {c['keys']} کد پذیرندهٔ تکراری ({c['rows']} ردیف اضافه کنار گذاشته شد؛ "
+              f"{c['hit']} ردیف in-wait)")
+
+    with prof.stage("derive columns", rows_in=len(merged)) as st:
+        # نام کامل پشتیبان (فقط برای پذیرنده‌های دارای ردیف last-night)
+        full_name = merged["نام پشتیبان"].astype(object).fillna("") + " " + merged["نام خانوادگی پشتیبان"].astype(object).fillna("")
+        merged["نام و نام خانوادگی پشتیبان"] = full_name.where(matched["last-night"])
+        merged = merged.rename(columns={"توضیح": "توضیحات"})
+
+        # توضیحات نهایی با در نظر گرفتن شرایط خاص (پذیرندهٔ بدون ردیف last-night → نصب اولیه)
+        merged.loc[~matched["last-night"], "توضیحات"] = "نصب اولیه"
+        merged.loc[merged["توضیحات"] == "--", "توضیحات"] = ""
+        merged["توضیحات"] = merged["توضیحات"].fillna("")
+        merged["توضیحات"] = merged["توضیحات"].apply(lambda x: x.split(" - ")[0].strip() if isinstance(x, str) and " - " in x else x)
+
+        # گروه پایانه بر اساس مدل پوز
+        merged["گروه پایانه"] = map_values(merged["مدل پوز"], get_pos_type)
+        st.rows_out = len(merged)
+
+    # انتخاب و ساخت جدول نهایی
+    result_cols = [
+        "کد پذیرنده", "نام فروشگاه", "پله درآمد", "توضیحات", "شهر", "آدرس", "نام و نام خانوادگی پشتیبان",
+        "گروه پایانه", "کد درخواست", "کد پیگیری", "مدل پوز", "گروه پروژه",
+        "تاریخ ایجاد", "آخرین تاریخ ویرایش", "شماره حساب"
+    ]
+
+    final_result = merged[[col for col in result_cols if col in merged.columns]].copy()
+
+    # ساخت فایل نصب اولیه و فیلتر پروژه فروش
+    initial_installs = final_result[final_result["توضیحات"] == "نصب اولیه"].copy()
+    filtered_result = final_result[~text_equals(final_result["گروه پروژه"], "پروژه فروش")].copy()
+    return filtered_result, initial_installs
+
 
 # Helper: شمارش پروژه‌ها
 def _count_projects(df: pd.DataFrame):
     if df is None or df.empty or ("پروژه" not in df.columns):
         return {"ps": 0, "sales": 0, "bank": 0, "total": 0}
-    col = df["پروژه"].astype(str).fillna("").str.strip()
-    ps = col.str.contains("پرشین|پرشين", case=False, regex=True).sum()
-    sales = col.str.contains("فروش", case=False, regex=True).sum()
+    col = pd.Series(normalize_values(df["پروژه"]), index=df.index)   # ی/ک و نیم‌فاصلهٔ یکسان
+    ps = col.str.contains("پرشین", case=False, regex=False).sum()
+    sales = col.str.contains("فروش", case=False, regex=False).sum()
     total = len(df)
     bank = total - ps - sales
     return {"ps": int(ps), "sales": int(sales), "bank": int(bank), "total": int(total)}
 
-cnt_day = _count_projects(report_day)
-cnt_month = _count_projects(report_month)
-
-wb_report = Workbook()
-wsr = wb_report.active
-wsr.title = "گزارش"
-
-# ردیف‌ها مطابق فایل نمونه
-wsr["A1"] = "گزارشات"; wsr["B1"] = "تعداد"
-wsr["A2"] = "کل در انتظار تخصیص "; wsr["B2"] = waiting_total
-wsr["A3"] = "در انتظار تخصیص ثابت"; wsr["B3"] = waiting_fixed
-wsr["A4"] = "در انتظار تخصیص سیار"; wsr["B4"] = waiting_wireless
-wsr["A5"] = "تعداد تخصیص پوز روز قبل پروژه بانکی "; wsr["B5"] = cnt_day["bank"]
-wsr["A6"] = " تعداد تخصیص پوز روز قبل پرشین"; wsr["B6"] = cnt_day["ps"]
-wsr["A7"] = "تعداد تخصیص پوز روز قبل پروژه فروش"; wsr["B7"] = cnt_day["sales"]
-wsr["A8"] = "تعداد تخصیص پوز این ماه پروژه بانکی "; wsr["B8"] = cnt_month["bank"]
-wsr["A9"] = " تعداد تخصیص پوز این ماه پرشین"; wsr["B9"] = cnt_month["ps"]
-wsr["A10"] = "تعداد تخصیص پوز این ماه پروژه فروش"; wsr["B10"] = cnt_month["sales"]
-
-# ادغام و جمع کل‌ها (همانند فایل نمونه)
-wsr.merge_cells("C5:C7"); wsr.merge_cells("D5:D7")
-wsr.merge_cells("C8:C10"); wsr.merge_cells("D8:D10")
-wsr["D5"] = "جمع کل تخصیص یافته "; wsr["C5"] = cnt_day["total"]
-wsr["D8"] = "جمع کل تخصیص یافته "; wsr["C8"] = cnt_month["total"]
-
-# راست‌به‌چپ و عرض ستون‌ها
-wsr.sheet_view.rightToLeft = True
-from openpyxl.utils import get_column_letter
-for col, width in zip(["A", "B", "C", "D"], [42, 12, 16, 24]):
-    wsr.column_dimensions[col].width = width
-
-allocation_path = os.path.join(user_desktop, f"گزارش تخصیص{today_jalali}.xlsx")
-wb_report.save(allocation_path)
-
-print("\n✅ فایل‌ها ذخیره شدند!\n📁", output_path, "\n📁", initial_path, "\n📁", allocation_path)
+
+def write_allocation_report(path, filtered_result, report_day, report_month):
+    """
+    ساخت «گزارش تخصیص» با فرمت نمونه.
+    """
+    # شمارش «در انتظار تخصیص»
+    waiting_total = len(filtered_result)
+    waiting_fixed = (filtered_result["گروه پایانه"] == "ثابت").sum()
+    waiting_wireless = (filtered_result["گروه پایانه"] == "بیسیم").sum()
+
+    cnt_day = _count_projects(report_day)
+    cnt_month = _count_projects(report_month)
+
+    wb_report = Workbook()
+    wsr = wb_report.active
+    wsr.title = "گزارش"
+
+    # ردیف‌ها مطابق فایل نمونه
+    wsr["A1"] = "گزارشات"; wsr["B1"] = "تعداد"
+    wsr["A2"] = "کل در انتظار تخصیص "; wsr["B2"] = waiting_total
+    wsr["A3"] = "در انتظار تخصیص ثابت"; wsr["B3"] = waiting_fixed
+    wsr["A4"] = "در انتظار تخصیص سیار"; wsr["B4"] = waiting_wireless
+    wsr["A5"] = "تعداد تخصیص پوز روز قبل پروژه بانکی "; wsr["B5"] = cnt_day["bank"]
+    wsr["A6"] = " تعداد تخصیص پوز روز قبل پرشین"; wsr["B6"] = cnt_day["ps"]
+    wsr["A7"] = "تعداد تخصیص پوز روز قبل پروژه فروش"; wsr["B7"] = cnt_day["sales"]
+    wsr["A8"] = "تعداد تخصیص پوز این ماه پروژه بانکی "; wsr["B8"] = cnt_month["bank"]
+    wsr["A9"] = " تعداد تخصیص پوز این ماه پرشین"; wsr["B9"] = cnt_month["ps"]
+    wsr["A10"] = "تعداد تخصیص پوز این ماه پروژه فروش"; wsr["B10"] = cnt_month["sales"]
+
+    # ادغام و جمع کل‌ها (همانند فایل نمونه)
+    wsr.merge_cells("C5:C7"); wsr.merge_cells("D5:D7")
+    wsr.merge_cells("C8:C10"); wsr.merge_cells("D8:D10")
+    wsr["D5"] = "جمع کل تخصیص یافته "; wsr["C5"] = cnt_day["total"]
+    wsr["D8"] = "جمع کل تخصیص یافته "; wsr["C8"] = cnt_month["total"]
+
+    # راست‌به‌چپ و عرض ستون‌ها
+    wsr.sheet_view.rightToLeft = True
+    for col, width in zip(["A", "B", "C", "D"], [42, 12, 16, 24]):
+        wsr.column_dimensions[col].width = width
+
+    wb_report.save(path)
+
+
+def day_output_paths(folder, tag):
+    """مسیر سه خروجی یک روز با برچسب tag (yymmdd): (تخصیص، نصب اولیه، گزارش تخصیص)"""
+    return (os.path.join(folder, f"takhsis{tag}.xlsx"),
+            os.path.join(folder, f"نصب اولیه{tag}.xlsx"),
+            os.path.join(folder, f"گزارش تخصیص{tag}.xlsx"))
+
+
+def write_tables(output_path, initial_path, filtered_result, initial_installs, prof, sinks=()):
+    """
+    دو خروجی جدولی (تخصیص، نصب اولیه) به صورت اکسل و در صورت درخواست در قالب‌های ماشینی sinks.
+    """
+    # ذخیره فایل تخصیص (راست‌به‌چپ در همان نوشتن اول)
+    with prof.stage("write takhsis", rows_in=len(filtered_result)):
+        write_xlsx(output_path, {"نتیجه": filtered_result})
+
+    # ذخیره فایل نصب اولیه (راست‌به‌چپ)
+    with prof.stage("write initial installs", rows_in=len(initial_installs)):
+        write_xlsx(initial_path, {"نصب اولیه": initial_installs})
+
+    if sinks:
+        with prof.stage("write sinks", rows_in=len(filtered_result) + len(initial_installs)):
+            write_sinks(output_path, {"نتیجه": filtered_result}, sinks)
+            write_sinks(initial_path, {"نصب اولیه": initial_installs}, sinks)
+
+
+def write_day_outputs(folder, tag, filtered_result, initial_installs, report_day, report_month, prof, sinks=()):
+    """
+    ذخیرهٔ سه خروجی یک روز با برچسب tag (yymmdd). خروجی: (مسیر تخصیص، مسیر نصب اولیه، مسیر گزارش)
+    sinks: قالب‌های ماشینی دو خروجی جدولی (common.sinks)؛ گزارش تخصیص فقط اکسل است.
+    """
+    output_path, initial_path, allocation_path = day_output_paths(folder, tag)
+    write_tables(output_path, initial_path, filtered_result, initial_installs, prof, sinks)
+
+    # ---- ساخت «گزارش تخصیص» با فرمت نمونه ----
+    with prof.stage("write allocation report"):
+        write_allocation_report(allocation_path, filtered_result, report_day, report_month)
+    return output_path, initial_path, allocation_path
+
+
+# -------------------- حالت چندروزه (--batch) --------------------
+BATCH_GLOB = "in-wait-*.xlsx"
+
+# داده‌های مرجع مشترک هر پردازهٔ کارگر (با initializer یک بار برای هر پردازه مقدار می‌گیرد)
+_BATCH = {}
+
+
+def day_tag(path) -> str:
+    """
+    برچسب روز (yymmdd، مثل نام خروجی‌ها) از نام فایل in-wait:
+    in-wait-1403-01-05.xlsx / in-wait-14030105.xlsx / in-wait-030105.xlsx → 030105
+    """
+    stem = os.path.splitext(os.path.basename(path))[0].translate(DIGITS)
+    digits = re.sub(r"\D", "", stem.replace("in-wait", ""))
+    if len(digits) == 8:
+        return digits[2:]
+    if len(digits) == 6:
+        return digits
+    raise ValueError(f"تاریخ از نام فایل in-wait قابل تشخیص نیست: {os.path.basename(path)}")
+
+
+def batch_days(folder, paths) -> list:
+    """
+    فهرست (برچسب روز، مسیر in-wait) به ترتیب تاریخ. paths خالی → folder/in-wait-*.xlsx
+    """
+    if not paths:
+        paths = glob.glob(os.path.join(folder, BATCH_GLOB))
+    days = sorted((day_tag(p), os.path.abspath(p)) for p in paths)
+    tags = [t for t, _ in days]
+    dup = sorted({t for t in tags if tags.count(t) > 1})
+    if dup:
+        raise ValueError("برای یک روز چند فایل in-wait داده شده: " + ", ".join(dup))
+    return days
+
+
+def _init_batch(refs, reports, folder, use_cache, sinks):
+    _BATCH.update(refs=refs, reports=reports, folder=folder, use_cache=use_cache, sinks=sinks)
+
+
+def _day_report(folder, name, tag, shared, use_cache):
+    """گزارش تخصیص مخصوص همان روز (مثلاً takhsisReport-030105.xlsx) اگر باشد، وگرنه نسخهٔ مشترک."""
+    path = os.path.join(folder, f"{name}-{tag}.xlsx")
+    return read_excel_cached(path, use_cache) if os.path.exists(path) else shared
+
+
+def _run_batch_day(tag, in_wait_path):
+    """
+    کار هر روز: خواندن in-wait همان روز، ساخت تخصیص روی مرجع‌های مشترک و نوشتن سه خروجی.
+    خروجی: (برچسب، ثانیه، ردیف‌های in-wait، مسیرهای خروجی)
+    """
+    t0 = time.perf_counter()
+    folder, use_cache = _BATCH["folder"], _BATCH["use_cache"]
+    _, kwargs, _ = input_specs(folder)["in-wait"]
+    frames = dict(_BATCH["refs"])
+    frames["in-wait"] = read_excel_cached(in_wait_path, use_cache, **kwargs)
+    canonicalize_inputs(frames, ["in-wait"])
+
+    off = Profiler("takhsis")   # مراحل داخلی روزها ثبت نمی‌شوند؛ زمان کل هر روز در پردازهٔ اصلی ثبت می‌شود
+    filtered_result, initial_installs = build_allocation(
+        frames["in-wait"], frames["last-night"], frames["search"], frames["rating"], off)
+    shared_day, shared_month = _BATCH["reports"]
+    paths = write_day_outputs(folder, tag, filtered_result, initial_installs,
+                              _day_report(folder, "takhsisReport", tag, shared_day, use_cache),
+                              _day_report(folder, "takhsisReport-m", tag, shared_month, use_cache), off,
+                              _BATCH["sinks"])
+    return tag, time.perf_counter() - t0, len(frames["in-wait"]), paths
+
+
+def run_batch(args, prof):
+    """
+    حالت --batch: search، last-night، rating و گزارش‌های تخصیص یک بار خوانده و یکسان‌سازی می‌شوند؛
+    هر روز (یک فایل in-wait) در یک پردازهٔ جدا پردازش می‌شود (اگر حداقل دو پردازه مفید باشد).
+    """
+    use_cache = not args.no_cache
+    days = batch_days(user_desktop, args.batch)
+    if not days:
+        print(f"❌ فایل in-wait تاریخ‌داری ({BATCH_GLOB}) در پوشهٔ takhsis پیدا نشد.")
+        return
+    print(f"📅 {len(days)} روز: " + ", ".join(tag for tag, _ in days))
+
+    rating_db = store_path(user_desktop)
+    use_store = os.path.exists(rating_db)
+    specs = input_specs(user_desktop, with_rating=not use_store)
+    del specs["in-wait"]
+    with prof.stage("read reference inputs") as st:
+        frames = read_excels(specs, use_cache, max_workers=args.workers, prof=prof)
+        if use_store:
+            print("🗄️ Reading ratings from store:", rating_db)
+            store = RatingStore(rating_db)
+            try:
+                frames["rating"] = store.load()
+            finally:
+                store.close()
+        st.rows_out = sum(len(df) for df in frames.values())
+
+    with prof.stage("canonicalize reference keys"):
+        refs = {name: frames[name] for name in ("search", "last-night", "rating")}
+        canonicalize_inputs(refs, list(refs))
+    init_args = (refs, (frames["takhsisReport"], frames["takhsisReport-m"]), user_desktop, use_cache, args.sinks)
+
+    results = {}
+    with prof.stage("process days", rows_in=len(days)) as st:
+        workers = min(len(days), args.workers or os.cpu_count() or 1)
+        if workers >= 2:
+            errors = {}
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch,
+                                         initargs=init_args) as pool:
+                    futures = {tag: pool.submit(_run_batch_day, tag, path) for tag, path in days}
+                    for tag, fut in futures.items():
+                        try:
+                            results[tag] = fut.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            errors[tag] = e
+            except (BrokenProcessPool, OSError) as e:
+                # ساخت/اجرای pool ممکن نشد (نه خطای خود روزها)
+                print(f"   ℹ️ اجرای موازی روزها ممکن نشد ({e})؛ اجرای ترتیبی.")
+            if errors:
+                raise next(iter(errors.values()))
+        todo = [(tag, path) for tag, path in days if tag not in results]
+        if todo:
+            _init_batch(*init_args)
+            for tag, path in todo:
+                results[tag] = _run_batch_day(tag, path)
+        st.rows_out = len(results)
+
+    for tag, _ in days:
+        _, seconds, rows, paths = results[tag]
+        prof.record(f"day {tag}", seconds, rows_in=rows)
+        print(f"\n✅ روز {tag} ({rows} ردیف in-wait، {seconds:.1f} s)")
+        for p in paths:
+            print("📁", p)
+
+
+# -------------------- حالت پایش پوشه (--watch) --------------------
+def _read_input(name, path, kwargs, optional, use_cache):
+    """خواندن یک ورودی (با قاعدهٔ فایل اختیاری) و یکسان‌سازی کلید خودش؛ اشتراک دسته‌ها در مرحلهٔ keys."""
+    print(f"📂 Reading file {name} in:", path)
+    try:
+        df = read_excel_cached(path, use_cache, **kwargs)
+    except Exception:
+        if not optional:
+            raise
+        return pd.DataFrame()
+    if name in KEY_INPUTS:
+        canonicalize_inputs({name: df}, [name])
+    return df
+
+
+def _load_store(path):
+    print("🗄️ Reading ratings from store:", path)
+    store = RatingStore(path)
+    try:
+        return canonicalize_inputs({"rating": store.load()}, ["rating"])["rating"]
+    finally:
+        store.close()
+
+
+def _share_keys(*frames):
+    """دسته‌های مشترک «کد پذیرنده» روی کپی سطحی ورودی‌ها (نسخهٔ گرم هر ورودی دست‌نخورده می‌ماند)."""
+    shared = {name: df.copy(deep=False) for name, df in zip(KEY_INPUTS, frames)}
+    return canonicalize_inputs(shared, [])
+
+
+def run_watch(args, prof):
+    """
+    حالت --watch: هر ورودی یک مرحلهٔ جدا در StageGraph است؛ تغییر یک فایل فقط همان فایل و
+    مراحل پایین‌دستش را دوباره اجرا می‌کند (مثلاً تغییر takhsisReport فقط گزارش تخصیص را).
+    پله‌ها از مخزن ratings.py (کل جدول، یک بار) اگر باشد، وگرنه از rating.xlsx.
+    """
+    use_cache = not args.no_cache
+    rating_db = store_path(user_desktop)
+    use_store = os.path.exists(rating_db)
+    specs = input_specs(user_desktop, with_rating=not use_store)
+    off = Profiler("takhsis")   # مراحل داخلی ثبت نمی‌شوند؛ زمان هر مرحلهٔ گراف ثبت می‌شود
+
+    graph = StageGraph(prof)
+    paths = {}
+    for name, (path, kwargs, optional) in specs.items():
+        graph.add(name, lambda n=name, p=path, k=kwargs, o=optional: _read_input(n, p, k, o, use_cache))
+        paths[name] = path
+    if use_store:
+        graph.add("rating", lambda: _load_store(rating_db))
+        paths["rating"] = rating_db
+
+    def allocation(frames):
+        return build_allocation(frames["in-wait"], frames["last-night"], frames["search"], frames["rating"], off)
+
+    def write_day_tables(result):
+        filtered_result, initial_installs = result
+        output_path, initial_path, _ = day_output_paths(user_desktop, jdatetime.date.today().strftime("%y%m%d"))
+        write_tables(output_path, initial_path, filtered_result, initial_installs, off, args.sinks)
+        return output_path, initial_path
+
+    def write_report(result, report_day, report_month):
+        _, _, allocation_path = day_output_paths(user_desktop, jdatetime.date.today().strftime("%y%m%d"))
+        write_allocation_report(allocation_path, result[0], report_day, report_month)
+        return allocation_path
+
+    graph.add("keys", _share_keys, KEY_INPUTS)
+    graph.add("allocation", allocation, ["keys"])
+    graph.add("write takhsis", write_day_tables, ["allocation"])
+    graph.add("write report", write_report, ["allocation", "takhsisReport", "takhsisReport-m"])
+
+    def done(seconds):
+        print(f"\n✅ فایل‌ها آماده‌اند ({seconds:.1f} s)")
+        for p in graph.get("write takhsis") + (graph.get("write report"),):
+            print("📁", p)
+
+    watch_loop(paths, graph, ["write takhsis", "write report"], on_done=done)
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+def run(args, rating=None):
+    """
+    اجرای takhsis با آرگومان‌های پارس‌شدهٔ common.options.
+    rating: جدول پله‌ها که همین حالا در همین پردازه ساخته شده (cli.py all، خروجی ratings.run)؛
+    اگر داده شود نه مخزن و نه rating.xlsx خوانده می‌شود.
+    """
+    use_cache = not args.no_cache
+    prof = Profiler("takhsis", enabled=args.profile is not None)
+    if args.batch is not None:
+        run_batch(args, prof)
+        prof.write_report(args.profile or user_desktop)
+        return
+    if args.watch:
+        run_watch(args, prof)
+        prof.write_report(args.profile or user_desktop)
+        return
+
+    # تاریخ شمسی برای افزودن به نام فایل‌ها
+    today_jalali = jdatetime.date.today().strftime("%y%m%d")
+
+    # --- بارگذاری فایل‌ها (هم‌زمان، هر فایل در یک پردازه) ---
+    # پله‌ها: جدول همین پردازه (cli.py all)، یا مخزن ratings.py اگر ساخته شده باشد، وگرنه rating.xlsx
+    rating_db = store_path(user_desktop)
+    use_store = rating is None and os.path.exists(rating_db)
+    with prof.stage("read inputs") as st:
+        frames = read_excels(input_specs(user_desktop, with_rating=rating is None and not use_store), use_cache,
+                             max_workers=args.workers, prof=prof)
+        st.rows_out = sum(len(df) for df in frames.values())
+
+    if rating is not None:
+        print("🗄️ Ratings from this run (ratings → takhsis)")
+        frames["rating"] = rating
+    elif use_store:
+        print("🗄️ Reading ratings from store:", rating_db)
+        with prof.stage("lookup rating", rows_in=len(frames["in-wait"])) as st:
+            frames["rating"] = lookup_ratings(rating_db, frames["in-wait"]["کد پذیرنده"])
+            st.rows_out = len(frames["rating"])
+
+    with prof.stage("canonicalize keys"):
+        canonicalize_inputs(frames)
+
+    filtered_result, initial_installs = build_allocation(
+        frames["in-wait"], frames["last-night"], frames["search"], frames["rating"], prof)
+
+    output_path, initial_path, allocation_path = write_day_outputs(
+        user_desktop, today_jalali, filtered_result, initial_installs,
+        frames["takhsisReport"], frames["takhsisReport-m"], prof, args.sinks)
+
+    print("\n✅ فایل‌ها ذخیره شدند!\n📁", output_path, "\n📁", initial_path, "\n📁", allocation_path)
+    if args.sinks:
+        print("🧩 خروجی‌های ماشینی:", ", ".join(args.sinks))
+    prof.write_report(args.profile or user_desktop)
+
+
+# نقطهٔ ورود (لازم برای process pool در ویندوز: پردازه‌های کارگر این فایل را دوباره import می‌کنند)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+archive_store.py
+==============================
+
+آرشیو افزایشی (append-only) نصب‌شده‌ها برای noInstall.py، به صورت پارتیشن‌های Parquet ماهانه.
+
+قبلاً شیت Archive در install_kheir_output.xlsx در هر اجرا کامل خوانده، با ردیف‌های جدید
+concat و دوباره کامل نوشته می‌شد؛ با گذشت زمان همین شیت بیشتر زمان اجرا و حجم فایل را
+می‌گرفت. اینجا هر اجرا فقط ردیف‌های تازه را به صورت یک فایل Parquet کوچک در پوشهٔ ماه
+جلالی «تاریخ نصب» همان ردیف اضافه می‌کند و اکسل فقط پنجرهٔ چند ماه اخیر را نشان می‌دهد.
+
+ساختار پوشه:
+-------------
+    install_kheir_archive/
+        month=140405/part-<زمان اجرا>.parquet
+        month=140406/part-<زمان اجرا>.parquet
+        month=unknown/...            (ردیف‌هایی که تاریخ نصبشان قابل تشخیص نیست)
+
+نکات:
+------
+- فایل‌ها هیچ‌وقت بازنویسی نمی‌شوند؛ هر اجرا برای هر ماهی که ردیف تازه دارد یک part جدید
+  می‌نویسد (نوشتن در فایل موقت و سپس os.replace).
+- ستون‌های _run (زمان اجرا) و _seq (ترتیب در همان اجرا) ترتیب اصلی افزودن را حفظ می‌کنند؛
+  خواندن بر اساس همین دو ستون مرتب می‌شود.
+- نوع ستون‌های object در هر part جدا تعیین می‌شود (common.sinks.parquet_frame: بولی، عدد، در غیر
+  این صورت متن) تا ستون‌های مخلوط اکسل قابل ذخیره باشند؛ هنگام خواندن همه object با NaN برای خالی‌ها برمی‌گردند (مثل read_excel).
+- پنجرهٔ «اخیر» نسبت به جدیدترین ماه آرشیو حساب می‌شود (نه تاریخ سیستم).
+- نیازمند pyarrow است (مثل کش اکسل)؛ اگر نصب نباشد noInstall مثل قبل کل آرشیو را در اکسل نگه می‌دارد.
+- این پوشه تنها نسخهٔ کامل آرشیو است؛ اکسل فقط پنجرهٔ اخیر را دارد (برای دوره‌های قدیمی: export).
+"""
+
+import glob
+import importlib.util
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from common import jalali
+from common.excel_out import write_xlsx
+from common.sinks import parquet_frame
+from common.text import DIGITS
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+DATE_COL = "تاریخ نصب"
+UNKNOWN = 0   # کلید ماه ردیف‌های بدون تاریخ نصب معتبر
+
+
+def month_keys(values) -> np.ndarray:
+    """کلید ماه جلالی YYYYMM از ستون تاریخ (هر قالبی که jalali.day_keys بشناسد)؛ نامعتبر → UNKNOWN."""
+    return jalali.day_keys(values) // 100
+
+
+def shift_month(key: int, n: int) -> int:
+    """کلید ماه YYYYMM پس از n ماه (n منفی: قبل)."""
+    idx = (key // 100) * 12 + (key % 100 - 1) + n
+    return (idx // 12) * 100 + idx % 12 + 1
+
+
+def parse_month(text) -> int:
+    """«1404/05»، «140405» یا «۱۴۰۴-۰۵» → 140405"""
+    digits = "".join(ch for ch in str(text).translate(DIGITS) if ch.isdigit())
+    if len(digits) != 6 or not 1 <= int(digits[4:]) <= 12:
+        raise ValueError(f"ماه جلالی نامعتبر: {text} (نمونه: 140405)")
+    return int(digits)
+
+
+def recent_rows(df: pd.DataFrame, months: int, newest: int = None) -> pd.DataFrame:
+    """
+    ردیف‌های months ماه اخیر (بر اساس ماه «تاریخ نصب»)؛ months=0 → همه.
+    newest: جدیدترین ماه مرجع (پیش‌فرض: جدیدترین ماه همین ردیف‌ها).
+    """
+    if not months or df.empty:
+        return df
+    keys = month_keys(df[DATE_COL])
+    if newest is None:
+        known = keys[keys != UNKNOWN]
+        if not len(known):
+            return df.iloc[0:0]
+        newest = int(known.max())
+    return df[keys >= shift_month(newest, -(months - 1))]
+
+
+class ArchiveStore:
+    """
+    آرشیو پارتیشن‌بندی‌شده:
+      folder    : پوشهٔ آرشیو (اگر نبود در اولین append ساخته می‌شود)
+      cols      : ستون‌های آرشیو (EXT_COLS)
+    """
+
+    def __init__(self, folder, cols):
+        self.folder = str(folder)
+        self.cols = list(cols)
+        self.is_new = not os.path.isdir(self.folder)
+
+    # -------------------- پارتیشن‌ها --------------------
+    @staticmethod
+    def _label(month: int) -> str:
+        return "unknown" if month == UNKNOWN else str(month)
+
+    def _dir(self, month: int) -> str:
+        return os.path.join(self.folder, f"month={self._label(month)}")
+
+    def months(self) -> list:
+        """ماه‌های موجود (UNKNOWN اول)، مرتب."""
+        out = []
+        for d in glob.glob(os.path.join(self.folder, "month=*")):
+            label = os.path.basename(d).split("=", 1)[1]
+            if glob.glob(os.path.join(d, "*.parquet")):
+                out.append(UNKNOWN if label == "unknown" else int(label))
+        return sorted(out)
+
+    # -------------------- نوشتن --------------------
+    def append(self, df: pd.DataFrame) -> dict:
+        """
+        افزودن ردیف‌ها (یک part جدید برای هر ماه). خروجی: dict{ماه → تعداد ردیف}.
+        پوشهٔ آرشیو حتی برای ورودی خالی ساخته می‌شود (نشانهٔ ساخته شدن آرشیو).
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        self.is_new = False
+        if df.empty:
+            return {}
+        run = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        df = df.reindex(columns=self.cols).reset_index(drop=True)
+        keys = month_keys(df[DATE_COL])
+        stats = {}
+        for month in np.unique(keys).tolist():
+            part = df[keys == month]
+            out = parquet_frame(part)
+            out["_run"] = run
+            out["_seq"] = part.index.to_numpy(dtype=np.int64)
+            os.makedirs(self._dir(month), exist_ok=True)
+            path = os.path.join(self._dir(month), f"part-{run}.parquet")
+            out.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+            stats[self._label(month)] = len(part)
+        return stats
+
+    # -------------------- خواندن --------------------
+    def load(self, months=None) -> pd.DataFrame:
+        """ردیف‌های ماه‌های داده‌شده (None → همه) به ترتیب افزودن."""
+        wanted = self.months() if months is None else [m for m in self.months() if m in set(months)]
+        parts = [pd.read_parquet(p) for m in wanted
+                 for p in sorted(glob.glob(os.path.join(self._dir(m), "*.parquet")))]
+        if not parts:
+            return pd.DataFrame(columns=self.cols)
+        df = pd.concat(parts, ignore_index=True)
+        df = df.sort_values(["_run", "_seq"], kind="stable").reset_index(drop=True)
+        df = df.reindex(columns=self.cols).astype(object)
+        return df.where(df.notna(), np.nan)
+
+    def recent(self, months: int, extra: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        پنجرهٔ months ماه اخیر برای نمایش در اکسل، به‌علاوهٔ ردیف‌های extra (هنوز افزوده‌نشده)
+        که در همان پنجره‌اند. months=0 → کل آرشیو.
+        """
+        extra = extra if extra is not None else pd.DataFrame(columns=self.cols)
+        stored = [m for m in self.months() if m != UNKNOWN]
+        extra_keys = month_keys(extra[DATE_COL]) if not extra.empty else np.array([], dtype=np.int64)
+        newest = max(stored + [int(k) for k in extra_keys if k != UNKNOWN], default=None)
+        if months and newest is None:
+            return extra.iloc[0:0].reindex(columns=self.cols)
+        wanted = None if not months else [m for m in stored if m >= shift_month(newest, -(months - 1))]
+        frames = [f for f in (self.load(wanted), recent_rows(extra, months, newest).reindex(columns=self.cols))
+                  if not f.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=self.cols)
+
+    def export(self, path, start: int = None, end: int = None) -> int:
+        """نوشتن ردیف‌های ماه‌های start..end (None → بدون حد) در یک فایل اکسل. خروجی: تعداد ردیف."""
+        months = [m for m in self.months()
+                  if (start is None or m >= start) and (end is None or m <= end)
+                  and (m != UNKNOWN or (start is None and end is None))]
+        df = self.load(months)
+        write_xlsx(path, {"Archive": df})
+        return len(df)
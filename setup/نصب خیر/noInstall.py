@@ -49,6 +49,8 @@ noInstall.py
    - خروج: فقط با تخصیص مقایسه می‌شود (نه با 1025). اگر «نزد پشتیبان» موجود باشد و «روز ≥ تخصیص»، همان اولویت دارد.
            در غیر اینصورت اولین «خروج» بعد از «تخصیص» انتخاب می‌شود. اگر توضیح «نزد پشتیبان» داشت، در خروج
            به صورت «YYYY/MM/DD - نزد پشتیبان» ثبت می‌شود.
+   - انتخاب 1025/خروج با as-of join گروه‌بندی‌شده بر اساس سریال انجام می‌شود؛
+     «اولین» یا «جدیدترین» رویداد پس از تخصیص با EVENT_PICK تعیین می‌شود (پیش‌فرض: اولین).
 
 4) از_نزد_پشتیبان:
    - اگر خروج «نزد پشتیبان» پس از تخصیص وجود داشت → پرچم True (وگرنه False).
@@ -57,7 +59,7 @@ noInstall.py
        - False → base = تاریخ 1025
 
 5) محاسبهٔ تاخیر و SLA:
-   - SLA شهر: مشهد = ۲ روز، سایر شهرها = ۵ روز.
+   - SLA شهر از جدول CITY_SLA_DAYS (مشهد = ۲ روز)؛ سایر شهرها = SLA_DEFAULT_DAYS (۵ روز).
    - تاخیر = max(0, (تاریخ نصب - base) - SLA).
    - اگر base موجود نبود، یا Fraud هشدار داد، «تاخیر روز» NA می‌شود.
 
@@ -74,6 +76,8 @@ noInstall.py
 8) حذف خودکار موارد disable:
    - اگر ردیفی در Pending یا Installed_Candidates (بدون تاریخ نصب) باشد و برای همان سریال (و ترجیحاً همان کد پذیرنده)
      در disable.xlsx «تاریخ پایان تخصیص ≥ تاریخ تخصیص» یافت شود، آن ردیف از چرخه حذف و در Disabled_Log ثبت می‌شود.
+   - جدیدترین روز disable به‌ازای (سریال، کد پذیرنده) و به‌ازای سریال یک بار گروه‌بندی می‌شود و هر دو شیت
+     با یک join برداری روی همین اندیس فیلتر می‌شوند (اگر کد پذیرندهٔ ردیف خالی باشد، تطبیق فقط با سریال است).
 
 9) پاکسازی شیت 2 قبل از هر اجرا:
    - ابتدای هر اجرا ردیف‌های دارای «تاریخ نصب» و «هشدار=False» از Installed_Candidates حذف می‌شوند.
@@ -89,7 +93,22 @@ noInstall.py
 - پیش‌نیاز: نصب xlsxwriter →  pip install xlsxwriter
 - پوشه‌ها: Desktop/noInstall/input باید شامل چهار فایل ورودی باشد.
 - اجرای مستقیم: python noInstall.py
+- با مخزن وضعیت SQLite: python noInstall.py --sqlite
+  (Desktop/noInstall/install_kheir_state.sqlite؛ در اولین اجرا وضعیت از اکسل قبلی منتقل می‌شود،
+   هر اجرا فقط تغییرات را اعمال می‌کند و Archive فقط افزایشی است؛ پنجرهٔ --archive-months
+   با ایندکس ماه در خود کوئری SQLite اعمال می‌شود، نه پس از خواندن کل جدول.)
+- آرشیو: نصب‌شده‌ها در Desktop/noInstall/install_kheir_archive به صورت پارتیشن‌های Parquet ماهانه
+  (بر اساس «تاریخ نصب») فقط افزوده می‌شوند و شیت Archive فقط ARCHIVE_MONTHS ماه اخیر را نشان می‌دهد
+  (--archive-months N، 0 = همه). در اولین اجرا شیت Archive اکسل قبلی به آرشیو منتقل می‌شود.
+  خروجی دوره‌های قدیمی: python noInstall.py --export-archive 140401:140406
+- گزارش زمان/حافظهٔ مراحل: python noInstall.py --profile [DIR]
+  (profile-noinstall-<زمان>.json و .csv در DIR یا Desktop/noInstall)
+- پایش پوشهٔ input: python noInstall.py --watch
+  (اسکریپت باز می‌ماند؛ ورودی‌های پارس‌شده و ایندکس‌ها در حافظه می‌مانند و وقتی فایل‌های input
+   چند ثانیه بدون تغییر ماندند، فقط فایل‌های تغییرکرده دوباره خوانده می‌شوند و خروجی دوباره ساخته می‌شود.)
 - خروجی: Desktop/noInstall/install_kheir_output.xlsx
+- خروجی ماشینی: python noInstall.py --sinks parquet,csv,sqlite
+  (install_kheir_output-<شیت>.parquet/.csv و جدول‌های outputs.sqlite کنار همان اکسل؛ common/sinks.py)
 
 محدودیت‌ها و نکات:
 -------------------
@@ -100,11 +119,26 @@ noInstall.py
 
 """
 
-import sys, os, shutil, re
+import sys, os, shutil
 from datetime import date as _date, date
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+# ماژول‌های مشترک در ریشهٔ مخزن
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common import jalali
+from common.excel_out import write_xlsx
+from common.excel_read import excel_file, read_excel
+from common.keys import canonicalize
+from common.profiling import Profiler
+from common.options import ARCHIVE_MONTHS, build_parser   # ARCHIVE_MONTHS: ماه‌های اخیر شیت Archive
+from common.sinks import write_sinks
+from common.text import LETTERS, normalize_text, normalize_values, text_contains, text_equals
+from common.watch import StageGraph, watch_loop
+from state_store import StateStore
+from archive_store import HAS_PYARROW, ArchiveStore, parse_month
+
 # تلاش برای وارد کردن xlsxwriter (برای نوشتن اکسل با استایل)
 try:
     import xlsxwriter
@@ -127,95 +161,60 @@ DESKTOP   = get_desktop()
 BASE_DIR  = DESKTOP / "noInstall"
 INPUT_DIR = BASE_DIR / "input"
 OUTPUT    = BASE_DIR / "install_kheir_output.xlsx"
+STATE_DB  = BASE_DIR / "install_kheir_state.sqlite"   # فقط در حالت --sqlite
+ARCHIVE_DIR = BASE_DIR / "install_kheir_archive"     # آرشیو ماهانهٔ Parquet (حالت عادی)
 BASE_DIR.mkdir(parents=True, exist_ok=True)
 INPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# انتخاب رویداد (1025/خروج) در بین رویدادهای «روز ≥ تخصیص»:
+#   "earliest" → اولین رویداد پس از تخصیص (مطابق قواعد بخش 3)
+#   "latest"   → جدیدترین رویداد (رفتار نسخه‌های قبلی که لیست‌ها را نزولی پیمایش می‌کردند)
+EVENT_PICK = "earliest"
+
+# ستون‌های شیت Pending و شیت‌های Installed_Candidates/Archive (سازگار با خروجی قدیم)
+PENDING_COLS = [
+    "کد پذیرنده","نام فروشگاه","شهر","آدرس","مدل پایانه","کد پایانه","سریال پایانه",
+    "نام خانوادگی پشتیبان","پروژه",
+    "تاریخ تخصیص تجهیز","تاریخ تراکنش 1025","خروج","از_نزد_پشتیبان",
+    "توضیح","مهلت","تاریخ نصب"
+]
+# ستون‌های install که اندیس تاریخ نصب (index_install) لازم دارد
+INSTALL_INDEX_COLS = ["سریال پایانه","کد پذیرنده","تاریخ نصب"]
+EXT_COLS  = PENDING_COLS + ["پایه_تاخیر","تحویل پست","تاخیر روز","هشدار_احتمال_تقلب"]
+BOOL_COLS = ["از_نزد_پشتیبان","هشدار_احتمال_تقلب"]
+
+# SLA نصب (روز) به‌ازای شهر؛ شهرهای دیگر SLA_DEFAULT_DAYS
+CITY_SLA_DAYS = {"مشهد": 2}
+SLA_DEFAULT_DAYS = 5
+
+# مقادیری از «از_نزد_پشتیبان» که «بله» حساب می‌شوند (پس از str، strip و lower)
+NAZD_TRUE = ("true", "1", "بله", "yes")
+
+# یکسان‌سازی هنگام بارگذاری: کلیدها (متن یکسان، category) و ستون‌های کم‌تنوع (category)
+KEY_COLS      = ["سریال پایانه","سریال","کد پذیرنده"]
+CATEGORY_COLS = ["شهر","پروژه","مدل پایانه","وضعیت نصب","نام خانوادگی پشتیبان"]
+
 # -------------------- توابع کمکی عمومی --------------------
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
     یکسان‌سازی نام ستون‌ها: جایگزینی حروف عربی با فارسی، حذف فاصله‌های اضافه.
     """
     df = df.copy()
-    df.columns = df.columns.astype(str).str.replace("ي","ی").str.replace("ك","ک").str.strip()
+    df.columns = df.columns.astype(str).str.translate(LETTERS).str.strip()
     return df
 
-def normalize_text(v) -> str:
-    """
-    نرمال‌سازی متن سلولی: یکسان‌سازی ی/ک، حذف نیم‌فاصله، فشرده‌سازی فاصله.
-    برای مقایسه‌های متنی قابل اعتمادتر.
-    """
-    if pd.isna(v): return ""
-    s = str(v).replace("ي","ی").replace("ك","ک").replace("\u200c","")
-    return re.sub(r"\s+"," ", s).strip()
-
-def extract_day_key(v) -> int|None:
-    """
-    استخراج کلید روز جلالی به صورت عددی YYYYMMDD از یک رشتهٔ تاریخ/تاریخ-زمان.
-    اگر کمتر از 8 رقم یافت شود، None برمی‌گرداند.
-    """
-    if pd.isna(v): return None
-    digits = "".join(ch for ch in str(v) if ch.isdigit())
-    if len(digits) < 8: return None
-    return int(digits[:8])
-
-def pretty_jalali(v) -> str|None:
-    """
-    تولید نمایش استاندارد YYYY/MM/DD از مقدار ورودی (با استفاده از extract_day_key).
-    """
-    k = extract_day_key(v)
-    if k is None: return None
-    y,m,d = k//10000, (k//100)%100, k%100
-    return f"{y:04d}/{m:02d}/{d:02d}"
-
-# --- تبدیل جلالی→میلادی برای اختلاف روز (محاسبه تاخیر) ---
-def jalali_to_gregorian(jy, jm, jd):
-    """
-    تبدیل تاریخ جلالی به میلادی (محاسبات روزمحور) برای محاسبه اختلاف روزها.
-    """
-    jy += 1595
-    days = -355668 + 365*jy + (jy//33)*8 + ((jy%33)+3)//4 + jd
-    days += (jm-1)*31 if jm<7 else ((jm-7)*30 + 186)
-    gy = 400*(days//146097); days%=146097
-    if days>36524:
-        gy += 100*((days-1)//36524); days=(days-1)%36524
-        if days>=365: days+=1
-    gy += 4*(days//1461); days%=1461
-    if days>365:
-        gy += (days-1)//365; days=(days-1)%365
-    gd = days+1
-    leap = (days==0)
-    gmd = [0,31,29 if leap else 28,31,30,31,30,31,31,30,31,30,31]
-    gm=1
-    while gm<=12 and gd>gmd[gm]:
-        gd-=gmd[gm]; gm+=1
-    return gy,gm,gd
-
-def jalali_key_to_ordinal(key:int) -> int|None:
-    """
-    تبدیل کلید YYYYMMDD جلالی به ordinal میلادی برای محاسبه اختلاف روزها.
-    """
-    y=key//10000; m=(key//100)%100; d=key%100
-    try:
-        gy,gm,gd = jalali_to_gregorian(y,m,d)
-        from datetime import date as _d
-        return _d(gy,gm,gd).toordinal()
-    except: return None
+def last_positions(columns, names) -> list:
+    """موقعیت ستون‌های names در columns (از نام‌های تکراری، آخرین؛ نام‌های نبوده حذف می‌شوند)."""
+    last = {c: i for i, c in enumerate(columns)}
+    return [last[c] for c in names if c in last]
 
-def days_diff_jalali(start_key:int|None, end_key:int|None) -> int|None:
+def sla_days(cities) -> np.ndarray:
     """
-    اختلاف روز بین دو کلید جلالی (end - start).
-    اگر هر کدام None باشد، None برمی‌گرداند.
+    SLA نصب هر ردیف (روز) از جدول CITY_SLA_DAYS (مقایسه با متن یکسان‌شده)؛ سایر شهرها/خالی → SLA_DEFAULT_DAYS.
     """
-    if start_key is None or end_key is None: return None
-    s = jalali_key_to_ordinal(start_key); e = jalali_key_to_ordinal(end_key)
-    if s is None or e is None: return None
-    return e - s
-
-def sla_days(city:str) -> int:
-    """
-    SLA شهر: مشهد=۲ روز، سایر شهرها=۵ روز.
-    """
-    return 2 if normalize_text(city) == "مشهد" else 5
+    table = {normalize_text(city): days for city, days in CITY_SLA_DAYS.items()}
+    return (pd.Series(normalize_values(cities)).map(table)
+              .fillna(SLA_DEFAULT_DAYS).to_numpy(dtype=np.int64))
 
 def backup_prev(path: Path) -> Path|None:
     """
@@ -225,21 +224,16 @@ def backup_prev(path: Path) -> Path|None:
     b = path.with_name(path.stem + _date.today().strftime("_prev_%Y%m%d") + path.suffix)
     shutil.copy2(path, b); return b
 
-def read_prev_triplet(prev_path: Path):
+def read_prev_triplet(prev_path: Path, with_archive: bool = True):
     """
     خواندن سه شیت خروجی قبلی (اگر باشد). اگر نبود، دیتافریم‌های خالی برمی‌گرداند.
     Pending (ساده‌تر)، Sheet2 و Archive (ستون‌های افزوده) را هم‌تراز می‌کند.
+    with_archive=False: شیت Archive پارس نمی‌شود (آرشیو در ARCHIVE_DIR است).
     """
-    cols1 = [
-        "کد پذیرنده","نام فروشگاه","شهر","آدرس","مدل پایانه","کد پایانه","سریال پایانه",
-        "نام خانوادگی پشتیبان","پروژه",
-        "تاریخ تخصیص تجهیز","تاریخ تراکنش 1025","خروج","از_نزد_پشتیبان",
-        "توضیح","مهلت","تاریخ نصب"
-    ]
-    ext  = cols1 + ["پایه_تاخیر","تحویل پست","تاخیر روز","هشدار_احتمال_تقلب"]
+    cols1, ext = PENDING_COLS, EXT_COLS
     if not prev_path or not prev_path.exists():
         return pd.DataFrame(columns=cols1), pd.DataFrame(columns=ext), pd.DataFrame(columns=ext)
-    xls = pd.ExcelFile(prev_path)
+    xls = excel_file(prev_path)
     def safe(idx, cols):
         try:
             df = normalize_columns(xls.parse(idx))
@@ -247,77 +241,92 @@ def read_prev_triplet(prev_path: Path):
                 if c not in df.columns: df[c]=pd.NA
             return df[cols]
         except: return pd.DataFrame(columns=cols)
-    return safe(0,cols1), safe(1,ext), safe(2,ext)
+    return safe(0,cols1), safe(1,ext), (safe(2,ext) if with_archive else pd.DataFrame(columns=ext))
+
+def input_files():
+    """چهار ورودی اصلی در noInstall/input به ترتیب: install، 1025، خروج، disable"""
+    return [INPUT_DIR/"install.xlsx", INPUT_DIR/"1025.xlsx", INPUT_DIR/"خروج.xlsx", INPUT_DIR/"disable.xlsx"]
 
-def load_inputs():
+def read_input(f: Path) -> pd.DataFrame:
+    """
+    خواندن یک ورودی؛ کلیدهای KEY_COLS و ستون‌های CATEGORY_COLS همین‌جا یک بار یکسان/فشرده می‌شوند.
+    """
+    if not f.exists():
+        raise FileNotFoundError(f"فایل ورودی در noInstall/input نیست: {f.name}")
+    return canonicalize(normalize_columns(read_excel(f)), KEY_COLS, CATEGORY_COLS)
+
+def load_inputs(prof: Profiler = None):
     """
     بارگذاری چهار ورودی اصلی از noInstall/input:
       - install.xlsx, 1025.xlsx, خروج.xlsx, disable.xlsx
-    اگر هر کدام نبود، خطا می‌دهد.
+    اگر هر کدام نبود، خطا می‌دهد. (prof: زمان‌سنجی خواندن هر فایل در حالت --profile)
     """
-    f_install = INPUT_DIR/"install.xlsx"
-    f_1025    = INPUT_DIR/"1025.xlsx"
-    f_exit    = INPUT_DIR/"خروج.xlsx"
-    f_disable = INPUT_DIR/"disable.xlsx"
-    missing   = [p.name for p in (f_install,f_1025,f_exit,f_disable) if not p.exists()]
+    prof = prof or Profiler("noinstall")
+    files   = input_files()
+    missing = [p.name for p in files if not p.exists()]
     if missing:
         raise FileNotFoundError("فایل‌های ورودی در noInstall/input نیستند: " + ", ".join(missing))
-    return (normalize_columns(pd.read_excel(f_install)),
-            normalize_columns(pd.read_excel(f_1025)),
-            normalize_columns(pd.read_excel(f_exit)),
-            normalize_columns(pd.read_excel(f_disable)))
+    frames = []
+    for f in files:
+        with prof.stage(f"read {f.stem}") as st:
+            frames.append(read_input(f))
+            st.rows_out = len(frames[-1])
+    return tuple(frames)
 
 # -------------------- ایندکس‌سازها برای جستجوی سریع تاریخ‌ها --------------------
-def build_1025_index(df_1025, serial_col, date_col):
-    """
-    اندیس‌سازی فایل 1025: برای هر سریال لیستی از (day_key, pretty_date) با ترتیب نزولی تاریخ.
+def build_event_table(df_events, serial_col, date_col, note_col=None):
     """
-    tmp = df_1025[[serial_col, date_col]].copy()
-    tmp["_day"]    = tmp[date_col].apply(extract_day_key)
-    tmp["_pretty"] = tmp[date_col].apply(pretty_jalali)
-    tmp = tmp.dropna(subset=["_day"]).sort_values("_day", ascending=False)
-    d={}
-    for s,grp in tmp.groupby(serial_col):
-        d[str(s)] = list(zip(grp["_day"].tolist(), grp["_pretty"].tolist()))
-    return d
-
-def build_exit_index_with_flag(df_exit, serial_col, date_col):
-    """
-    اندیس‌سازی خروج: برای هر سریال لیستی از (day_key, pretty_date, is_nazdPoshtiban)
-    - اگر در «توضیحات» عبارت «نزد پشتیبان» وجود داشته باشد، is_nazd=True است.
-    - در صورت is_nazd، pretty_date با « - نزد پشتیبان» تزئین می‌شود.
+    جدول رویدادها (1025 یا خروج) برای as-of join: ستون‌های _serial (str)، _day (کلید جلالی)
+    و در صورت وجود note_col، پرچم _nazd («نزد پشتیبان» در توضیحات).
+    ردیف‌های بدون سریال یا تاریخ معتبر حذف می‌شوند؛ خروجی بر اساس _day صعودی مرتب است.
     """
-    note_col = "توضیحات" if "توضیحات" in df_exit.columns else None
     cols = [serial_col, date_col] + ([note_col] if note_col else [])
-    tmp = df_exit[cols].copy()
-    tmp["_day"]    = tmp[date_col].apply(extract_day_key)
-    tmp["_pretty"] = tmp[date_col].apply(pretty_jalali)
-
-    def make_tuple(row):
-        day = row["_day"]
-        if day is None: return None
-        pretty = row["_pretty"]
-        is_nazd = False
-        if note_col:
-            is_nazd = "نزد پشتیبان" in normalize_text(row[note_col])
-            if pretty is not None and is_nazd:
-                pretty = pretty + " - نزد پشتیبان"
-        return (day, pretty, is_nazd)
-
-    tmp["_t"] = tmp.apply(make_tuple, axis=1)
-    tmp = tmp.dropna(subset=["_day"]).sort_values("_day", ascending=False)
-
-    d={}
-    for s,grp in tmp.groupby(serial_col):
-        d[str(s)] = [t for t in grp["_t"].tolist() if t is not None]
-    return d
+    tmp = df_events[cols]
+    tmp = tmp[tmp[serial_col].notna()]
+    ev = pd.DataFrame({"_serial": tmp[serial_col].astype(str),
+                       "_day":    jalali.day_keys(tmp[date_col])})
+    ev["_nazd"] = text_contains(tmp[note_col], "نزد پشتیبان") if note_col else False
+    ev = ev[ev["_day"] != jalali.NO_DAY]
+    return ev.sort_values("_day", kind="stable").reset_index(drop=True)
+
+def asof_pick(serials, alloc_days, events, pick=EVENT_PICK) -> np.ndarray:
+    """
+    as-of join گروه‌بندی‌شده بر اساس سریال: برای هر ردیف (serial, alloc_day) رویدادی با
+    «روز ≥ تخصیص» از events (خروجی build_event_table) انتخاب می‌شود.
+      - pick="earliest": اولین رویداد پس از تخصیص (merge_asof رو به جلو)
+      - pick="latest"  : جدیدترین رویداد سریال، اگر روزش ≥ تخصیص باشد
+    خروجی: موقعیت ردیف انتخاب‌شده در events (یا -1 اگر نبود / تخصیص خالی بود)، هم‌ترتیب ورودی.
+    """
+    left = pd.DataFrame({"_serial": pd.Series(serials).astype(str).to_numpy(),
+                         "_day": np.asarray(alloc_days, dtype=np.int32)})
+    out = np.full(len(left), -1, dtype=np.int64)
+    left["_i"] = np.arange(len(left))
+    left = left[left["_day"] != jalali.NO_DAY]
+    if left.empty or events.empty:
+        return out
+    right = events[["_serial", "_day"]].assign(_pos=np.arange(len(events)))
+    if pick == "earliest":
+        m = pd.merge_asof(left.sort_values("_day", kind="stable"), right,
+                          on="_day", by="_serial", direction="forward")
+    elif pick == "latest":
+        last = right.drop_duplicates(subset=["_serial"], keep="last")
+        m = left.merge(last.rename(columns={"_day": "_ev_day"}), on="_serial", how="left")
+        m.loc[~(m["_ev_day"] >= m["_day"]), "_pos"] = np.nan
+    else:
+        raise ValueError(f"pick نامعتبر: {pick}")
+    hit = m["_pos"].notna().to_numpy()
+    out[m["_i"].to_numpy()[hit]] = m["_pos"].to_numpy()[hit].astype(np.int64)
+    return out
 
 def build_disable_index(df_disable, serial_col):
     """
     اندیس disable بر اساس ستون «تاریخ پایان تخصیص» (اگر نبود: fallback به ستونی که «پایان تخصیص» در نام دارد،
     یا در نهایت اولین ستونی که «تاریخ» دارد).
-    خروجی: dict[serial] = [(day_key, pretty_str, merchant_code_str), ...]  (جدیدترین در اول)
+    خروجی: (by_pair, by_serial) — جدیدترین روز disable به‌ازای (سریال، کد پذیرنده) و به‌ازای سریال،
+    به صورت Series با ایندکس یکتا (برای join گروهی در disable_hits). اگر ستون تاریخ نبود، هر دو خالی.
     """
+    empty = (pd.Series(dtype=np.int32, index=pd.MultiIndex.from_arrays([[], []])),
+             pd.Series(dtype=np.int32))
     date_col = "تاریخ پایان تخصیص"
     if date_col not in df_disable.columns:
         cand = [c for c in df_disable.columns if "پایان تخصیص" in c]
@@ -328,56 +337,147 @@ def build_disable_index(df_disable, serial_col):
             if cand:
                 date_col = cand[0]
             else:
-                return {}
+                return empty
 
     merch_col = "کد پذیرنده" if "کد پذیرنده" in df_disable.columns else None
-    cols = [serial_col, date_col] + ([merch_col] if merch_col else [])
-    tmp = df_disable[cols].copy()
-    tmp["_day"]    = tmp[date_col].apply(extract_day_key)
-    tmp["_pretty"] = tmp[date_col].apply(pretty_jalali)
-    if merch_col:
-        tmp["_merch"] = tmp[merch_col].astype(str)
-    else:
-        tmp["_merch"] = ""
-    tmp = tmp.dropna(subset=["_day"]).sort_values("_day", ascending=False)
-
-    d={}
-    for s, grp in tmp.groupby(serial_col):
-        d[str(s)] = list(zip(grp["_day"].tolist(), grp["_pretty"].tolist(), grp["_merch"].tolist()))
-    return d
+    tmp = df_disable[df_disable[serial_col].notna()]
+    tmp = pd.DataFrame({
+        "_serial": tmp[serial_col].astype(str),
+        "_merch":  tmp[merch_col].astype(str) if merch_col else "",
+        "_day":    jalali.day_keys(tmp[date_col]),
+    })
+    tmp = tmp[tmp["_day"] != jalali.NO_DAY]
+    if tmp.empty:
+        return empty
+    by_pair   = tmp.groupby(["_serial", "_merch"], sort=False)["_day"].max()
+    by_serial = tmp.groupby("_serial", sort=False)["_day"].max()
+    return by_pair, by_serial
+
+def disable_hits(idx_disable, df):
+    """
+    join برداری ردیف‌های df (Pending یا Installed_Candidates) با اندیس disable:
+    جدیدترین disable با «روز ≥ تخصیص» برای همان سریال، با شرط تطبیق کد پذیرنده
+    (اگر کد پذیرنده‌ی ردیف خالی باشد، هر disable همان سریال حساب می‌شود).
+    خروجی: آرایهٔ کلید روز disable انتخاب‌شده (NO_DAY اگر نبود)، هم‌ترتیب df.
+    """
+    by_pair, by_serial = idx_disable
+    if df.empty or by_serial.empty:
+        return np.full(len(df), jalali.NO_DAY, dtype=np.int32)
+    serial = df["سریال پایانه"].astype(str).str.strip()
+    merch  = (df["کد پذیرنده"].astype(str).str.strip() if "کد پذیرنده" in df.columns
+              else pd.Series("", index=df.index))
+    alloc  = jalali.day_keys(df["تاریخ تخصیص تجهیز"])
+    pair_day   = by_pair.reindex(pd.MultiIndex.from_arrays([serial, merch])).to_numpy(dtype=float)
+    serial_day = by_serial.reindex(serial).to_numpy(dtype=float)
+    day = np.where((merch == "").to_numpy(), serial_day, pair_day)
+    hit = (alloc != jalali.NO_DAY) & (day >= alloc)   # NaN (بدون disable) → False
+    return np.where(hit, np.nan_to_num(day), jalali.NO_DAY).astype(np.int32)
+
+def split_disabled(df, dis_day, candidates=None):
+    """
+    جدا کردن ردیف‌های disable‌شده: (ردیف‌های باقی‌مانده، ردیف‌های Disabled_Log با ستون «تاریخ غیر فعال»).
+    candidates: ماسک ردیف‌هایی که اصلاً مشمول حذف هستند (پیش‌فرض: همه).
+    """
+    drop = dis_day != jalali.NO_DAY
+    if candidates is not None:
+        drop &= np.asarray(candidates, dtype=bool)
+    log = df[drop].copy()
+    log["تاریخ غیر فعال"] = jalali.format_keys(dis_day[drop])  # نمایش استاندارد از «تاریخ پایان تخصیص»
+    return df[~drop].copy(), log
+
+def key_text(s: pd.Series) -> pd.Series:
+    """
+    همان s.astype(str).str.strip() برای ستون کلید؛ روی ستون category فقط یک بار برای هر دسته (خالی → "nan").
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        table = np.append(s.cat.categories.astype(str).str.strip().to_numpy(dtype=object), "nan")
+        return pd.Series(table[s.cat.codes.to_numpy()], index=s.index)
+    return s.astype(str).str.strip()
+
+def build_install_index(df_lu, serial_col):
+    """
+    اندیس تاریخ نصب: برای هر (سریال، کد پذیرنده) جدیدترین تاریخ نصب معتبر.
+    کلیدها مثل مقایسهٔ قبلی با astype(str).strip() ساخته می‌شوند تا تطبیق دقیقاً همان بماند.
+    خروجی: DataFrame[_day، _pretty] با ایندکس یکتای (serial, merchant) (برای reindex در install_hits)
+    """
+    tmp = pd.DataFrame({
+        "_serial": key_text(df_lu[serial_col]),
+        "_merch":  key_text(df_lu["کد پذیرنده"]),
+        "_day":    df_lu["__install_day"],
+        "_pretty": df_lu["__install_pretty"],
+    })
+    tmp = tmp[tmp["_day"] != jalali.NO_DAY]
+    tmp = (tmp.sort_values("_day", ascending=False, kind="stable")
+              .drop_duplicates(subset=["_serial","_merch"], keep="first"))
+    return tmp.set_index(["_serial", "_merch"])[["_day", "_pretty"]]
+
+def install_hits(idx_install, df, alloc_days):
+    """
+    join برداری ردیف‌های df با اندیس تاریخ نصب: جدیدترین تاریخ نصب همان (سریال، کد پذیرنده)، به شرط
+    «روز ≥ تخصیص» (اگر تخصیص نامعلوم باشد، بدون شرط).
+    خروجی: (hit، کلید روز نصب، تاریخ نمایشی) به صورت آرایه‌های هم‌ترتیب df.
+    """
+    serial = key_text(df["سریال پایانه"])
+    merch  = key_text(df["کد پذیرنده"]) if "کد پذیرنده" in df.columns else pd.Series("", index=df.index)
+    found  = idx_install.reindex(pd.MultiIndex.from_arrays([serial, merch]))
+    day    = found["_day"].fillna(jalali.NO_DAY).to_numpy(dtype=np.int64)
+    hit    = (day != jalali.NO_DAY) & ((alloc_days == jalali.NO_DAY) | (day >= alloc_days))
+    return hit, np.where(hit, day, jalali.NO_DAY), found["_pretty"].to_numpy(dtype=object)
 
 # -------------------- انتخاب تاریخ‌ها با قواعد تعریف‌شده --------------------
-def pick_exit_after_alloc(exit_idx:dict, serial:str, alloc_day:int|None):
+def pick_exit_after_alloc(ev_exit, serials, alloc_days, pick=EVENT_PICK):
     """
     انتخاب خروج پس از تخصیص (فقط با تخصیص مقایسه می‌شود):
-      1) اگر خروج «نزد پشتیبان» با day >= تخصیص وجود داشت → همان را برگردان
-      2) در غیر اینصورت، اولین خروج با day >= تخصیص
-    خروجی: (exit_day_key, exit_pretty, is_nazdPoshtiban)
-    """
-    if alloc_day is None: return None, None, False
-    items = exit_idx.get(str(serial))
-    if not items: return None, None, False
-    # اولویت با نزد پشتیبان
-    for day, pretty, is_nazd in items:
-        if day >= alloc_day and is_nazd:
-            return day, pretty, True
-    for day, pretty, is_nazd in items:
-        if day >= alloc_day:
-            return day, pretty, False
-    return None, None, False
-
-def pick_1025_after_alloc(idx_1025:dict, serial:str, alloc_day:int|None):
-    """
-    انتخاب اولین 1025 پس از تخصیص (day >= تخصیص). اگر نیافت، None.
-    خروجی: (test_day_key, test_pretty)
-    """
-    if alloc_day is None: return None, None
-    items = idx_1025.get(str(serial))
-    if not items: return None, None
-    for day, pretty in items:
-        if day >= alloc_day:
-            return day, pretty
-    return None, None
+      1) اگر خروج «نزد پشتیبان» با day >= تخصیص وجود داشت → همان
+      2) در غیر اینصورت، خروج (غیر نزد پشتیبان) با day >= تخصیص
+    خروجی: (exit_day_keys, is_nazdPoshtiban) به صورت آرایه (NO_DAY اگر یافت نشد)
+    """
+    nazd  = ev_exit[ev_exit["_nazd"]].reset_index(drop=True)
+    other = ev_exit[~ev_exit["_nazd"]].reset_index(drop=True)
+    p_nazd  = asof_pick(serials, alloc_days, nazd, pick)
+    p_other = asof_pick(serials, alloc_days, other, pick)
+    day_nazd  = np.append(nazd["_day"].to_numpy(), jalali.NO_DAY)[p_nazd]
+    day_other = np.append(other["_day"].to_numpy(), jalali.NO_DAY)[p_other]
+    is_nazd = p_nazd >= 0
+    return np.where(is_nazd, day_nazd, day_other).astype(np.int32), is_nazd
+
+def pick_1025_after_alloc(ev_1025, serials, alloc_days, pick=EVENT_PICK):
+    """
+    انتخاب 1025 پس از تخصیص (day >= تخصیص). خروجی: آرایهٔ کلید روز (NO_DAY اگر یافت نشد).
+    """
+    pos = asof_pick(serials, alloc_days, ev_1025, pick)
+    return np.append(ev_1025["_day"].to_numpy(), jalali.NO_DAY)[pos].astype(np.int32)
+
+def sla_columns(sheet2, idx_install) -> pd.DataFrame:
+    """
+    تاریخ نصب، تاخیر، پایهٔ تاخیر و هشدار تقلب برای ردیف‌های شیت 2، با حساب ستونی روی کلید روزها:
+      - فقط ردیف‌هایی که تاریخ نصب معتبر در install دارند (install_hits) مقدار می‌گیرند؛ بقیه خالی و هشدار=False.
+      - هشدار: 1025 > خروج (هر دو موجود).
+      - پایه: نزد پشتیبان → خروج | غیرنزد → 1025.
+      - تاخیر = max(0, (نصب - پایه) - SLA شهر)؛ با هشدار یا پایهٔ ناموجود → خالی.
+    خروجی: DataFrame[تاریخ نصب، تاخیر روز، پایه_تاخیر، هشدار_احتمال_تقلب] هم‌ایندکس sheet2.
+    """
+    def col(name):
+        return sheet2[name] if name in sheet2.columns else pd.Series("", index=sheet2.index)
+
+    alloc = jalali.day_keys(col("تاریخ تخصیص تجهیز"))
+    test  = jalali.day_keys(col("تاریخ تراکنش 1025"))
+    exit_ = jalali.day_keys(col("خروج"))
+    nazd  = col("از_نزد_پشتیبان").astype(str).str.strip().str.lower().isin(NAZD_TRUE).to_numpy()
+    hit, inst_day, inst_pretty = install_hits(idx_install, sheet2, alloc)
+
+    fraud = hit & (test != jalali.NO_DAY) & (exit_ != jalali.NO_DAY) & (test > exit_)
+    base  = np.where(nazd, exit_, test)
+    late  = pd.Series(jalali.days_between(base, inst_day), index=sheet2.index) - sla_days(col("شهر"))
+    delay = late.clip(lower=0).mask(~hit | fraud)
+
+    na = np.full(len(sheet2), pd.NA, dtype=object)
+    return pd.DataFrame({
+        "تاریخ نصب":         np.where(hit, inst_pretty, na),
+        "تاخیر روز":         delay,
+        "پایه_تاخیر":        np.where(hit, np.where(nazd, "خروج", "1025"), na),
+        "هشدار_احتمال_تقلب": fraud,
+    }, index=sheet2.index)
 
 # -------------------- ابزار کمکی خروجی اکسل --------------------
 def col_letter(idx_zero_based:int) -> str:
@@ -391,22 +491,82 @@ def col_letter(idx_zero_based:int) -> str:
         s = chr(65+rem) + s
     return s
 
-def coalesce_text(a, b):
+def coalesce_text(a: pd.Series, b: pd.Series) -> pd.Series:
     """
-    انتخاب مقدار متن غیرخالی: اگر a خالی بود، b؛ در غیر اینصورت a.
+    انتخاب مقدار متن غیرخالی، خانه به خانه: اگر a خالی بود (پس از normalize_text)، b؛ در غیر اینصورت a.
     برای حفظ «توضیح» قبلی وقتی جدید خالی است.
     """
-    a_ = normalize_text(a)
-    b_ = normalize_text(b)
-    return a if a_ != "" else (b if b_ != "" else a)
+    a_obj = a.to_numpy(dtype=object)
+    b_obj = b.to_numpy(dtype=object)
+    has_a = normalize_values(a) != ""
+    has_b = normalize_values(b) != ""
+    return pd.Series(np.where(has_a | ~has_b, a_obj, b_obj), index=a.index, name=a.name)
 
-# -------------------- اجرای اصلی Pipeline --------------------
-def main():
-    # 1) ورودی‌ها: چهار فایل
-    df_install_full, df_1025, df_exit, df_disable = load_inputs()
+def write_output(path: Path, df_pending, sheet2, archive, disabled_log, sinks=()):
+    """
+    ذخیره خروجی + استایل‌های اکسل + Right-to-Left (چهار شیت) در یک گذر.
+    در حالت SQLite همین فایل فقط نمای وضعیت ذخیره‌شده است.
+    sinks: همان چهار شیت در قالب‌های ماشینی (common.sinks؛ install_kheir_output-<شیت>.*).
+    """
+    def style_sheet2(name, ws2, book, df):
+        # استایل‌های های‌لایت فقط روی شیت 2
+        if name != "Installed_Candidates":
+            return
+        cols2 = list(df.columns)
+        try:
+            warn_idx  = cols2.index("هشدار_احتمال_تقلب")
+            delay_idx = cols2.index("تاخیر روز")
+        except ValueError:
+            warn_idx, delay_idx = None, None
+
+        warn_format  = book.add_format({"bg_color": "#F8D7DA", "bold": True})  # قرمز کم‌رنگ برای هشدار
+        delay_format = book.add_format({"bg_color": "#FFE5B4"})                 # نارنجی ملایم برای تاخیر>0
+
+        nrows = len(df) + 1  # به اضافهٔ هدر
+        ncols = len(cols2)
+
+        # سطرهایی که هشدار=True → کل ردیف قرمز ملایم
+        if warn_idx is not None and nrows > 1:
+            warn_col_letter = col_letter(warn_idx)
+            ws2.conditional_format(f"A2:{col_letter(ncols-1)}{nrows}", {
+                "type": "formula",
+                "criteria": f'=${warn_col_letter}2=TRUE',
+                "format": warn_format
+            })
+
+        # سلول‌های «تاخیر روز» که >0 هستند → نارنجی ملایم
+        if delay_idx is not None and nrows > 1:
+            delay_col_letter = col_letter(delay_idx)
+            ws2.conditional_format(f"{delay_col_letter}2:{delay_col_letter}{nrows}", {
+                "type": "cell",
+                "criteria": ">",
+                "value": 0,
+                "format": delay_format
+            })
 
-    # ستون‌های کلیدی
-    serial_col = "سریال پایانه"
+    sheets = {
+        "Pending": df_pending,
+        "Installed_Candidates": sheet2,
+        "Archive": archive,
+        "Disabled_Log": disabled_log,
+    }
+    # راست‌چین کردن شیت‌ها در همان writer مشترک انجام می‌شود؛ Archive بزرگ به صورت جریانی نوشته می‌شود
+    write_xlsx(path, sheets, on_sheet=style_sheet2)
+    write_sinks(path, sheets, sinks)
+
+# -------------------- مراحل آماده‌سازی ورودی‌ها --------------------
+# هر مرحله فقط به یک فایل ورودی وابسته است؛ حالت --watch خروجی‌شان را تا تغییر همان فایل نگه می‌دارد.
+SERIAL_COL = "سریال پایانه"
+
+def prepare_install(df_install_full, prof: Profiler = None):
+    """
+    مراحل 2 تا 4 روی install: حذف پروژه فروش، انتخاب Pending (وضعیت نصب = خیر) و روز تخصیص.
+    خروجی: (ستون‌های INSTALL_INDEX_COLS از install بدون پروژه فروش، ردیف‌های Pending با ستون‌های
+    PENDING_COLS، روز تخصیص). install کامل کپی نمی‌شود: فیلترها ماسک بولی‌اند و هر خروجی با یک
+    iloc فقط ستون‌های خودش را برمی‌دارد (از نام‌های تکراری، آخرین).
+    """
+    prof = prof or Profiler("noinstall")
+    serial_col = SERIAL_COL
     alloc_col  = "تاریخ تخصیص تجهیز"
     proj_col   = "پروژه"
     status_col = "وضعیت نصب"
@@ -416,95 +576,155 @@ def main():
         if col not in df_install_full.columns:
             raise KeyError(f"ستون «{col}» در install.xlsx نیست.")
 
-    # 2) حذف پروژه فروش از install کامل
-    df_install_full = df_install_full[df_install_full[proj_col].apply(lambda x: normalize_text(x)!="پروژه فروش")].copy()
+    # 2) حذف پروژه فروش از install کامل (فقط ماسک)
+    with prof.stage("filter install", rows_in=len(df_install_full)) as st:
+        mask_keep = ~text_equals(df_install_full[proj_col], "پروژه فروش")
 
-    # 3) Pending = نصب‌نشده‌ها (وضعیت نصب = خیر)
-    df_install = df_install_full[df_install_full[status_col].apply(lambda x: normalize_text(x)=="خیر")].copy()
+        # 3) Pending = نصب‌نشده‌ها (وضعیت نصب = خیر)
+        mask_pending = mask_keep & text_equals(df_install_full[status_col], "خیر")
+        cols = df_install_full.columns
+        df_install = df_install_full.iloc[mask_pending, last_positions(cols, PENDING_COLS)]
+        df_lookup  = df_install_full.iloc[mask_keep, last_positions(cols, INSTALL_INDEX_COLS)]
 
-    # 4) استانداردسازی و استخراج تاریخ تخصیص
-    df_install["__alloc_day"]    = df_install[alloc_col].apply(extract_day_key)
-    df_install["__alloc_pretty"] = df_install[alloc_col].apply(pretty_jalali)
+        # 4) استانداردسازی و استخراج تاریخ تخصیص
+        alloc_day = jalali.day_keys(df_install[alloc_col])
+        st.rows_out = len(df_install)
+    return df_lookup, df_install, alloc_day
 
-    # 5) ساخت ایندکس‌ها برای جستجوی سریع
-    #    - ستون تاریخ در 1025/خروج را با اولین ستونی که «تاریخ» در نام دارد می‌یابیم
+#    ستون تاریخ در 1025/خروج را با اولین ستونی که «تاریخ» در نام دارد می‌یابیم
+def index_1025(df_1025):
+    """جدول رویدادهای 1025 (build_event_table)."""
     date_col_1025 = next(c for c in df_1025.columns if "تاریخ" in c)
-    if serial_col not in df_exit.columns and "سریال" in df_exit.columns:
-        df_exit.rename(columns={"سریال": serial_col}, inplace=True)
+    return build_event_table(df_1025, SERIAL_COL, date_col_1025)
+
+def index_exit(df_exit):
+    """جدول رویدادهای خروج با پرچم «نزد پشتیبان» (ستون «سریال» در صورت نیاز «سریال پایانه» می‌شود)."""
+    if SERIAL_COL not in df_exit.columns and "سریال" in df_exit.columns:
+        df_exit = df_exit.rename(columns={"سریال": SERIAL_COL})
     exit_date_col = next(c for c in df_exit.columns if "تاریخ" in c)
+    exit_note_col = "توضیحات" if "توضیحات" in df_exit.columns else None
+    return build_event_table(df_exit, SERIAL_COL, exit_date_col, exit_note_col)
+
+def index_install(df_lookup):
+    """
+    اندیس (سریال، کد پذیرنده) → جدیدترین تاریخ نصب، یک بار از ستون‌های INSTALL_INDEX_COLS
+    install (خروجی prepare_install)؛ به‌جای فیلتر کل install برای هر ردیف شیت 2.
+    """
+    df_lu = df_lookup[[SERIAL_COL, "کد پذیرنده"]].copy()
+    df_lu["تاریخ نصب"] = df_lookup["تاریخ نصب"] if "تاریخ نصب" in df_lookup.columns else pd.NA
+    df_lu["__install_day"]    = jalali.day_keys(df_lu["تاریخ نصب"])
+    df_lu["__install_pretty"] = jalali.format_keys(df_lu["__install_day"])
+    return build_install_index(df_lu, SERIAL_COL)
+
+# -------------------- اجرای اصلی Pipeline --------------------
+def main(use_sqlite: bool = False, prof: Profiler = None, archive_months: int = ARCHIVE_MONTHS,
+         sinks=()):
+    prof = prof or Profiler("noinstall")
+
+    # 1) ورودی‌ها: چهار فایل
+    df_install_full, df_1025, df_exit, df_disable = load_inputs(prof)
+
+    # 2-4) install: حذف پروژه فروش، Pending و روز تخصیص
+    install = prepare_install(df_install_full, prof)
+
+    # 5) ساخت ایندکس‌ها برای جستجوی سریع
+    with prof.stage("build indexes", rows_in=len(df_1025) + len(df_exit) + len(df_disable)):
+        ev_1025     = index_1025(df_1025)
+        ev_exit     = index_exit(df_exit)
+        idx_disable = build_disable_index(df_disable, SERIAL_COL)
+
+    with prof.stage("install index", rows_in=len(install[0])):
+        idx_install = index_install(install[0])
 
-    idx_1025    = build_1025_index(df_1025, serial_col, date_col_1025)
-    idx_exit    = build_exit_index_with_flag(df_exit, serial_col, exit_date_col)
-    idx_disable = build_disable_index(df_disable, serial_col)
+    run_pipeline(install, ev_1025, ev_exit, idx_disable, idx_install, use_sqlite, prof, archive_months, sinks)
+
+def run_pipeline(install, ev_1025, ev_exit, idx_disable, idx_install,
+                 use_sqlite: bool = False, prof: Profiler = None, archive_months: int = ARCHIVE_MONTHS,
+                 sinks=()):
+    """
+    مراحل 6 تا 16 (ساخت Pending، وضعیت قبلی، شیت 2، SLA/تقلب و نوشتن خروجی) روی ورودی‌های آماده‌شده.
+    وضعیت قبلی هر بار از خروجی/مخزن خوانده می‌شود؛ ورودی‌ها تغییر داده نمی‌شوند.
+    archive_months: پنجرهٔ ماه‌های شیت Archive (0 = کل آرشیو).
+    sinks: قالب‌های ماشینی خروجی کنار اکسل (common.sinks).
+    """
+    prof = prof or Profiler("noinstall")
+    _, df_install, alloc_day = install
+    serial_col = SERIAL_COL
 
     # 6) ساخت Pending جدید با پر کردن تاریخ‌های نمایش و پرچم نزد پشتیبان
-    rows=[]
-    for _, r in df_install.iterrows():
-        serial    = str(r.get(serial_col,""))
-        alloc_day = r["__alloc_day"]
-        alloc_pre = r["__alloc_pretty"]
-
-        t1025_day, t1025_pre = pick_1025_after_alloc(idx_1025, serial, alloc_day)
-        exit_day, exit_pre, is_nazd = pick_exit_after_alloc(idx_exit, serial, alloc_day)
-
-        out = dict(r)
-        out["تاریخ تخصیص تجهیز"] = alloc_pre
-        out["تاریخ تراکنش 1025"] = t1025_pre
-        out["خروج"]              = exit_pre
-        out["از_نزد_پشتیبان"]   = bool(is_nazd)
-        rows.append(out)
-
-    df_pending = pd.DataFrame(rows)
-    df_pending = normalize_columns(df_pending)
-
-    # ستون‌های نهایی Pending (سازگار با خروجی قدیم)
-    s1_cols = ["کد پذیرنده","نام فروشگاه","شهر","آدرس","مدل پایانه","کد پایانه","سریال پایانه",
-               "نام خانوادگی پشتیبان","پروژه",
-               "تاریخ تخصیص تجهیز","تاریخ تراکنش 1025","خروج","از_نزد_پشتیبان",
-               "توضیح","مهلت","تاریخ نصب"]
-    for c in s1_cols:
-        if c not in df_pending.columns: df_pending[c]=pd.NA
-    df_pending = df_pending[s1_cols]
-
-    # 7) خروجی قبلی را بخوان و از آن برای حفظ «توضیح» استفاده کن
-    prev_backup = backup_prev(OUTPUT)
-    prev_pending, prev_sheet2, prev_archive = read_prev_triplet(prev_backup if prev_backup else OUTPUT)
+    #    تاریخ‌های 1025/خروج برای همهٔ ردیف‌ها یک‌جا با as-of join انتخاب می‌شوند
+    with prof.stage("pick 1025/exit", rows_in=len(df_install)):
+        t1025_day = pick_1025_after_alloc(ev_1025, df_install[serial_col], alloc_day)
+        exit_day, is_nazd = pick_exit_after_alloc(ev_exit, df_install[serial_col], alloc_day)
+        exit_pre = jalali.format_keys(exit_day)
+        exit_pre[is_nazd] = exit_pre[is_nazd] + " - نزد پشتیبان"
+
+    #    Pending ستون به ستون ساخته می‌شود: ستون‌های محاسبه‌شده جایگزین، بقیه از install، نبودها خالی
+    with prof.stage("build Pending", rows_in=len(df_install)) as st:
+        computed = {
+            "تاریخ تخصیص تجهیز": jalali.format_keys(alloc_day),
+            "تاریخ تراکنش 1025": jalali.format_keys(t1025_day),
+            "خروج":              exit_pre,
+            "از_نزد_پشتیبان":   np.asarray(is_nazd, dtype=bool),
+        }
+        df_install = df_install.reset_index(drop=True)
+        df_pending = pd.DataFrame({
+            c: computed[c] if c in computed else (df_install[c] if c in df_install.columns else pd.NA)
+            for c in PENDING_COLS
+        }, index=df_install.index)
+        st.rows_out = len(df_pending)
+
+    # 7) وضعیت قبلی را بخوان و از آن برای حفظ «توضیح» استفاده کن
+    #    - حالت عادی: از خروجی اکسل قبلی (با بک‌آپ)؛ Archive از آرشیو ماهانه (اگر pyarrow نصب باشد)
+    #    - حالت SQLite: از مخزن وضعیت؛ Archive برای محاسبه خوانده نمی‌شود
+    with prof.stage("load previous state") as st:
+        store = None
+        archive_store = None
+        prev_backup = None
+        if use_sqlite:
+            store = StateStore(STATE_DB, PENDING_COLS, EXT_COLS, BOOL_COLS)
+            if store.is_new and OUTPUT.exists():
+                # اولین اجرا با SQLite: وضعیت از اکسل قبلی منتقل می‌شود
+                boot_pending, boot_sheet2, boot_archive = read_prev_triplet(OUTPUT)
+                store.apply_run(boot_pending, boot_sheet2, boot_archive)
+            prev_pending, prev_sheet2 = store.load_pending(), store.load_sheet2()
+            prev_archive = None
+        else:
+            prev_backup = backup_prev(OUTPUT)
+            prev_path = prev_backup if prev_backup else OUTPUT
+            if HAS_PYARROW:
+                archive_store = ArchiveStore(ARCHIVE_DIR, EXT_COLS)
+                if archive_store.is_new:
+                    # اولین اجرا با آرشیو ماهانه: کل شیت Archive اکسل قبلی یک بار منتقل می‌شود
+                    prev_pending, prev_sheet2, boot_archive = read_prev_triplet(prev_path)
+                    print("🗃️ Archive:", ARCHIVE_DIR, archive_store.append(boot_archive))
+                else:
+                    prev_pending, prev_sheet2, _ = read_prev_triplet(prev_path, with_archive=False)
+            else:
+                print("ℹ️ pyarrow نصب نیست؛ کل Archive در اکسل نگه داشته می‌شود. (pip install pyarrow)")
+                prev_pending, prev_sheet2, prev_archive = read_prev_triplet(prev_path)
+        # کلیدهای وضعیت قبلی هم مثل ورودی‌ها (تطبیق «توضیح» و سریال‌ها روی همان متن یکسان)
+        for prev in (prev_pending, prev_sheet2):
+            canonicalize(prev, KEY_COLS)
+        st.rows_out = len(prev_pending)
 
     # نگهداری توضیحات قبلی: merge روی «سریال پایانه»، و coalesce روی ستون «توضیح»
-    if not prev_pending.empty and not df_pending.empty:
-        df_pending = df_pending.merge(
-            prev_pending[["سریال پایانه","توضیح"]],
-            on="سریال پایانه", how="left", suffixes=("", "_old")
-        )
-        df_pending["توضیح"] = df_pending.apply(
-            lambda r: coalesce_text(r.get("توضیح"), r.get("توضیح_old")), axis=1
-        )
-        if "توضیح_old" in df_pending.columns:
-            df_pending.drop(columns=["توضیح_old"], inplace=True)
+    with prof.stage("merge previous notes", rows_in=len(df_pending)) as st:
+        if not prev_pending.empty and not df_pending.empty:
+            df_pending = df_pending.merge(
+                prev_pending[["سریال پایانه","توضیح"]],
+                on="سریال پایانه", how="left", suffixes=("", "_old")
+            )
+            df_pending["توضیح"] = coalesce_text(df_pending["توضیح"], df_pending["توضیح_old"])
+            if "توضیح_old" in df_pending.columns:
+                df_pending.drop(columns=["توضیح_old"], inplace=True)
+        st.rows_out = len(df_pending)
 
     # 8) حذف از Pending بر اساس disable (غیرفعال‌شده پس از تخصیص)
-    disabled_log_rows = []
-    if not df_pending.empty:
-        keep_mask = []
-        for _, row in df_pending.iterrows():
-            serial = str(row["سریال پایانه"]).strip()
-            merch  = str(row.get("کد پذیرنده","")).strip()
-            alloc_day = extract_day_key(row.get("تاریخ تخصیص تجهیز"))
-            dis_items = idx_disable.get(serial, [])
-            picked = None
-            # جدیدترین disable پس از تخصیص، با ترجیح match کد پذیرنده
-            for dday, dpretty, dmerch in dis_items:
-                if alloc_day is not None and dday >= alloc_day and (merch=="" or dmerch==merch):
-                    picked = (dday, dpretty); break
-            if picked is None:
-                keep_mask.append(True)
-            else:
-                # حذف از Pending و ثبت در Disabled_Log
-                log = dict(row)
-                log["تاریخ غیر فعال"] = picked[1]  # نمایش استاندارد از «تاریخ پایان تخصیص»
-                disabled_log_rows.append(log)
-                keep_mask.append(False)
-        df_pending = df_pending[keep_mask].copy()
+    #    جدیدترین disable پس از تخصیص، با شرط match کد پذیرنده (join گروهی روی اندیس disable)
+    with prof.stage("disable filter Pending", rows_in=len(df_pending)) as st:
+        df_pending, log_pending = split_disabled(df_pending, disable_hits(idx_disable, df_pending))
+        st.rows_out = len(df_pending)
 
     # 9) ابتدای هر اجرا: پاکسازی شیت2 قبلی از موارد نصب‌شده بدون هشدار
     sheet2 = prev_sheet2.copy()
@@ -529,108 +749,37 @@ def main():
         sheet2 = pd.concat([sheet2, new_cands], ignore_index=True)
 
     # 11) حذف از Sheet2 بر اساس disable (برای مواردی که هنوز تاریخ نصب ندارند)
-    if not sheet2.empty:
-        keep_mask2 = []
-        for _, row in sheet2.iterrows():
-            if pd.notna(row.get("تاریخ نصب")):
-                keep_mask2.append(True)
-                continue
-            serial = str(row["سریال پایانه"]).strip()
-            merch  = str(row.get("کد پذیرنده","")).strip()
-            alloc_day = extract_day_key(row.get("تاریخ تخصیص تجهیز"))
-            dis_items = idx_disable.get(serial, [])
-            picked = None
-            for dday, dpretty, dmerch in dis_items:
-                if alloc_day is not None and dday >= alloc_day and (merch=="" or dmerch==merch):
-                    picked = (dday, dpretty); break
-            if picked is None:
-                keep_mask2.append(True)
-            else:
-                # حذف از Sheet2 و ثبت در Disabled_Log
-                log = dict(row)
-                log["تاریخ غیر فعال"] = picked[1]
-                disabled_log_rows.append(log)
-                keep_mask2.append(False)
-        sheet2 = sheet2[keep_mask2].copy()
+    with prof.stage("disable filter Installed_Candidates", rows_in=len(sheet2)) as st:
+        sheet2, log_sheet2 = split_disabled(sheet2, disable_hits(idx_disable, sheet2),
+                                            candidates=sheet2["تاریخ نصب"].isna().to_numpy())
+        st.rows_out = len(sheet2)
 
     # 12) تکمیل «تاریخ نصب» و محاسبهٔ «تاخیر» + «پایه_تاخیر» + Fraud روی Sheet2
-    df_lu = df_install_full.copy()
-    if "تاریخ نصب" not in df_lu.columns:
-        df_lu["تاریخ نصب"] = pd.NA
-    df_lu["__install_day"]    = df_lu["تاریخ نصب"].apply(extract_day_key)
-    df_lu["__install_pretty"] = df_lu["تاریخ نصب"].apply(pretty_jalali)
-
-    install_days = []
-    delays = []
-    bases  = []
-    frauds = []
-
-    for _, row in sheet2.iterrows():
-        serial = str(row.get("سریال پایانه","")).strip()
-        merch  = str(row.get("کد پذیرنده","")).strip()
-        alloc_day = extract_day_key(row.get("تاریخ تخصیص تجهیز"))
-        test_day  = extract_day_key(row.get("تاریخ تراکنش 1025"))
-        exit_day  = extract_day_key(row.get("خروج"))
-        # پرچم نزد پشتیبان: تعیین «پایه_تاخیر»
-        is_nazd   = str(row.get("از_نزد_پشتیبان","")).strip().lower() in ("true","1","بله","yes")
-
-        # از install کامل: جدیدترین تاریخ نصب معتبر (≥ تخصیص) برای همین سریال+کد پذیرنده
-        sub = df_lu[
-            (df_lu["سریال پایانه"].astype(str).str.strip()==serial) &
-            (df_lu["کد پذیرنده"].astype(str).str.strip()==merch) &
-            (df_lu["__install_day"].notna())
-        ].copy()
-        if alloc_day is not None:
-            sub = sub[sub["__install_day"] >= alloc_day]
-        sub = sub.sort_values("__install_day", ascending=False)
-
-        if not sub.empty:
-            inst_day   = int(sub["__install_day"].iloc[0])
-            inst_prett = sub["__install_pretty"].iloc[0]
-            install_days.append(inst_prett)
-
-            # Fraud: اگر 1025 > خروج (هر دو موجود)، هشدار True
-            is_fraud = (test_day is not None and exit_day is not None and test_day > exit_day)
-            frauds.append(True if is_fraud else False)
-
-            # پایه تاخیر: نزد پشتیبان → خروج | غیرنزد → 1025
-            if is_nazd:
-                base = exit_day; bases.append("خروج")
-            else:
-                base = test_day; bases.append("1025")
-
-            # اگر هشدار یا base ناموجود → تاخیر NA
-            if is_fraud or base is None:
-                delays.append(pd.NA)
-            else:
-                diff = days_diff_jalali(base, inst_day)
-                if diff is None:
-                    delays.append(pd.NA)
-                else:
-                    late = diff - sla_days(row.get("شهر"))
-                    delays.append(int(late) if late>0 else 0)
-        else:
-            # هنوز تاریخ نصب در install دیده نشده
-            install_days.append(pd.NA)
-            delays.append(pd.NA)
-            bases.append(pd.NA)
-            frauds.append(False)
-
-    if not sheet2.empty:
-        mask_fill = sheet2["تاریخ نصب"].isna()
-        sheet2.loc[mask_fill, "تاریخ نصب"]       = pd.Series(install_days, index=sheet2.index)[mask_fill]
-        sheet2["تاخیر روز"]                      = pd.Series(delays, index=sheet2.index)
-        sheet2["پایه_تاخیر"]                     = pd.Series(bases, index=sheet2.index)
-        sheet2["هشدار_احتمال_تقلب"]              = pd.Series(frauds, index=sheet2.index)
+    #     (اندیس تاریخ نصب idx_install از index_install)
+    with prof.stage("SLA/fraud", rows_in=len(sheet2)):
+        if not sheet2.empty:
+            sla = sla_columns(sheet2, idx_install)
+            mask_fill = sheet2["تاریخ نصب"].isna()
+            sheet2.loc[mask_fill, "تاریخ نصب"] = sla.loc[mask_fill, "تاریخ نصب"]
+            for c in ["تاخیر روز", "پایه_تاخیر", "هشدار_احتمال_تقلب"]:
+                sheet2[c] = sla[c]
 
     # 13) آرشیو: نصب‌شده‌های همین اجرا که هشدار=False
-    archive = prev_archive.copy()
     installed_now = sheet2[(sheet2["تاریخ نصب"].notna()) & (~sheet2["هشدار_احتمال_تقلب"].fillna(False))].copy()
-    if not installed_now.empty:
-        archive = pd.concat([archive, installed_now], ignore_index=True)
+    if archive_store is not None:
+        # پنجرهٔ اخیر برای اکسل (شامل ردیف‌های همین اجرا)؛ افزودن به آرشیو پس از نوشتن موفق اکسل
+        with prof.stage("load archive window") as st:
+            archive = archive_store.recent(archive_months, extra=installed_now)
+            st.rows_out = len(archive)
+    elif store is None:
+        archive = prev_archive.copy()
+        if not installed_now.empty:
+            archive = pd.concat([archive, installed_now], ignore_index=True)
 
     # 14) Disabled_Log: جمع‌آوری موارد حذف‌شده به دلیل disable
-    disabled_log = pd.DataFrame(disabled_log_rows) if disabled_log_rows else pd.DataFrame(columns=list(df_pending.columns)+["تاریخ غیر فعال"])
+    logs = [log for log in (log_pending, log_sheet2) if not log.empty]
+    disabled_log = (pd.concat(logs, ignore_index=True) if logs
+                    else pd.DataFrame(columns=list(df_pending.columns)+["تاریخ غیر فعال"]))
     disabled_log = normalize_columns(disabled_log)
 
     # 15) یکتاسازی Sheet2 بر اساس سریال (آخرین رکورد نگه‌داشته می‌شود)
@@ -639,60 +788,105 @@ def main():
         sheet2["_row"] = sheet2.index
         sheet2 = sheet2.sort_values("_row").drop_duplicates(subset=["سریال پایانه"], keep="last").drop(columns=["_row"])
 
-    # 16) ذخیره خروجی + استایل‌های اکسل + Right-to-Left
-    with pd.ExcelWriter(OUTPUT, engine="xlsxwriter") as w:
-        df_pending.to_excel(w, index=False, sheet_name="Pending")
-        sheet2.to_excel(w, index=False, sheet_name="Installed_Candidates")
-        archive.to_excel(w, index=False, sheet_name="Archive")
-        disabled_log.to_excel(w, index=False, sheet_name="Disabled_Log")
-
-        # راست‌چین کردن شیت‌ها (مطابق تنظیم sheet-right-to-left در اکسل)
-        for sh in ["Pending","Installed_Candidates","Archive","Disabled_Log"]:
-            w.sheets[sh].right_to_left()
-
-        # استایل‌های های‌لایت روی شیت 2
-        ws2 = w.sheets["Installed_Candidates"]
-        cols2 = list(sheet2.columns)
-        try:
-            warn_idx  = cols2.index("هشدار_احتمال_تقلب")
-            delay_idx = cols2.index("تاخیر روز")
-        except ValueError:
-            warn_idx, delay_idx = None, None
-
-        warn_format  = w.book.add_format({"bg_color": "#F8D7DA", "bold": True})  # قرمز کم‌رنگ برای هشدار
-        delay_format = w.book.add_format({"bg_color": "#FFE5B4"})                 # نارنجی ملایم برای تاخیر>0
-
-        nrows = len(sheet2) + 1  # به اضافهٔ هدر
-        ncols = len(cols2)
-
-        # سطرهایی که هشدار=True → کل ردیف قرمز ملایم
-        if warn_idx is not None and nrows > 1:
-            warn_col_letter = col_letter(warn_idx)
-            ws2.conditional_format(f"A2:{col_letter(ncols-1)}{nrows}", {
-                "type": "formula",
-                "criteria": f'=${warn_col_letter}2=TRUE',
-                "format": warn_format
-            })
-
-        # سلول‌های «تاخیر روز» که >0 هستند → نارنجی ملایم
-        if delay_idx is not None and nrows > 1:
-            delay_col_letter = col_letter(delay_idx)
-            ws2.conditional_format(f"{delay_col_letter}2:{delay_col_letter}{nrows}", {
-                "type": "cell",
-                "criteria": ">",
-                "value": 0,
-                "format": delay_format
-            })
+    # 16) ذخیره وضعیت (حالت SQLite: فقط تغییرات) و نوشتن خروجی اکسل
+    if store is not None:
+        with prof.stage("save state (sqlite)", rows_in=len(df_pending) + len(sheet2)):
+            stats = store.apply_run(df_pending, sheet2, installed_now)
+            archive = store.recent_archive(archive_months)
+            store.close()
+            print("🗄️ SQLite:", STATE_DB, stats)
+    with prof.stage("write output", rows_in=len(df_pending) + len(sheet2) + len(archive)):
+        write_output(OUTPUT, df_pending, sheet2, archive, disabled_log, sinks)
+    if archive_store is not None:
+        with prof.stage("append archive", rows_in=len(installed_now)):
+            appended = archive_store.append(installed_now)
+        if appended:
+            print("🗃️ Archive:", ARCHIVE_DIR, appended)
 
     print("✅ Done")
     print(f"📄 Output: {OUTPUT}")
+    if sinks:
+        print("🧩 Sinks:", ", ".join(sinks))
     if prev_backup:
         print(f"💾 Backup: {prev_backup}")
 
-# نقطهٔ ورود استاندارد پایتون برای اجرای مستقیم فایل:
-if __name__ == "__main__":
+# -------------------- حالت پایش پوشه (--watch) --------------------
+def run_watch(use_sqlite: bool = False, prof: Profiler = None, archive_months: int = ARCHIVE_MONTHS,
+              sinks=()):
+    """
+    پایش noInstall/input: هر ورودی و ایندکس وابسته‌اش یک مرحلهٔ جدا در StageGraph است و در حافظه
+    می‌ماند؛ با تغییر یک فایل فقط همان فایل و ایندکس‌هایش دوباره ساخته می‌شوند و مراحل 6 تا 16
+    (که به وضعیت قبلی هم وابسته‌اند) دوباره اجرا می‌شوند.
+    """
+    off = Profiler("noinstall")   # مراحل داخلی ثبت نمی‌شوند؛ زمان هر مرحلهٔ گراف ثبت می‌شود
+    graph = StageGraph(prof)
+    paths = {}
+    for f in input_files():
+        graph.add(f.stem, lambda f=f: read_input(f))
+        paths[f.stem] = f
+    install_name, name_1025, exit_name, disable_name = paths
+    graph.add("prepare install", lambda df: prepare_install(df, off), [install_name])
+    graph.add("install index", lambda install: index_install(install[0]), ["prepare install"])
+    graph.add("index 1025", index_1025, [name_1025])
+    graph.add("index exit", index_exit, [exit_name])
+    graph.add("index disable", lambda df: build_disable_index(df, SERIAL_COL), [disable_name])
+    graph.add("pipeline",
+              lambda *prepared: run_pipeline(*prepared, use_sqlite=use_sqlite, prof=off,
+                                             archive_months=archive_months, sinks=sinks),
+              ["prepare install", "index 1025", "index exit", "index disable", "install index"])
+
+    watch_loop(paths, graph, ["pipeline"], on_done=lambda seconds: print(f"⏱️ {seconds:.1f} s"))
+
+# -------------------- خروجی گرفتن از آرشیو --------------------
+def export_archive(period: str, use_sqlite: bool = False) -> Path:
+    """
+    نوشتن ردیف‌های آرشیو یک دوره در فایل اکسل جدا (Desktop/noInstall/archive_<دوره>.xlsx).
+    period: «140401:140406»، «140403» (یک ماه)، «140401:» یا «» (کل آرشیو).
+    """
+    start_s, _, end_s = period.partition(":") if ":" in period else (period, "", period)
+    start = parse_month(start_s) if start_s.strip() else None
+    end   = parse_month(end_s) if end_s.strip() else None
+    label = ("all" if not (start or end) else str(start) if start == end
+             else f"{start or 'start'}-{end or 'end'}")
+    path  = BASE_DIR / f"archive_{label}.xlsx"
+    if use_sqlite:
+        store = StateStore(STATE_DB, PENDING_COLS, EXT_COLS, BOOL_COLS)
+        try:
+            df = store.load_archive(since_month=start, until_month=end)
+        finally:
+            store.close()
+        write_xlsx(path, {"Archive": df})
+        n = len(df)
+    else:
+        if not HAS_PYARROW:
+            raise RuntimeError("آرشیو ماهانه نیازمند pyarrow است (pip install pyarrow).")
+        n = ArchiveStore(ARCHIVE_DIR, EXT_COLS).export(path, start, end)
+    print(f"✅ {n} ردیف آرشیو")
+    print(f"📄 Output: {path}")
+    return path
+
+# -------------------- اجرا با آرگومان‌های خط فرمان --------------------
+def run(args) -> int:
+    """
+    اجرای noInstall با آرگومان‌های پارس‌شدهٔ common.options (اجرای مستقیم یا cli.py).
+    خروجی: کد خروج (0 موفق، 1 خطا).
+    """
+    prof = Profiler("noinstall", enabled=args.profile is not None)
     try:
-        main()
+        if args.export_archive is not None:
+            export_archive(args.export_archive, use_sqlite=args.sqlite)
+            return 0
+        if args.watch:
+            run_watch(use_sqlite=args.sqlite, prof=prof, archive_months=args.archive_months,
+                      sinks=args.sinks)
+        else:
+            main(use_sqlite=args.sqlite, prof=prof, archive_months=args.archive_months, sinks=args.sinks)
+        prof.write_report(args.profile or BASE_DIR)
     except Exception as e:
         print("❌ Error:", e)
-        sys.exit(1)
+        return 1
+    return 0
+
+# نقطهٔ ورود استاندارد پایتون برای اجرای مستقیم فایل:
+if __name__ == "__main__":
+    sys.exit(run(build_parser("noinstall").parse_args()))
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+state_store.py
+==============================
+
+مخزن وضعیت SQLite (اختیاری) برای noInstall.py.
+
+به‌جای نگهداری وضعیت بین اجراها فقط در install_kheir_output.xlsx (کپی، خواندن همهٔ شیت‌ها
+و بازنویسی کامل در هر اجرا)، جدول‌های Pending، Installed_Candidates و Archive در یک فایل
+SQLite محلی نگهداری می‌شوند و اکسل فقط «نمای» خروجی است.
+
+جدول‌ها:
+---------
+- pending / installed_candidates : هر ردیف با کلید _key = سریال|کد پذیرنده|شمارهٔ تکرار،
+  هش محتوا (_hash) و ترتیب ردیف در اجرا (_ord). هر اجرا فقط diff اعمال می‌شود: ردیف‌های
+  حذف‌شده DELETE، ردیف‌های جدید یا تغییرکرده INSERT OR REPLACE، و برای ردیف‌های جابه‌جاشده
+  فقط _ord به‌روز می‌شود (ترتیب ردیف‌ها در منطق «آخرین رکورد» اهمیت دارد).
+- archive : فقط افزایشی (append-only)؛ برای محاسبات اجرا خوانده نمی‌شود. ستون _month (ماه جلالی
+  YYYYMM «تاریخ نصب»؛ 0 = نامعلوم) ایندکس دارد و نمای اکسل (recent_archive) و خروجی دوره‌ای
+  (load_archive با بازهٔ ماه) فقط ماه‌های لازم را با WHERE می‌خوانند، نه کل تاریخچه را.
+- meta    : نسخهٔ شِما و زمان آخرین اجرا.
+- روی «سریال پایانه» و «کد پذیرنده» در هر سه جدول ایندکس وجود دارد.
+- مخزن‌های نسخهٔ 1 (بدون _month) در اولین باز شدن یک بار ارتقا می‌یابند (ستون و ایندکس _month).
+
+نکات:
+------
+- ستون‌ها بدون نوع (affinity) ساخته می‌شوند تا مقدارها همان‌طور که هستند (عدد/متن) ذخیره شوند،
+  مشابه رفت‌وبرگشت از اکسل.
+- ستون‌های بولی (مثل «هشدار_احتمال_تقلب») هنگام خواندن از 0/1 به True/False برگردانده می‌شوند.
+- کل اعمال یک اجرا در یک تراکنش انجام می‌شود.
+"""
+
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from archive_store import UNKNOWN, month_keys, shift_month
+
+SCHEMA_VERSION = 2
+SERIAL_COL = "سریال پایانه"
+MERCH_COL  = "کد پذیرنده"
+
+
+def _q(name: str) -> str:
+    """نقل‌قول شناسهٔ SQL (نام ستون‌های فارسی با فاصله)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _to_sql_value(v):
+    """تبدیل مقدار پانداس/نامپای به مقدار قابل ذخیره در sqlite3."""
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if isinstance(v, float) and v != v:
+        return None
+    if isinstance(v, np.generic):
+        v = v.item()
+        return None if isinstance(v, float) and v != v else v
+    if isinstance(v, (pd.Timestamp, datetime)):
+        return str(v)
+    return v
+
+
+def _row_keys(df: pd.DataFrame) -> pd.Series:
+    """کلید ردیف: سریال|کد پذیرنده|شمارهٔ تکرار همان جفت (برای سریال‌های تکراری)."""
+    serial = df[SERIAL_COL].astype(str).str.strip()
+    merch  = df[MERCH_COL].astype(str).str.strip()
+    base = serial + "|" + merch
+    return base + "|" + base.groupby(base).cumcount().astype(str)
+
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    """هش محتوای هر ردیف برای تشخیص ردیف‌های تغییرکرده."""
+    return pd.util.hash_pandas_object(df.astype(str), index=False).astype(np.int64)
+
+
+class StateStore:
+    """
+    مخزن وضعیت noInstall روی SQLite.
+      pending_cols / ext_cols : ستون‌های شیت Pending و شیت‌های 2/3 (مطابق خروجی اکسل)
+      bool_cols               : ستون‌هایی که باید بولی خوانده شوند
+    """
+
+    def __init__(self, path, pending_cols, ext_cols, bool_cols=()):
+        self.path = path
+        self.pending_cols = list(pending_cols)
+        self.ext_cols = list(ext_cols)
+        self.bool_cols = set(bool_cols)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.is_new = self._ensure_schema()
+
+    # -------------------- شِما --------------------
+    def _ensure_schema(self) -> bool:
+        cur = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='meta'")
+        if cur.fetchone() is not None:
+            self._migrate()
+            return False
+        with self.conn:
+            self.conn.execute("CREATE TABLE meta (k TEXT PRIMARY KEY, v TEXT)")
+            for table, cols in (("pending", self.pending_cols), ("installed_candidates", self.ext_cols)):
+                body = ", ".join(_q(c) for c in cols)
+                self.conn.execute(f"CREATE TABLE {table} (_key TEXT PRIMARY KEY, _hash INTEGER, _ord INTEGER, {body})")
+            body = ", ".join(_q(c) for c in self.ext_cols)
+            self.conn.execute(f"CREATE TABLE archive (_id INTEGER PRIMARY KEY AUTOINCREMENT, _run TEXT, "
+                              f"_month INTEGER, {body})")
+            for table in ("pending", "installed_candidates", "archive"):
+                for col, tag in ((SERIAL_COL, "serial"), (MERCH_COL, "merchant")):
+                    self.conn.execute(f"CREATE INDEX ix_{table}_{tag} ON {table} ({_q(col)})")
+            self.conn.execute("CREATE INDEX ix_archive_month ON archive (_month)")
+            self.conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        return True
+
+    def _migrate(self):
+        """ارتقای مخزن نسخهٔ 1: افزودن ستون _month به archive و پر کردن آن از «تاریخ نصب» (یک بار)."""
+        row = self.conn.execute("SELECT v FROM meta WHERE k = 'schema_version'").fetchone()
+        if row is not None and int(row[0]) >= 2:
+            return
+        rows = self.conn.execute(f"SELECT _id, {_q('تاریخ نصب')} FROM archive").fetchall()
+        with self.conn:
+            self.conn.execute("ALTER TABLE archive ADD COLUMN _month INTEGER")
+            if rows:
+                months = month_keys(pd.Series([r[1] for r in rows], dtype=object)).tolist()
+                self.conn.executemany("UPDATE archive SET _month = ? WHERE _id = ?",
+                                      zip(months, (r[0] for r in rows)))
+            self.conn.execute("CREATE INDEX ix_archive_month ON archive (_month)")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+
+    # -------------------- خواندن --------------------
+    def _load(self, table: str, cols, where: str = "", params=()) -> pd.DataFrame:
+        sql = f"SELECT {', '.join(_q(c) for c in cols)} FROM {table} {where}"
+        df = pd.DataFrame.from_records(self.conn.execute(sql, params).fetchall(), columns=list(cols))
+        for c in cols:
+            if c in self.bool_cols:
+                df[c] = df[c].map({1: True, 0: False}).astype(object)
+        return df
+
+    def load_pending(self) -> pd.DataFrame:
+        return self._load("pending", self.pending_cols, "ORDER BY _ord")
+
+    def load_sheet2(self) -> pd.DataFrame:
+        return self._load("installed_candidates", self.ext_cols, "ORDER BY _ord")
+
+    def load_archive(self, since_month: int = None, until_month: int = None) -> pd.DataFrame:
+        """
+        ردیف‌های آرشیو به ترتیب افزودن؛ با since_month/until_month (YYYYMM) فقط همان بازهٔ ماه‌ها
+        (فیلتر در SQL روی ایندکس _month؛ ردیف‌های بدون تاریخ نصب فقط وقتی بازه‌ای داده نشود).
+        """
+        if since_month is None and until_month is None:
+            return self._load("archive", self.ext_cols, "ORDER BY _id")
+        # بازهٔ پیوسته روی ایندکس _month (UNKNOWN=0 کوچک‌تر از هر ماه است)؛ «+_id» تا SQLite به‌جای
+        # پیمایش کل جدول به ترتیب _id، از ایندکس _month استفاده کند و فقط همان ردیف‌ها را مرتب کند
+        since = UNKNOWN + 1 if since_month is None else max(int(since_month), UNKNOWN + 1)
+        until = np.iinfo(np.int64).max if until_month is None else int(until_month)
+        return self._load("archive", self.ext_cols, "WHERE _month BETWEEN ? AND ? ORDER BY +_id", (since, until))
+
+    def recent_archive(self, months: int) -> pd.DataFrame:
+        """
+        پنجرهٔ months ماه اخیر آرشیو برای نمای اکسل، نسبت به جدیدترین ماه آرشیو (مثل
+        archive_store.recent_rows)؛ months=0 → کل آرشیو.
+        """
+        if not months:
+            return self.load_archive()
+        newest = self.conn.execute("SELECT MAX(_month) FROM archive").fetchone()[0]
+        if not newest:   # آرشیو خالی یا فقط ردیف‌های بدون تاریخ نصب
+            return pd.DataFrame(columns=self.ext_cols)
+        return self.load_archive(since_month=shift_month(int(newest), -(months - 1)))
+
+    def archive_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+
+    # -------------------- نوشتن --------------------
+    def _sync(self, table: str, df: pd.DataFrame, cols) -> dict:
+        """
+        اعمال diff یک جدول کلیددار: DELETE کلیدهای حذف‌شده، INSERT OR REPLACE ردیف‌های جدید/تغییرکرده،
+        و UPDATE ستون _ord برای ردیف‌هایی که فقط جایشان عوض شده است.
+        """
+        df = df.reindex(columns=cols)
+        keys = _row_keys(df).tolist() if not df.empty else []
+        hashes = _row_hashes(df).tolist() if not df.empty else []
+        old = {k: (h, o) for k, h, o in self.conn.execute(f"SELECT _key, _hash, _ord FROM {table}")}
+
+        new_keys = set(keys)
+        gone = [(k,) for k in old if k not in new_keys]
+        changed, moved = [], []
+        for i, (k, h) in enumerate(zip(keys, hashes)):
+            prev = old.get(k)
+            if prev is None or prev[0] != h:
+                changed.append(i)
+            elif prev[1] != i:
+                moved.append((i, k))
+
+        self.conn.executemany(f"DELETE FROM {table} WHERE _key = ?", gone)
+        self.conn.executemany(f"UPDATE {table} SET _ord = ? WHERE _key = ?", moved)
+        if changed:
+            sub = df.iloc[changed].astype(object)
+            marks = ", ".join("?" * (len(cols) + 3))
+            rows = ([keys[i], hashes[i], i] + [_to_sql_value(v) for v in vals]
+                    for i, vals in zip(changed, sub.itertuples(index=False, name=None)))
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (_key, _hash, _ord, {', '.join(_q(c) for c in cols)}) "
+                f"VALUES ({marks})", rows)
+        n_new = sum(1 for i in changed if keys[i] not in old)
+        return {"inserted": n_new, "updated": len(changed) - n_new, "deleted": len(gone)}
+
+    def append_archive(self, df: pd.DataFrame, run_tag: str) -> int:
+        if df.empty:
+            return 0
+        df = df.reindex(columns=self.ext_cols).astype(object)
+        months = month_keys(df["تاریخ نصب"]).tolist()
+        marks = ", ".join("?" * (len(self.ext_cols) + 2))
+        self.conn.executemany(
+            f"INSERT INTO archive (_run, _month, {', '.join(_q(c) for c in self.ext_cols)}) VALUES ({marks})",
+            ([run_tag, m] + [_to_sql_value(v) for v in vals]
+             for m, vals in zip(months, df.itertuples(index=False, name=None))))
+        return len(df)
+
+    def apply_run(self, pending: pd.DataFrame, sheet2: pd.DataFrame, new_archive: pd.DataFrame) -> dict:
+        """
+        اعمال نتیجهٔ یک اجرا در یک تراکنش: sync جدول‌های pending و installed_candidates،
+        افزودن ردیف‌های تازه به archive. خروجی: آمار تغییرات.
+        """
+        run_tag = datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            stats = {
+                "pending": self._sync("pending", pending, self.pending_cols),
+                "installed_candidates": self._sync("installed_candidates", sheet2, self.ext_cols),
+                "archive_appended": self.append_archive(new_archive, run_tag),
+            }
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('last_run', ?)", (run_tag,))
+        return stats
+
+    def close(self):
+        self.conn.close()